@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Agent循环的端到端基准：本地模拟LLM (mock_llm.py) + sum_int 服务器
+
+每个问题 ("What is 12 plus 25?") 走完整的ReAct循环：模型返回 sum 工具调用，agent通过MCP执行，
+把结果交回模型得到最终回答。同一组问题分别使用两种工具后端运行：
+- mcp: 通过MCP会话调用 sum_int 服务器 (stdio 或 streamable-http)
+- local: 进程内的同名Python函数，不经过MCP
+两者的差值就是agent循环中由MCP服务器 (传输、会话、服务器处理) 带来的开销。
+
+每个问题的耗时拆分为 llm (等待模型响应)、tool (工具调用，同一轮内的并行调用累加)
+和 framework (agent框架自身，其余部分)。
+
+agent 可选：
+- langgraph: 与 tests/test_sum_int_with_agent*.py 相同的 create_react_agent + langchain-mcp-adapters
+- minimal: 直接用httpx调用chat completions的最小ReAct循环，不依赖LangChain
+- auto (默认): 安装了LangChain时使用langgraph，否则使用minimal
+
+用法:
+    python benchmarks/bench_agent.py --questions 200 --concurrency 8
+    python benchmarks/bench_agent.py --agent minimal --transport streamable-http --latency 0.05 --output agent.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from common import ROOT, SERVER_SCRIPT, free_port, latency_summary, start_server, stop_server, wait_for_server
+
+try:
+    from langchain_core.messages import HumanMessage
+    from langchain_core.tools import StructuredTool
+    from langchain_mcp_adapters.tools import load_mcp_tools
+    from langchain_openai import ChatOpenAI
+    from langgraph.prebuilt import create_react_agent
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    LANGCHAIN_AVAILABLE = False
+
+MOCK_LLM = str(ROOT / "benchmarks" / "mock_llm.py")
+MODEL = "mock"
+
+# 当前问题的计时记录，工具和模型调用在各自的任务中累加到同一个字典
+_record: ContextVar[dict[str, float]] = ContextVar("record")
+
+ToolCall = Callable[[str, dict[str, Any]], Awaitable[str]]
+
+
+def questions(count: int) -> list[tuple[str, int]]:
+    return [(f"What is {i} plus {2 * i + 1}?", 3 * i + 1) for i in range(count)]
+
+
+def _timed(key: str, started: float) -> None:
+    record = _record.get()
+    record[key] += time.perf_counter() - started
+    if key == "tool":
+        record["tool_calls"] += 1
+
+
+@asynccontextmanager
+async def mock_llm(latency: float, calls_per_turn: int, turns: int):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, MOCK_LLM, "--port", str(port), "--latency", str(latency),
+         "--calls-per-turn", str(calls_per_turn), "--turns", str(turns), "--model", MODEL],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        await wait_for_server(f"{base_url}/models")
+        yield base_url
+    finally:
+        stop_server(process)
+
+
+@asynccontextmanager
+async def mcp_session(transport: str):
+    if transport == "stdio":
+        params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT])
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+        return
+
+    port = free_port()
+    process = start_server(transport, port)
+    try:
+        url = f"http://127.0.0.1:{port}/mcp"
+        await wait_for_server(url)
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+    finally:
+        stop_server(process)
+
+
+def mcp_tool_call(session: ClientSession) -> ToolCall:
+    async def call(name: str, arguments: dict[str, Any]) -> str:
+        started = time.perf_counter()
+        try:
+            result = await session.call_tool(name, arguments)
+        finally:
+            _timed("tool", started)
+        if result.isError:
+            raise RuntimeError(result.content[0].text)
+        return result.content[0].text
+
+    return call
+
+
+async def local_tool_call(name: str, arguments: dict[str, Any]) -> str:
+    started = time.perf_counter()
+    try:
+        return str(arguments["a"] + arguments["b"])
+    finally:
+        _timed("tool", started)
+
+
+def openai_tools(tools: list[Any]) -> list[dict[str, Any]]:
+    """把MCP工具转换为chat completions的函数定义"""
+    return [
+        {"type": "function", "function": {"name": tool.name, "description": tool.description or "",
+                                          "parameters": tool.inputSchema}}
+        for tool in tools
+    ]
+
+
+def minimal_agent(
+    client: httpx.AsyncClient, tools: list[dict[str, Any]], call_tool: ToolCall
+) -> Callable[[str], Awaitable[str]]:
+    """最小的ReAct循环：模型返回工具调用时并行执行，结果交回模型，直到得到文本回答"""
+
+    async def ask(question: str) -> str:
+        messages: list[dict[str, Any]] = [{"role": "user", "content": question}]
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/chat/completions", json={"model": MODEL, "messages": messages, "tools": tools})
+                response.raise_for_status()
+                message = response.json()["choices"][0]["message"]
+            finally:
+                _timed("llm", started)
+            messages.append(message)
+            calls = message.get("tool_calls")
+            if not calls:
+                return message["content"]
+            results = await asyncio.gather(*(
+                call_tool(call["function"]["name"], json.loads(call["function"]["arguments"])) for call in calls
+            ))
+            messages.extend(
+                {"role": "tool", "tool_call_id": call["id"], "content": text} for call, text in zip(calls, results)
+            )
+
+    return ask
+
+
+def langgraph_agent(base_url: str, tools: list[Any]) -> Callable[[str], Awaitable[str]]:
+    """tests/test_sum_int_with_agent*.py 使用的 create_react_agent，模型请求计入 llm"""
+
+    class TimedChatOpenAI(ChatOpenAI):
+        async def _agenerate(self, *args: Any, **kwargs: Any):
+            started = time.perf_counter()
+            try:
+                return await super()._agenerate(*args, **kwargs)
+            finally:
+                _timed("llm", started)
+
+    model = TimedChatOpenAI(model=MODEL, base_url=base_url, api_key="mock", temperature=0)
+    agent = create_react_agent(model, tools)
+
+    async def ask(question: str) -> str:
+        response = await agent.ainvoke({"messages": [HumanMessage(content=question)]})
+        return response["messages"][-1].content
+
+    return ask
+
+
+def langgraph_local_tools() -> list[Any]:
+    async def sum(a: int, b: int) -> str:
+        """Add two integers together."""
+        return await local_tool_call("sum", {"a": a, "b": b})
+
+    return [StructuredTool.from_function(coroutine=sum, name="sum")]
+
+
+def timed_session(session: ClientSession) -> ClientSession:
+    """langchain-mcp-adapters 通过 session.call_tool 调用工具，在这里计时"""
+    call_tool = session.call_tool
+
+    async def timed_call_tool(*args: Any, **kwargs: Any):
+        started = time.perf_counter()
+        try:
+            return await call_tool(*args, **kwargs)
+        finally:
+            _timed("tool", started)
+
+    session.call_tool = timed_call_tool
+    return session
+
+
+async def run_questions(ask: Callable[[str], Awaitable[str]], count: int, concurrency: int) -> dict[str, Any]:
+    records: list[dict[str, float]] = []
+    correct = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question: str, expected: int) -> None:
+        nonlocal correct
+        async with semaphore:
+            record = {"llm": 0.0, "tool": 0.0, "tool_calls": 0}
+            _record.set(record)
+            started = time.perf_counter()
+            answer = await ask(question)
+            record["total"] = time.perf_counter() - started
+            records.append(record)
+            correct += str(expected) in answer
+
+    # 预热：建立连接、加载工具定义
+    await asyncio.gather(*(one(q, e) for q, e in questions(min(concurrency, 4))))
+    records.clear()
+    correct = 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q, e) for q, e in questions(count)))
+    elapsed = time.perf_counter() - started
+    return {
+        "questions_per_sec": round(count / elapsed, 1),
+        "correct": correct,
+        "tool_calls": sum(record["tool_calls"] for record in records),
+        "total_ms": latency_summary([record["total"] for record in records]),
+        "llm_ms": latency_summary([record["llm"] for record in records]),
+        "tool_ms": latency_summary([record["tool"] for record in records]),
+        "framework_ms": latency_summary([record["total"] - record["llm"] - record["tool"] for record in records]),
+        "_tool_seconds": sum(record["tool"] for record in records),
+    }
+
+
+async def bench(args: argparse.Namespace, agent: str) -> dict[str, Any]:
+    results = {}
+    async with mock_llm(args.latency, args.calls_per_turn, args.turns) as base_url:
+        async with mcp_session(args.transport) as session, httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            if agent == "langgraph":
+                backends = {
+                    "mcp": langgraph_agent(base_url, await load_mcp_tools(timed_session(session))),
+                    "local": langgraph_agent(base_url, langgraph_local_tools()),
+                }
+            else:
+                tools = openai_tools((await session.list_tools()).tools)
+                backends = {
+                    "mcp": minimal_agent(client, tools, mcp_tool_call(session)),
+                    "local": minimal_agent(client, tools, local_tool_call),
+                }
+            for name, ask in backends.items():
+                results[name] = await run_questions(ask, args.questions, args.concurrency)
+
+    mcp, local = results["mcp"], results["local"]
+    calls = mcp["tool_calls"] or 1
+    overhead = {
+        "total_p50_ms": round(mcp["total_ms"]["p50"] - local["total_ms"]["p50"], 3),
+        "per_tool_call_ms": round((mcp.pop("_tool_seconds") - local.pop("_tool_seconds")) / calls * 1000, 3),
+        # 平均每个问题的耗时中由MCP带来的比例
+        "share_of_total": round(1 - local["total_ms"]["mean"] / mcp["total_ms"]["mean"], 3),
+    }
+    return {"backends": results, "mcp_overhead": overhead}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agent", choices=("auto", "langgraph", "minimal"), default="auto")
+    parser.add_argument("--transport", choices=("stdio", "streamable-http"), default="stdio")
+    parser.add_argument("--questions", type=int, default=100, help="每种工具后端的问题数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时进行的agent循环数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟LLM每次响应的耗时 (秒)")
+    parser.add_argument("--calls-per-turn", type=int, default=1, help="模拟LLM每轮返回的sum调用数")
+    parser.add_argument("--turns", type=int, default=1, help="模拟LLM给出回答前调用工具的轮数")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    agent = args.agent
+    if agent == "auto":
+        agent = "langgraph" if LANGCHAIN_AVAILABLE else "minimal"
+    elif agent == "langgraph" and not LANGCHAIN_AVAILABLE:
+        parser.error("--agent langgraph requires: pip install langchain-openai langchain-mcp-adapters langgraph")
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "agent": agent,
+        "transport": args.transport,
+        "questions": args.questions,
+        "concurrency": args.concurrency,
+        "llm": {"latency": args.latency, "calls_per_turn": args.calls_per_turn, "turns": args.turns},
+        **await bench(args, agent),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
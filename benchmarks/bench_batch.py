@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC批量请求的调用速率：不同批量大小下每秒完成的 sum 调用数
+
+以原始JSON-RPC消息与 sum_int 服务器通信 (不经过ClientSession)，每次发出一个批量并等待响应数组，
+批量大小为 1 时与逐条发送单个请求对比 (single)。传输方式可选 stdio、shm 和 streamable-http。
+服务器日志级别为WARNING (INFO级别下每个请求都输出一条日志)。
+
+用法:
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --transports stdio streamable-http --sizes 1 10 100 1000 --calls 20000 --output batch.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+
+from common import ROOT, SERVER_SCRIPT, free_port, latency_summary, stop_server, wait_for_server
+
+sys.path.insert(0, str(ROOT / "src" / "mcp_server"))
+
+import mcp.types as types  # noqa: E402
+from mcp.shared.message import SessionMessage  # noqa: E402
+
+from jsonrpc_batch import JSONRPCBatch  # noqa: E402
+from shm_transport import shm_client  # noqa: E402
+
+SERVER_ENV = dict(os.environ, FASTMCP_LOG_LEVEL="WARNING")
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": "init", "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "bench", "version": "1"}},
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+# 发送一条消息 (对象或数组) 并返回响应
+Exchange = Callable[[Any], Awaitable[Any]]
+
+
+@asynccontextmanager
+async def stdio_exchange() -> AsyncIterator[Exchange]:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, SERVER_SCRIPT, env=SERVER_ENV, limit=64 * 1024 * 1024,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    async def exchange(message: Any) -> Any:
+        process.stdin.write(json.dumps(message).encode() + b"\n")
+        await process.stdin.drain()
+        return json.loads(await process.stdout.readline())
+
+    try:
+        await exchange(INITIALIZE)
+        process.stdin.write(json.dumps(INITIALIZED).encode() + b"\n")
+        yield exchange
+    finally:
+        process.stdin.close()
+        await process.wait()
+
+
+@asynccontextmanager
+async def shm_exchange() -> AsyncIterator[Exchange]:
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "shm.sock")
+        ready_read, ready_write = os.pipe()
+        process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "shm", "--socket", socket_path, "--ready-fd", str(ready_write)],
+            pass_fds=(ready_write,), env=SERVER_ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        os.close(ready_write)
+        try:
+            with os.fdopen(ready_read, "rb") as ready:
+                if not (await asyncio.to_thread(ready.read)).startswith(b"READY=1"):
+                    raise RuntimeError("MCP server failed to start")
+            async with shm_client(socket_path) as (read, write):
+                async def send(message: Any) -> None:
+                    if isinstance(message, list):
+                        await write.send(SessionMessage(JSONRPCBatch(message)))
+                    else:
+                        await write.send(SessionMessage(types.JSONRPCMessage.model_validate(message)))
+
+                async def exchange(message: Any) -> Any:
+                    await send(message)
+                    received = await read.receive()
+                    return received.message.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+                await exchange(INITIALIZE)
+                await send(INITIALIZED)
+                yield exchange
+        finally:
+            stop_server(process)
+
+
+@asynccontextmanager
+async def http_exchange() -> AsyncIterator[Exchange]:
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, SERVER_SCRIPT, "streamable-http"],
+        env=dict(SERVER_ENV, MCP_SERVER_PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        await wait_for_server(url)
+        async with httpx.AsyncClient(timeout=120) as client:
+            response = await client.post(url, json=INITIALIZE, headers=HEADERS)
+            headers = dict(HEADERS, **{"mcp-session-id": response.headers["mcp-session-id"]})
+            await client.post(url, json=INITIALIZED, headers=headers)
+
+            async def exchange(message: Any) -> Any:
+                response = await client.post(url, json=message, headers=headers)
+                if response.headers["content-type"].startswith("text/event-stream"):
+                    # 单个请求的响应是SSE事件
+                    data = [line[5:] for line in response.text.splitlines() if line.startswith("data:")]
+                    return json.loads(data[-1])
+                return response.json()
+
+            yield exchange
+    finally:
+        stop_server(process)
+
+
+EXCHANGES = {"stdio": stdio_exchange, "shm": shm_exchange, "streamable-http": http_exchange}
+
+
+def call(request_id: int) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": "sum", "arguments": {"a": request_id, "b": 1}}}
+
+
+async def measure(exchange: Exchange, size: int | None, calls: int) -> dict[str, Any]:
+    """size 为 None 时逐条发送单个请求，否则每次发送一个 size 个调用的批量"""
+    per_message = size or 1
+    rounds = max(calls // per_message, 1)
+    latencies = []
+    next_id = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        message = call(next_id) if size is None else [call(next_id + i) for i in range(size)]
+        call_started = time.perf_counter()
+        response = await exchange(message)
+        latencies.append(time.perf_counter() - call_started)
+        responses = [response] if size is None else response
+        assert len(responses) == per_message and "result" in responses[0], responses[:1]
+        next_id += per_message
+    elapsed = time.perf_counter() - started
+    return {"calls_per_sec": round(rounds * per_message / elapsed, 1), "message_latency_ms": latency_summary(latencies)}
+
+
+async def bench(transport: str, sizes: list[int], calls: int) -> dict[str, Any]:
+    async with EXCHANGES[transport]() as exchange:
+        # 预热
+        await measure(exchange, 10, 200)
+        results = {"single": await measure(exchange, None, calls)}
+        for size in sizes:
+            results[f"batch_{size}"] = await measure(exchange, size, calls)
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transports", nargs="+", choices=tuple(EXCHANGES), default=list(EXCHANGES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 100, 1000], help="批量大小")
+    parser.add_argument("--calls", type=int, default=5000, help="每种批量大小的调用总数")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "calls": args.calls,
+        "transports": {transport: await bench(transport, args.sizes, args.calls) for transport in args.transports},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+大整数加法在不同操作数位数下的基准测试
+
+- codec: 进程内测量十进制分治转换、内置 int()/str() (临时关闭位数限制) 和base64编解码的耗时
+- sum_big: 通过stdio调用 sum_big 工具，分别使用 decimal 和 base64 编码，统计端到端延迟
+
+用法:
+    python benchmarks/bench_bigint.py
+    python benchmarks/bench_bigint.py --digits 100 10000 1000000 --calls 20 --output bigint.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from common import ROOT, SERVER_SCRIPT, latency_summary
+
+sys.path.insert(0, str(ROOT / "src" / "mcp_server"))
+
+from bigint import decode_base64, encode_base64, format_decimal, parse_decimal  # noqa: E402
+
+DEFAULT_DIGITS = (10, 100, 1_000, 10_000, 100_000)
+
+
+def best_of(fn, repeat: int) -> float:
+    """多次运行取最短耗时，单位毫秒"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 4)
+
+
+def bench_codec(text: str, repeat: int) -> dict:
+    value = parse_decimal(text)
+    encoded = encode_base64(value)
+    previous = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        builtin = {
+            "int_str_ms": best_of(lambda: int(text), repeat),
+            "str_int_ms": best_of(lambda: str(value), repeat),
+        }
+    finally:
+        sys.set_int_max_str_digits(previous)
+    return {
+        "parse_decimal_ms": best_of(lambda: parse_decimal(text), repeat),
+        "format_decimal_ms": best_of(lambda: format_decimal(value), repeat),
+        **builtin,
+        "decode_base64_ms": best_of(lambda: decode_base64(encoded), repeat),
+        "encode_base64_ms": best_of(lambda: encode_base64(value), repeat),
+        "decimal_chars": len(text),
+        "base64_chars": len(encoded),
+    }
+
+
+async def bench_tool(session: ClientSession, a: int, b: int, encoding: str, calls: int) -> dict:
+    encode = encode_base64 if encoding == "base64" else format_decimal
+    arguments = {"a": encode(a), "b": encode(b), "encoding": encoding}
+    await session.call_tool("sum_big", arguments)
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = await session.call_tool("sum_big", arguments)
+        latencies.append(time.perf_counter() - start)
+        assert not result.isError, result
+    return latency_summary(latencies)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--digits", type=int, nargs="+", default=list(DEFAULT_DIGITS), help="操作数的十进制位数")
+    parser.add_argument("--calls", type=int, default=50, help="每种位数和编码的工具调用次数")
+    parser.add_argument("--repeat", type=int, default=5, help="进程内转换的重复次数 (取最好结果)")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    random.seed(0)
+    results = []
+    params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT])
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for digits in args.digits:
+                text = str(random.randint(1, 9)) + "".join(random.choices("0123456789", k=digits - 1))
+                a = parse_decimal(text)
+                entry = {"digits": digits, "codec": bench_codec(text, args.repeat)}
+                for encoding in ("decimal", "base64"):
+                    entry[f"sum_big_{encoding}"] = await bench_tool(session, a, -a // 3, encoding, args.calls)
+                results.append(entry)
+                print(json.dumps(entry), file=sys.stderr)
+
+    report = {"python": sys.version.split()[0], "platform": platform.platform(), "results": results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
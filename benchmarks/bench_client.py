@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+对比每次调用新建会话与 ClientPool 复用会话的单次调用延迟
+
+- session-per-call: 与 tests/test_sum_int_with_agent_streamable_http.py 相同，每次调用都打开
+  streamablehttp_client、创建 ClientSession、initialize，调用后关闭
+- pool: ClientPool 保持已初始化的会话，调用直接复用
+
+用法:
+    python benchmarks/bench_client.py --calls 200 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from common import ROOT, free_port, latency_summary, start_server, stop_server, wait_for_server
+
+sys.path.insert(0, str(ROOT / "src" / "mcp_server"))
+
+from client import ClientPool  # noqa: E402
+
+
+async def session_per_call(url: str, i: int) -> None:
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.call_tool("sum", {"a": i, "b": 1})
+            assert result.structuredContent["result"] == i + 1, result
+
+
+async def run_mode(mode: str, url: str, calls: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    counter = iter(range(calls))
+
+    async def worker(call):
+        for i in counter:
+            start = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if mode == "pool":
+        async with ClientPool(size=concurrency) as pool:
+
+            async def pooled(i: int) -> None:
+                result = await pool.call_tool(url, "sum", {"a": i, "b": 1})
+                assert result.structuredContent["result"] == i + 1, result
+
+            await asyncio.gather(*(worker(pooled) for _ in range(concurrency)))
+    else:
+        await asyncio.gather(*(worker(lambda i: session_per_call(url, i)) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "calls": calls,
+        "concurrency": concurrency,
+        "calls_per_sec": round(calls / elapsed, 1),
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="每种模式的调用次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发调用数")
+    parser.add_argument("--output", help="结果JSON的输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    process = start_server("streamable-http", port)
+    try:
+        await wait_for_server(url)
+        results = [
+            await run_mode("session-per-call", url, args.calls, args.concurrency),
+            await run_mode("pool", url, args.calls, args.concurrency),
+        ]
+    finally:
+        stop_server(process)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+每次工具调用的序列化开销微基准
+
+- codec: 各JSON编解码器对典型负载的 dumps/loads 耗时
+- envelope: JSON-RPC消息的序列化和解析，pydantic-core (SDK传输层使用) 与 transport.py 的 "编解码器 + pydantic" 对比
+- handler: 进程内直接调用 tools/call 处理函数 (不含传输)，SDK默认处理与 ToolRunner 在各编解码器下的对比
+
+用法:
+    python benchmarks/bench_codec.py
+    PYMCP_JSON_CODEC=json python benchmarks/bench_codec.py --number 2000 --output codec.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import time
+
+from common import ROOT
+
+sys.path.insert(0, str(ROOT / "src" / "mcp_server"))
+
+import mcp.types as types  # noqa: E402
+
+import sum_int  # noqa: E402
+from codec import CODECS, get_codec  # noqa: E402
+from tool_runner import ToolRunner  # noqa: E402
+from transport import decode_message, encode_message  # noqa: E402
+
+PAYLOADS = {
+    "sum_result": {"result": 8},
+    "batch_1000": {"sums": list(range(1000)), "count": 1000},
+    "arguments": {"a": [1, 2, 3, 4, 5, 6, 7, 8], "b": [8, 7, 6, 5, 4, 3, 2, 1]},
+}
+
+CALLS = {
+    "sum": {"a": 5, "b": 3},
+    "sum_batch_100": {"a": list(range(100)), "b": list(range(100))},
+    "sum_many_1000": {"values": list(range(1000))},
+}
+
+
+def per_call_us(fn, number: int) -> float:
+    """取三轮中最快一轮的平均耗时，单位微秒"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best / number * 1e6, 3)
+
+
+async def async_per_call_us(fn, number: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best / number * 1e6, 3)
+
+
+def available_codecs():
+    for name in CODECS[1:]:
+        try:
+            yield get_codec(name)
+        except ImportError:
+            pass
+
+
+def bench_codecs(number: int) -> dict:
+    results = {}
+    for codec in available_codecs():
+        entry = {}
+        for name, payload in PAYLOADS.items():
+            text = codec.dumps(payload)
+            entry[f"{name}_dumps_us"] = per_call_us(lambda: codec.dumps(payload), number)
+            entry[f"{name}_loads_us"] = per_call_us(lambda: codec.loads(text), number)
+        results[codec.name] = entry
+    return results
+
+
+def bench_envelope(number: int) -> dict:
+    results = {}
+    for name, payload in (("sum_result", PAYLOADS["sum_result"]), ("batch_1000", PAYLOADS["batch_1000"])):
+        result = types.CallToolResult(
+            content=[types.TextContent(type="text", text=json.dumps(payload))], structuredContent=payload)
+        message = types.JSONRPCMessage(types.JSONRPCResponse(
+            jsonrpc="2.0", id=1, result=result.model_dump(by_alias=True, mode="json", exclude_none=True)))
+        line = message.model_dump_json(by_alias=True, exclude_none=True)
+        entry = {
+            "pydantic_dump_us": per_call_us(lambda: message.model_dump_json(by_alias=True, exclude_none=True), number),
+            "pydantic_parse_us": per_call_us(lambda: types.JSONRPCMessage.model_validate_json(line), number),
+        }
+        for codec in available_codecs():
+            entry[f"{codec.name}_dump_us"] = per_call_us(lambda: encode_message(codec, message), number)
+            entry[f"{codec.name}_parse_us"] = per_call_us(lambda: decode_message(codec, line), number)
+        results[name] = entry
+    return results
+
+
+def default_handler():
+    """SDK底层Server默认注册的 tools/call 处理函数"""
+    server = sum_int.mcp._mcp_server
+    installed = server.request_handlers[types.CallToolRequest]
+    server.call_tool()(sum_int.mcp.call_tool)
+    handler = server.request_handlers[types.CallToolRequest]
+    server.request_handlers[types.CallToolRequest] = installed
+    return handler
+
+
+async def bench_handlers(number: int) -> dict:
+    handlers = {"sdk_default": default_handler()}
+    for codec in available_codecs():
+        handlers[f"tool_runner_{codec.name}"] = ToolRunner(sum_int.mcp, codec)
+
+    results = {}
+    for call, arguments in CALLS.items():
+        name = call.split("_")[0] if call == "sum" else call.rsplit("_", 1)[0]
+        request = types.CallToolRequest(
+            method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+        results[call] = {
+            label: await async_per_call_us(lambda: handler(request), number)
+            for label, handler in handlers.items()
+        }
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=1000, help="每轮重复次数")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "codec": bench_codecs(args.number * 10),
+        "envelope": bench_envelope(args.number),
+        "handler": await bench_handlers(args.number),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+共享内存传输 (shm) 与 stdio 的往返延迟对比
+
+以测试相同的方式启动 sum_int 服务器，在一个会话中逐个调用工具 (每次等待响应后再发下一个)，
+统计每次往返的 p50/p95/p99 延迟和每秒调用数 (不含客户端对结构化结果的schema校验，服务器日志级别为WARNING)：
+- sum: 小消息，主要是分帧、系统调用和线程切换的开销
+- sum_batch_N: a、b 各N个整数，消息大小随N增长，体现复制的开销
+
+用法:
+    python benchmarks/bench_shm.py
+    python benchmarks/bench_shm.py --calls 5000 --batch 10000 --output shm.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import mcp.types as types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from common import ROOT, SERVER_SCRIPT, latency_summary, stop_server
+
+sys.path.insert(0, str(ROOT / "src" / "mcp_server"))
+
+from shm_transport import shm_client  # noqa: E402
+
+# FastMCP 默认以INFO级别为每个请求输出一条Rich日志，耗时约1ms，会掩盖传输本身的差别
+SERVER_ENV = dict(os.environ, FASTMCP_LOG_LEVEL="WARNING")
+
+
+@asynccontextmanager
+async def stdio_session():
+    params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], env=SERVER_ENV)
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+
+@asynccontextmanager
+async def shm_session():
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "shm.sock")
+        ready_read, ready_write = os.pipe()
+        process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "shm", "--socket", socket_path, "--ready-fd", str(ready_write)],
+            pass_fds=(ready_write,), env=SERVER_ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        os.close(ready_write)
+        try:
+            with os.fdopen(ready_read, "rb") as ready:
+                if not (await asyncio.to_thread(ready.read)).startswith(b"READY=1"):
+                    raise RuntimeError("MCP server failed to start")
+            async with shm_client(socket_path) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    yield session
+        finally:
+            stop_server(process)
+
+
+async def round_trips(session: ClientSession, name: str, arguments: dict, calls: int) -> dict:
+    # 直接发送请求：ClientSession.call_tool 每次都用jsonschema校验结构化结果 (包括重新检查schema本身)，
+    # 耗时远超过传输本身，会掩盖两种传输的差别
+    request = types.ClientRequest(types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments)))
+    for _ in range(min(calls, 50)):
+        await session.send_request(request, types.CallToolResult)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        call_started = time.perf_counter()
+        result = await session.send_request(request, types.CallToolResult)
+        latencies.append(time.perf_counter() - call_started)
+        assert not result.isError, result
+    elapsed = time.perf_counter() - started
+    return {"calls_per_sec": round(calls / elapsed, 1), "latency_ms": latency_summary(latencies)}
+
+
+async def bench(transport: str, calls: int, batch: int) -> dict:
+    values = list(range(batch))
+    workloads = {
+        "sum": ("sum", {"a": 5, "b": 3}, calls),
+        # 大消息的调用次数减少，避免总耗时过长
+        f"sum_batch_{batch}": ("sum_batch", {"a": values, "b": values}, max(calls // 10, 10)),
+    }
+    session_factory = stdio_session if transport == "stdio" else shm_session
+    async with session_factory() as session:
+        return {label: await round_trips(session, name, arguments, n) for label, (name, arguments, n) in workloads.items()}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="sum 的调用次数")
+    parser.add_argument("--batch", type=int, default=1000, help="sum_batch 每个参数的整数个数")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "transports": {transport: await bench(transport, args.calls, args.batch) for transport in ("stdio", "shm")},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+对比 streamable-http 有状态模式与无状态模式的吞吐量
+
+直接通过HTTP发送JSON-RPC请求，排除客户端SDK的开销：
+- 有状态模式：先initialize拿到会话ID，之后每个请求携带 mcp-session-id，响应以SSE帧返回
+- 无状态模式：每个请求独立处理，响应为普通JSON
+
+用法:
+    python benchmarks/bench_stateless_http.py --calls 2000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from common import free_port, start_server, stop_server, wait_for_server
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+PROTOCOL_VERSION = "2025-06-18"
+
+
+def parse_response(response: httpx.Response) -> dict:
+    """解析JSON或SSE帧格式的JSON-RPC响应"""
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        for line in response.text.splitlines():
+            if line.startswith("data:"):
+                return json.loads(line[5:])
+        raise ValueError("No data in SSE response")
+    return response.json()
+
+
+async def open_session(client: httpx.AsyncClient, url: str) -> dict[str, str]:
+    """完成initialize握手，返回后续请求需要携带的请求头"""
+    init = {
+        "jsonrpc": "2.0", "id": 0, "method": "initialize",
+        "params": {"protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+                   "clientInfo": {"name": "bench", "version": "0"}},
+    }
+    response = await client.post(url, json=init, headers=HEADERS)
+    response.raise_for_status()
+    headers = dict(HEADERS)
+    session_id = response.headers.get("mcp-session-id")
+    if session_id:
+        headers["mcp-session-id"] = session_id
+    headers["mcp-protocol-version"] = PROTOCOL_VERSION
+    await client.post(url, json={"jsonrpc": "2.0", "method": "notifications/initialized"}, headers=headers)
+    return headers
+
+
+async def run_mode(stateless: bool, calls: int, concurrency: int) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    process = start_server("streamable-http", port, *(["--stateless"] if stateless else []))
+    try:
+        await wait_for_server(url)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            headers = await open_session(client, url)
+
+            counter = iter(range(calls))
+
+            async def worker():
+                for i in counter:
+                    request = {"jsonrpc": "2.0", "id": i + 1, "method": "tools/call",
+                               "params": {"name": "sum", "arguments": {"a": i, "b": 1}}}
+                    response = await client.post(url, json=request, headers=headers)
+                    result = parse_response(response)["result"]
+                    assert result["structuredContent"]["result"] == i + 1, result
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+    finally:
+        stop_server(process)
+
+    return {
+        "mode": "stateless" if stateless else "stateful",
+        "calls": calls,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(calls / elapsed, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="每种模式的调用次数")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发请求数")
+    args = parser.parse_args()
+
+    results = [
+        await run_mode(False, args.calls, args.concurrency),
+        await run_mode(True, args.calls, args.concurrency),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+本地文件归约 (sum_file) 的吞吐量：不同格式和进程数下每秒处理的字节数和整数个数
+
+先在临时目录 (或 --dir) 中生成测试文件：int64/int32 为随机字节，csv 为每行一个十进制整数。
+- reduce_file: 进程内调用 reduction.reduce_file，与服务器相同的方式把块提交到进程池，
+  分别使用 --workers 中的每个进程数
+- sum_file: 通过stdio调用 sum_file 工具的端到端耗时 (服务器进程池的大小为CPU核数)
+文件刚写入，读取时位于页缓存中；冷缓存下的结果受磁盘速度限制。
+
+用法:
+    python benchmarks/bench_sum_file.py
+    python benchmarks/bench_sum_file.py --size-mb 4096 --csv-mb 512 --workers 1 2 4 8 --output sum_file.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from common import ROOT, SERVER_SCRIPT
+
+sys.path.insert(0, str(ROOT / "src" / "mcp_server"))
+
+import anyio  # noqa: E402
+
+from execution import ProcessPool  # noqa: E402
+from reduction import _BINARY, _get_numpy, reduce_file  # noqa: E402
+
+BLOCK = 64 * 1024 * 1024
+
+
+def generate(path: str, format: str, size: int) -> None:
+    """生成约 size 字节的测试文件"""
+    with open(path, "wb") as f:
+        if format in _BINARY:
+            for start in range(0, size, BLOCK):
+                f.write(os.urandom(min(BLOCK, size - start)))
+            return
+        # 一块文本重复写入，数值大小与64位整数相当
+        block = "".join(f"{(i * 2654435761) % 10**18 - 5 * 10**17}\n" for i in range(1_000_000)).encode()
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+
+
+async def measure(path: str, format: str, workers: int) -> dict:
+    pool = ProcessPool(workers)
+    limiter = anyio.CapacityLimiter(workers)
+
+    async def run_chunk(fn, kwargs):
+        async with limiter:
+            return await pool.run(fn, kwargs)
+
+    try:
+        # 预热：启动进程池的子进程
+        await asyncio.gather(*(pool.run(os.getpid, {}) for _ in range(workers)))
+        started = time.perf_counter()
+        stats = await reduce_file(path, format, workers=workers, run_chunk=run_chunk)
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+    size = os.path.getsize(path)
+    return {
+        "seconds": round(elapsed, 3),
+        "mb_per_sec": round(size / elapsed / 2**20, 1),
+        "ints_per_sec": round(stats.count / elapsed),
+        "count": stats.count,
+    }
+
+
+async def measure_tool(paths: dict[str, str], directory: str) -> dict:
+    server_params = StdioServerParameters(
+        command=sys.executable, args=[SERVER_SCRIPT],
+        env=dict(os.environ, PYMCP_DATA_DIRS=directory, FASTMCP_LOG_LEVEL="WARNING"),
+    )
+    results = {}
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for format, path in paths.items():
+                started = time.perf_counter()
+                result = await session.call_tool("sum_file", {"path": path, "format": format})
+                elapsed = time.perf_counter() - started
+                assert not result.isError, result.content
+                results[format] = {
+                    "seconds": round(elapsed, 3),
+                    "mb_per_sec": round(os.path.getsize(path) / elapsed / 2**20, 1),
+                }
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", choices=("int64", "int32", "csv"), default=["int64", "int32", "csv"])
+    parser.add_argument("--size-mb", type=int, default=2048, help="二进制文件的大小 (MB)")
+    parser.add_argument("--csv-mb", type=int, default=256, help="CSV文件的大小 (MB)")
+    parser.add_argument("--workers", nargs="+", type=int, default=sorted({1, os.cpu_count() or 1}), help="进程数")
+    parser.add_argument("--dir", help="生成测试文件的目录，默认为临时目录 (结束后删除)")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        paths = {}
+        for format in args.formats:
+            paths[format] = os.path.join(directory, f"values.{format}")
+            generate(paths[format], format, (args.csv_mb if format == "csv" else args.size_mb) * 2**20)
+
+        report = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": _get_numpy() is not None,
+            "sizes_mb": {format: round(os.path.getsize(path) / 2**20) for format, path in paths.items()},
+            "reduce_file": {
+                format: {f"workers_{n}": await measure(path, format, n) for n in args.workers}
+                for format, path in paths.items()
+            },
+            "sum_file": await measure_tool(paths, directory),
+        }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
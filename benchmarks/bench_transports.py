@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+三种传输方式 (stdio / sse / streamable-http) 的负载基准测试
+
+以测试相同的方式启动sum_int服务器，通过 ClientSession.call_tool("sum", ...)
+按指定并发度发起调用，输出每种传输方式的延迟百分位、每秒调用数和服务器内存占用 (JSON)。
+
+用法:
+    python benchmarks/bench_transports.py --calls 2000 --concurrency 16
+    python benchmarks/bench_transports.py --transports stdio sse --output bench.json
+    # 与基线对比，吞吐量下降超过10%时以非零状态退出
+    python benchmarks/bench_transports.py --baseline bench.json --max-regression 10
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from common import (
+    SERVER_SCRIPT,
+    child_pids,
+    free_port,
+    latency_summary,
+    memory_usage,
+    start_server,
+    stop_server,
+    wait_for_server,
+)
+
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+
+
+@asynccontextmanager
+async def open_session(transport: str):
+    """启动服务器并建立已初始化的会话，产出 (session, 服务器pid)"""
+    if transport == "stdio":
+        before = set(child_pids())
+        params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT])
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                spawned = [pid for pid in child_pids() if pid not in before]
+                yield session, spawned[0] if spawned else None
+        return
+
+    port = free_port()
+    process = start_server(transport, port)
+    try:
+        if transport == "sse":
+            await wait_for_server(f"http://127.0.0.1:{port}/messages/")
+            client = sse_client(f"http://127.0.0.1:{port}/sse")
+        else:
+            await wait_for_server(f"http://127.0.0.1:{port}/mcp")
+            client = streamablehttp_client(f"http://127.0.0.1:{port}/mcp")
+        async with client as streams:
+            async with ClientSession(streams[0], streams[1]) as session:
+                await session.initialize()
+                yield session, process.pid
+    finally:
+        stop_server(process)
+
+
+async def bench_transport(transport: str, calls: int, concurrency: int, warmup: int) -> dict:
+    async with open_session(transport) as (session, pid):
+        for i in range(warmup):
+            await session.call_tool("sum", {"a": i, "b": i})
+
+        latencies: list[float] = []
+        errors = 0
+        counter = iter(range(calls))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                result = await session.call_tool("sum", {"a": i, "b": 1})
+                latencies.append(time.perf_counter() - start)
+                if result.isError or result.structuredContent["result"] != i + 1:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        memory = memory_usage(pid) if pid else {"rss_mb": None, "peak_rss_mb": None}
+
+    return {
+        "transport": transport,
+        "calls": calls,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "calls_per_sec": round(calls / elapsed, 1),
+        "latency_ms": latency_summary(latencies),
+        **memory,
+    }
+
+
+def check_regressions(results: list[dict], baseline_path: str, max_regression: float) -> list[str]:
+    """与基线结果对比，返回吞吐量下降超过阈值的描述"""
+    with open(baseline_path) as f:
+        baseline = {item["transport"]: item for item in json.load(f)["results"]}
+    failures = []
+    for result in results:
+        base = baseline.get(result["transport"])
+        if not base:
+            continue
+        drop = (base["calls_per_sec"] - result["calls_per_sec"]) / base["calls_per_sec"] * 100
+        if drop > max_regression:
+            failures.append(
+                f"{result['transport']}: {result['calls_per_sec']} calls/sec is {drop:.1f}% below "
+                f"baseline {base['calls_per_sec']}"
+            )
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--calls", type=int, default=1000, help="每种传输方式的调用次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发调用数")
+    parser.add_argument("--warmup", type=int, default=20, help="预热调用次数，不计入统计")
+    parser.add_argument("--output", help="结果写入的JSON文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="用于对比的基线结果JSON文件")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="允许的吞吐量下降百分比")
+    args = parser.parse_args()
+
+    results = []
+    for transport in args.transports:
+        results.append(await bench_transport(transport, args.calls, args.concurrency, args.warmup))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        failures = check_regressions(results, args.baseline, args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
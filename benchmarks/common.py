@@ -0,0 +1,103 @@
+"""
+基准测试公共工具：启动服务器、等待就绪、统计延迟和内存占用
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+SERVER_SCRIPT = str(ROOT / "src" / "mcp_server" / "sum_int.py")
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(transport: str, port: int, *extra_args: str) -> subprocess.Popen:
+    """以测试相同的方式启动sum_int服务器子进程"""
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    return subprocess.Popen(
+        [sys.executable, SERVER_SCRIPT, transport, *extra_args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def wait_for_server(url: str, timeout: float = 30) -> None:
+    """等待服务器开始接受连接"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url, timeout=0.5)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError("MCP server failed to start within timeout")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """线性插值计算百分位数，输入需已排序"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    """汇总延迟分布，单位毫秒"""
+    values = sorted(latency * 1000 for latency in latencies)
+    return {
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "max": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def memory_usage(pid: int) -> dict[str, float | None]:
+    """读取进程当前和峰值常驻内存 (MB)，仅支持Linux"""
+    usage: dict[str, float | None] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["rss_mb"] = round(int(line.split()[1]) / 1024, 2)
+                elif line.startswith("VmHWM:"):
+                    usage["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        pass
+    return usage
+
+
+def child_pids(pid: int | None = None) -> list[int]:
+    """列出进程的直接子进程，用于找到stdio_client启动的服务器进程"""
+    pid = pid or os.getpid()
+    children: list[int] = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
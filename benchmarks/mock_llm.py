@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+本地的OpenAI兼容模型服务，用确定性的 sum 工具调用代替真实LLM
+
+实现 GET /v1/models 和 POST /v1/chat/completions (含 stream=true)。对每个问题：
+- 从最后一条用户消息中取出前两个整数作为 a、b (不足时为1、2)
+- 请求带有 sum 工具且问题被选中 (--tool-rate) 时，前 --turns 轮各返回 --calls-per-turn 个
+  sum 调用，第t轮第j个调用的参数为 {"a": a + t, "b": b + j}；之后返回
+  "The sum of a and b is <第一个调用的结果>."
+- 未被选中或没有工具时直接回答，不调用工具
+- 每个响应在返回前等待 --latency 秒，模拟模型的推理时间
+
+问题是否调用工具由问题文本的crc32决定，同样的输入总是得到同样的输出。
+把 LLM_BASE_URL 指向它即可离线运行 tests/test_sum_int_with_*.py：
+
+    python benchmarks/mock_llm.py --port 9000
+    LLM_BASE_URL=http://127.0.0.1:9000/v1 LLM_API_KEY=mock LLM_MODEL=mock python tests/test_sum_int_with_agent.py
+
+GET /stats 返回已处理的请求数和发出的工具调用数。
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+TOOL_NAME = "sum"
+
+
+@dataclass
+class Behavior:
+    latency: float = 0.0
+    calls_per_turn: int = 1
+    turns: int = 1
+    tool_rate: float = 1.0
+    model: str = "mock"
+
+
+def _text(content: Any) -> str:
+    """消息内容可能是字符串或内容块列表"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _uses_tool(question: str, rate: float) -> bool:
+    return zlib.crc32(question.encode()) / 2**32 < rate
+
+
+def reply(messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None, behavior: Behavior) -> dict[str, Any]:
+    """根据对话生成下一条assistant消息"""
+    last_user = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=-1)
+    question = _text(messages[last_user]["content"]) if last_user >= 0 else ""
+    found = [int(n) for n in re.findall(r"-?\d+", question)]
+    a, b = (found + [1, 2][len(found):])[:2]
+
+    after = messages[last_user + 1:]
+    turn = sum(1 for message in after if message.get("role") == "assistant" and message.get("tool_calls"))
+    has_tool = any(tool.get("function", {}).get("name") == TOOL_NAME for tool in tools or ())
+    if has_tool and turn < behavior.turns and _uses_tool(question, behavior.tool_rate):
+        calls = [
+            {
+                "id": f"call_{turn}_{j}",
+                "type": "function",
+                "function": {"name": TOOL_NAME, "arguments": json.dumps({"a": a + turn, "b": b + j})},
+            }
+            for j in range(behavior.calls_per_turn)
+        ]
+        return {"role": "assistant", "content": None, "tool_calls": calls}
+
+    results = {message.get("tool_call_id"): _text(message.get("content")) for message in after
+               if message.get("role") == "tool"}
+    answer = results.get("call_0_0", str(a + b))
+    return {"role": "assistant", "content": f"The sum of {a} and {b} is {answer}."}
+
+
+class MockLLM:
+    def __init__(self, behavior: Behavior):
+        self.behavior = behavior
+        self.requests = 0
+        self.tool_calls = 0
+
+    async def models(self, request: Request) -> JSONResponse:
+        return JSONResponse({"object": "list", "data": [{"id": self.behavior.model, "object": "model", "owned_by": "pymcp"}]})
+
+    async def stats(self, request: Request) -> JSONResponse:
+        return JSONResponse({"requests": self.requests, "tool_calls": self.tool_calls})
+
+    async def completions(self, request: Request):
+        body = await request.json()
+        message = reply(body.get("messages", []), body.get("tools"), self.behavior)
+        self.requests += 1
+        self.tool_calls += len(message.get("tool_calls") or ())
+        if self.behavior.latency:
+            await asyncio.sleep(self.behavior.latency)
+
+        completion_id = f"chatcmpl-{self.requests}"
+        created = int(time.time())
+        model = body.get("model") or self.behavior.model
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        if body.get("stream"):
+            return StreamingResponse(
+                self._stream(completion_id, created, model, message, finish_reason), media_type="text/event-stream"
+            )
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    async def _stream(self, completion_id: str, created: int, model: str, message: dict[str, Any], finish_reason: str):
+        """整条消息放在一个增量中发送，随后是结束块和 [DONE]"""
+
+        def chunk(delta: dict[str, Any], reason: str | None) -> str:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        delta: dict[str, Any] = {"role": "assistant", "content": message["content"]}
+        if message.get("tool_calls"):
+            delta["tool_calls"] = [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]
+        yield chunk(delta, None)
+        yield chunk({}, finish_reason)
+        yield "data: [DONE]\n\n"
+
+
+def create_app(behavior: Behavior) -> Starlette:
+    llm = MockLLM(behavior)
+    return Starlette(routes=[
+        Route("/v1/models", llm.models, methods=["GET"]),
+        Route("/v1/chat/completions", llm.completions, methods=["POST"]),
+        Route("/stats", llm.stats, methods=["GET"]),
+    ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个响应的模拟推理时间 (秒)")
+    parser.add_argument("--calls-per-turn", type=int, default=1, help="每轮并行的sum调用数")
+    parser.add_argument("--turns", type=int, default=1, help="给出最终回答前调用工具的轮数")
+    parser.add_argument("--tool-rate", type=float, default=1.0, help="调用工具的问题比例 (0到1)")
+    parser.add_argument("--model", default="mock")
+    args = parser.parse_args()
+    if args.calls_per_turn < 1 or args.turns < 0 or not 0 <= args.tool_rate <= 1:
+        parser.error("--calls-per-turn must be at least 1, --turns non-negative and --tool-rate between 0 and 1")
+
+    behavior = Behavior(args.latency, args.calls_per_turn, args.turns, args.tool_rate, args.model)
+    uvicorn.run(create_app(behavior), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 import sys
 from pathlib import Path
 
-# 将src/mcp_server目录添加到Python路径中
-sys.path.insert(0, str(Path(__file__).parent / "src" / "mcp_server"))
+# 将src目录添加到Python路径中
+sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-from server import run
+from mcp_server import run_server
 
 
 def main():
-    print("Starting pymcp server...")
-    run()
+    # stdio方式下标准输出用于JSON-RPC消息，提示信息输出到标准错误
+    print("Starting pymcp server...", file=sys.stderr)
+    # 默认运行sum_int服务器，其余参数原样传递，例如: python main.py sse --workers 4
+    run_server(["sum_int", *sys.argv[1:]])
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,31 +5,58 @@ Each server demonstrates a single feature and can be run as a standalone server.
 
 To run a server, use the command:
     uv run server basic_tool sse
+
+Importing this package is cheap: servers are looked up in a static registry and
+only the selected server module is imported when it is run. Each server module
+defines run(transport, **options), which applies every command line option.
 """
 
 import importlib
 import sys
 from typing import Literal, cast
 
+from .registry import SERVERS
+
 
-def run_server():
+def run_server(argv: list[str] | None = None):
     """Run a server by name with optional transport.
 
-    Usage: server <server-name> [transport]
-    Example: server basic_tool sse
+    Usage: server <server-name> [transport] [options]
+    Example: server basic_tool sse --workers 4
     """
-    if len(sys.argv) < 2:
-        print("Usage: server <server-name> [transport]")
-        print("Available servers: sum_init")
-        print("Available transports: stdio (default), sse, streamable-http")
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in SERVERS:
+        if argv and not argv[0].startswith("-"):
+            print(f"Error: Server '{argv[0]}' not found")
+        print("Usage: server <server-name> [transport] [options]  (server <server-name> --help for options)")
+        print(f"Available servers: {', '.join(SERVERS)}")
+        print("Available transports: stdio (default), sse, streamable-http, shm")
         sys.exit(1)
 
-    server_name = sys.argv[1]
-    transport = sys.argv[2] if len(sys.argv) > 2 else "stdio"
+    from .cli import parse_args
 
-    try:
-        module = importlib.import_module(f".{server_name}", package=__name__)
-        module.mcp.run(cast(Literal["stdio", "sse", "streamable-http"], transport))
-    except ImportError:
-        print(f"Error: Server '{server_name}' not found")
-        sys.exit(1)
\ No newline at end of file
+    args = parse_args(argv, prog="server", with_server=True)
+    module = importlib.import_module(f".{args.server}", package=__name__)
+
+    if not hasattr(module, "run"):
+        # 各项运行选项 (worker、准入控制、剖析、就绪通知等) 都由服务器模块的run入口处理，
+        # 没有run入口时无法保证这些选项生效，直接报错而不是静默忽略
+        print(f"Error: Server '{args.server}' does not define run()")
+        sys.exit(1)
+    module.run(
+        cast(Literal["stdio", "sse", "streamable-http", "shm"], args.transport),
+        workers=args.workers,
+        stateless=args.stateless,
+        ready_fd=args.ready_fd,
+        max_concurrency=args.max_concurrency,
+        max_sessions=args.max_sessions,
+        max_session_requests=args.max_session_requests,
+        max_pending=args.max_pending,
+        session_idle_timeout=args.session_idle_timeout,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        socket_path=args.socket,
+        sse_idle_timeout=args.sse_idle_timeout,
+        sse_heartbeat=args.sse_heartbeat,
+        sse_max_queued=args.sse_max_queued,
+    )
@@ -0,0 +1,355 @@
+"""HTTP传输的准入控制
+
+突发流量下，SSE 和 Streamable HTTP 服务器默认会无限制地接受会话和请求，排队的请求
+不断占用内存。install_admission 按三项上限快速拒绝超出的部分，而不是排队：
+- max_sessions: 同时打开的会话数。新会话 (SSE 的 GET /sse，Streamable HTTP 不带会话ID的POST)
+  超限时返回 HTTP 503 和 Retry-After 头，响应体为 JSON-RPC 错误
+- max_session_requests: 单个会话中尚未响应的请求数
+- max_pending: 当前进程中所有会话尚未响应的请求总数 (全局队列深度)
+后两项超限时，该请求立即得到 JSON-RPC 错误 (code -32003，data.retryAfter 为建议的重试秒数)，
+错误经由会话原本的响应通道返回，客户端按普通的请求错误处理。
+initialize 和 ping 不受请求数限制，保证握手和存活检查总能完成。
+
+SSE会话的名额随事件流请求结束而释放。Streamable HTTP 会话没有常驻的连接，客户端不发 DELETE
+就离开时，SDK不会自行结束会话；新会话到来时，先回收超过 session_idle_timeout 秒没有请求的会话
+(同时结束SDK中的会话) 以及SDK中已经结束的会话，释放它们的名额。
+
+被拒绝的次数按原因计数，可以通过 metrics.admission_collector 导出到 /metrics。
+多进程worker模式下每个worker各自计数和限制。
+"""
+
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.message import SessionMessage
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# JSON-RPC 服务器错误码范围内 (-32000 ~ -32099)，表示服务器过载
+SERVER_OVERLOADED = -32003
+
+# 不受请求数限制的方法
+EXEMPT_METHODS = ("initialize", "ping")
+
+SESSION_ID_HEADER = b"mcp-session-id"
+
+REASONS = ("sessions", "session_requests", "pending")
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """准入上限，None 表示不限制；retry_after 为建议客户端等待的秒数
+
+    session_idle_timeout: Streamable HTTP 会话多少秒没有请求后被回收，None 表示不回收
+    """
+    max_sessions: int | None = 1000
+    max_session_requests: int | None = 100
+    max_pending: int | None = 1000
+    session_idle_timeout: float | None = 300
+    retry_after: int = 1
+
+
+def overload_error(request_id: types.RequestId | None, message: str, retry_after: int) -> types.JSONRPCError:
+    return types.JSONRPCError(
+        jsonrpc="2.0",
+        id=request_id if request_id is not None else "server-error",
+        error=types.ErrorData(code=SERVER_OVERLOADED, message=message, data={"retryAfter": retry_after}),
+    )
+
+
+class _SessionRequests:
+    """包装一个会话的读写流：读取时拒绝超限的请求，写出响应时释放计数"""
+
+    def __init__(self, control: "AdmissionControl", read_stream: Any, write_stream: Any):
+        self._control = control
+        self._read_stream = read_stream
+        self._write_stream = write_stream
+        self._pending: set[types.RequestId] = set()
+        self.reader = _ReadStream(self)
+        self.writer = _WriteStream(self)
+
+    def _admit(self, request: types.JSONRPCRequest) -> str | None:
+        """返回拒绝原因，允许时登记为未响应的请求"""
+        control = self._control
+        limits = control.limits
+        if request.method in EXEMPT_METHODS:
+            return None
+        if limits.max_session_requests is not None and len(self._pending) >= limits.max_session_requests:
+            return "session_requests"
+        if limits.max_pending is not None and control.pending >= limits.max_pending:
+            return "pending"
+        self._pending.add(request.id)
+        control.pending += 1
+        return None
+
+    async def next_message(self, message: Any) -> bool:
+        """处理一条读到的消息，返回是否交给会话"""
+        root = getattr(getattr(message, "message", None), "root", None)
+        if not isinstance(root, types.JSONRPCRequest):
+            return True
+        reason = self._admit(root)
+        if reason is None:
+            return True
+        control = self._control
+        control.rejected[reason] += 1
+        description = {
+            "session_requests": "too many requests in flight for this session",
+            "pending": "too many requests in flight",
+        }[reason]
+        error = overload_error(root.id, f"Server overloaded: {description}", control.limits.retry_after)
+        await self._write_stream.send(SessionMessage(types.JSONRPCMessage(error)))
+        return False
+
+    def released(self, message: Any) -> None:
+        root = getattr(getattr(message, "message", None), "root", None)
+        if isinstance(root, types.JSONRPCResponse | types.JSONRPCError) and root.id in self._pending:
+            self._pending.discard(root.id)
+            self._control.pending -= 1
+
+    def close(self) -> None:
+        """会话结束时释放尚未响应的请求"""
+        self._control.pending -= len(self._pending)
+        self._pending.clear()
+
+
+class _ReadStream:
+    def __init__(self, requests: _SessionRequests):
+        self._requests = requests
+        self._stream = requests._read_stream
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            message = await self._stream.__anext__()
+            if await self._requests.next_message(message):
+                return message
+
+    async def receive(self):
+        while True:
+            message = await self._stream.receive()
+            if await self._requests.next_message(message):
+                return message
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _WriteStream:
+    def __init__(self, requests: _SessionRequests):
+        self._requests = requests
+        self._stream = requests._write_stream
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    async def send(self, message: Any) -> None:
+        await self._stream.send(message)
+        self._requests.released(message)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class AdmissionControl:
+    """一个FastMCP实例的准入状态和拒绝计数"""
+
+    def __init__(self, mcp: FastMCP, limits: AdmissionLimits, clock: Callable[[], float] = time.monotonic):
+        self.mcp = mcp
+        self.limits = limits
+        self.clock = clock
+        # SSE 为打开中的事件流，Streamable HTTP 为已建立的会话ID加上进行中的初始化请求
+        self.sse_sessions = 0
+        # Streamable HTTP 会话ID -> 最近一次请求结束的时间；_http_active 为会话中进行中的请求数
+        self.http_sessions: dict[str, float] = {}
+        self._http_active: dict[str, int] = {}
+        self.http_initializing = 0
+        self.pending = 0
+        self.rejected = dict.fromkeys(REASONS, 0)
+        self.expired = 0
+
+    @property
+    def sessions(self) -> int:
+        return self.sse_sessions + len(self.http_sessions) + self.http_initializing
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": self.sessions, "pending": self.pending,
+            "rejected": dict(self.rejected), "expired": self.expired,
+        }
+
+    def _drop(self, session_id: str) -> None:
+        self.http_sessions.pop(session_id, None)
+        self._http_active.pop(session_id, None)
+
+    async def reap_http_sessions(self, session_manager: Any) -> None:
+        """回收空闲超时的会话和SDK中已经结束的会话"""
+        timeout = self.limits.session_idle_timeout
+        instances = session_manager._server_instances
+        now = self.clock()
+        for session_id, last_active in list(self.http_sessions.items()):
+            transport = instances.get(session_id)
+            if transport is None or transport.is_terminated:
+                # SDK不会从表中移除已终止的传输，这里一并清理
+                instances.pop(session_id, None)
+                self._drop(session_id)
+            elif timeout is not None and not self._http_active.get(session_id) and now - last_active > timeout:
+                instances.pop(session_id, None)
+                self._drop(session_id)
+                self.expired += 1
+                await transport.terminate()
+
+    def instrument_sessions(self) -> None:
+        """包装底层Server的会话循环，对每个会话的请求计数"""
+        server = self.mcp._mcp_server
+        original_run = server.run
+
+        async def run(read_stream, write_stream, *args, **kwargs):
+            requests = _SessionRequests(self, read_stream, write_stream)
+            try:
+                return await original_run(requests.reader, requests.writer, *args, **kwargs)
+            finally:
+                requests.close()
+
+        server.run = run
+
+    def wrap(self, app: ASGIApp, session_manager: Any = None) -> ASGIApp:
+        return _AdmissionMiddleware(app, self, session_manager)
+
+
+class _AdmissionMiddleware:
+    """ASGI中间件：新会话超过 max_sessions 时返回503"""
+
+    def __init__(self, app: ASGIApp, control: AdmissionControl, session_manager: Any = None):
+        self.app = app
+        self.control = control
+        # Streamable HTTP 应用的 StreamableHTTPSessionManager，用于回收会话
+        self.session_manager = session_manager
+        settings = control.mcp.settings
+        self.sse_path = settings.sse_path
+        self.http_path = settings.streamable_http_path
+
+    def _full(self) -> bool:
+        limit = self.control.limits.max_sessions
+        return limit is not None and self.control.sessions >= limit
+
+    async def _reject(self, send: Send) -> None:
+        control = self.control
+        control.rejected["sessions"] += 1
+        retry_after = control.limits.retry_after
+        error = overload_error(None, "Server overloaded: too many sessions", retry_after)
+        body = json.dumps(error.model_dump(by_alias=True, exclude_none=True)).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        control = self.control
+        if method == "GET" and path == self.sse_path:
+            if self._full():
+                await self._reject(send)
+                return
+            # SSE会话的生命周期就是这个事件流请求
+            control.sse_sessions += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                control.sse_sessions -= 1
+            return
+
+        if path == self.http_path and not control.mcp.settings.stateless_http:
+            session_id = dict(scope["headers"]).get(SESSION_ID_HEADER)
+            if method == "POST" and session_id is None:
+                await self._initialize(scope, receive, send)
+                return
+            if session_id is not None and session_id.decode("latin-1") in control.http_sessions:
+                await self._session_request(session_id.decode("latin-1"), method, scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+    async def _session_request(self, session_id: str, method: str, scope: Scope, receive: Receive, send: Send) -> None:
+        """已建立的会话中的请求：进行中的会话不会被回收，DELETE后释放名额"""
+        control = self.control
+        control._http_active[session_id] = control._http_active.get(session_id, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if session_id in control.http_sessions:
+                control._http_active[session_id] -= 1
+                control.http_sessions[session_id] = control.clock()
+        if method == "DELETE":
+            if self.session_manager is not None:
+                self.session_manager._server_instances.pop(session_id, None)
+            control._drop(session_id)
+
+    async def _initialize(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """不带会话ID的POST会创建新会话，从响应头中记录分配的会话ID"""
+        control = self.control
+        if self.session_manager is not None:
+            await control.reap_http_sessions(self.session_manager)
+        if self._full():
+            await self._reject(send)
+            return
+
+        initializing = True
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal initializing
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                session_id = dict(message.get("headers", ())).get(SESSION_ID_HEADER)
+                if session_id is not None:
+                    # 名额从"初始化中"转给已建立的会话，避免在请求结束前被计算两次
+                    control.http_sessions[session_id.decode("latin-1")] = control.clock()
+                    control.http_initializing -= 1
+                    initializing = False
+            await send(message)
+
+        control.http_initializing += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if initializing:
+                control.http_initializing -= 1
+
+
+def install_admission(mcp: FastMCP, limits: AdmissionLimits | None = None) -> AdmissionControl:
+    """为FastMCP实例的HTTP应用启用准入控制
+
+    替换实例上的 sse_app/streamable_http_app，之后创建的应用 (包括多进程worker中的) 都会经过检查。
+    """
+    control = AdmissionControl(mcp, limits or AdmissionLimits())
+    control.instrument_sessions()
+    sse_app, streamable_http_app = mcp.sse_app, mcp.streamable_http_app
+    mcp.sse_app = lambda *args, **kwargs: control.wrap(sse_app(*args, **kwargs))
+    # FastMCP.streamable_http_app() 创建应用时同时创建 _session_manager
+    mcp.streamable_http_app = lambda: control.wrap(streamable_http_app(), mcp._session_manager)
+    return control
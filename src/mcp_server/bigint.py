@@ -0,0 +1,101 @@
+"""大整数的编码与解码
+
+JSON中的整数超过2^53后，很多客户端 (JavaScript等) 会丢失精度，
+因此大整数以字符串形式传输，支持两种编码：
+- decimal: 十进制字符串，可带正负号
+- base64: 小端序、二进制补码的字节串再做base64编码，解码和编码都是线性时间
+
+CPython 的 int(str)/str(int) 对长数字是平方复杂度，并且默认限制最多4300位
+(sys.get_int_max_str_digits)。这里用分治法转换：把数字拆成高低两半分别转换，
+再用 10**k 的乘法/除法合并，复杂度取决于大整数乘法 (Karatsuba)，
+每一段都不超过位数限制，因此不需要修改全局设置。
+"""
+
+import base64
+import binascii
+from functools import lru_cache
+from typing import Literal
+
+Encoding = Literal["decimal", "base64"]
+
+# 低于该位数时直接使用内置转换，需小于默认的 int_max_str_digits (4300)
+_DIRECT_DIGITS = 2048
+
+
+@lru_cache(maxsize=64)
+def _pow10(exponent: int) -> int:
+    """分治过程中反复用到相同的10的幂，缓存起来避免重复计算"""
+    return 10**exponent
+
+
+def parse_decimal(text: str) -> int:
+    """把十进制字符串转换为整数，长数字使用分治法"""
+    digits = text[1:] if text[:1] in ("+", "-") else text
+    if not digits or not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"Invalid decimal integer: {text[:32]!r}")
+    value = _parse_digits(digits)
+    return -value if text[0] == "-" else value
+
+
+def _parse_digits(digits: str) -> int:
+    if len(digits) <= _DIRECT_DIGITS:
+        return int(digits)
+    # 低半部分的长度取2的幂乘以基础块长度，使不同长度的输入能复用缓存的10的幂
+    low_len = _DIRECT_DIGITS
+    while low_len * 2 < len(digits):
+        low_len *= 2
+    high, low = digits[:-low_len], digits[-low_len:]
+    return _parse_digits(high) * _pow10(low_len) + _parse_digits(low)
+
+
+def format_decimal(value: int) -> str:
+    """把整数转换为十进制字符串，大数使用分治法"""
+    if value < 0:
+        return "-" + _format_digits(-value)
+    return _format_digits(value)
+
+
+def _format_digits(value: int, width: int = 0) -> str:
+    """转换非负整数，width大于0时左侧补零到指定位数 (作为低半部分时需要)"""
+    # 十进制位数的下界：bit_length * log10(2)
+    digits = int(value.bit_length() * 0.30103)
+    if digits <= _DIRECT_DIGITS:
+        text = str(value)
+        return text.zfill(width) if width else text
+    low_len = _DIRECT_DIGITS
+    while low_len * 2 < digits:
+        low_len *= 2
+    high, low = divmod(value, _pow10(low_len))
+    return _format_digits(high, max(width - low_len, 0)) + _format_digits(low, low_len)
+
+
+def decode_base64(text: str) -> int:
+    """解码base64编码的小端序二进制补码整数"""
+    try:
+        data = base64.b64decode(text, validate=True)
+    except binascii.Error as exc:
+        raise ValueError(f"Invalid base64 integer: {exc}") from None
+    if not data:
+        raise ValueError("Invalid base64 integer: empty buffer")
+    return int.from_bytes(data, "little", signed=True)
+
+
+def encode_base64(value: int) -> str:
+    """编码为小端序二进制补码整数的base64，使用能表示该值的最少字节数"""
+    # 负数按 ~value 计算，额外留出1位符号位
+    length = ((value if value >= 0 else ~value).bit_length() + 8) // 8
+    return base64.b64encode(value.to_bytes(length, "little", signed=True)).decode("ascii")
+
+
+def decode(text: str, encoding: Encoding = "decimal") -> int:
+    """按指定编码解析大整数字符串"""
+    if encoding == "base64":
+        return decode_base64(text)
+    return parse_decimal(text)
+
+
+def encode(value: int, encoding: Encoding = "decimal") -> str:
+    """按指定编码输出大整数字符串"""
+    if encoding == "base64":
+        return encode_base64(value)
+    return format_decimal(value)
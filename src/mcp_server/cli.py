@@ -0,0 +1,157 @@
+"""命令行参数解析
+
+run_server 和各个服务器脚本共用同一套参数定义。
+"""
+
+import argparse
+
+TRANSPORTS = ("stdio", "sse", "streamable-http", "shm")
+HTTP_TRANSPORTS = ("sse", "streamable-http")
+
+
+def build_parser(prog: str | None = None, with_server: bool = False) -> argparse.ArgumentParser:
+    """创建命令行参数解析器
+
+    Args:
+        prog: 程序名称，用于帮助信息
+        with_server: 是否包含服务器名称参数 (run_server使用)
+    """
+    parser = argparse.ArgumentParser(prog=prog)
+    if with_server:
+        parser.add_argument("server", help="服务器名称，例如 sum_int")
+    parser.add_argument(
+        "transport",
+        nargs="?",
+        default="stdio",
+        choices=TRANSPORTS,
+        help="传输方式，默认为 stdio",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker进程数，大于1时启用多进程模式 (仅支持 sse 和 streamable-http)",
+    )
+    parser.add_argument(
+        "--stateless",
+        action="store_true",
+        help="无状态模式：不保存会话，单个结果直接以JSON返回 (仅支持 streamable-http)",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        metavar="N",
+        help="每个进程同时执行的工具调用数上限，超出的调用排队等待 (默认32)",
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=None,
+        metavar="N",
+        help="每个进程同时打开的会话数上限，超出时新会话得到503 (仅HTTP传输，默认1000，0表示不限制)",
+    )
+    parser.add_argument(
+        "--max-session-requests",
+        type=int,
+        default=None,
+        metavar="N",
+        help="单个会话中未响应的请求数上限，超出的请求立即得到过载错误 (仅HTTP传输，默认100，0表示不限制)",
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=None,
+        metavar="N",
+        help="每个进程所有会话未响应的请求总数上限 (仅HTTP传输，默认1000，0表示不限制)",
+    )
+    parser.add_argument(
+        "--session-idle-timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Streamable HTTP会话超过该秒数没有请求时，在新会话到来时回收 (仅streamable-http，默认300，0表示不回收)",
+    )
+    parser.add_argument(
+        "--sse-idle-timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="SSE会话没有收发任何消息超过该秒数后断开 (仅sse，默认300，0表示不断开)",
+    )
+    parser.add_argument(
+        "--sse-heartbeat",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="SSE事件流空闲超过该秒数时发送心跳注释 (仅sse，默认15，0表示不发送)",
+    )
+    parser.add_argument(
+        "--sse-max-queued",
+        type=int,
+        default=None,
+        metavar="N",
+        help="单个SSE会话等待写出的消息数上限，超出时断开会话 (仅sse，默认256，0表示不限制)",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        metavar="PATH",
+        help="shm传输监听的Unix socket路径 (默认读取 PYMCP_SHM_SOCKET，否则为系统临时目录下的 pymcp-shm.sock)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=float,
+        default=None,
+        metavar="RATE",
+        help="剖析被抽中的工具调用 (0到1之间的比例)，记录各阶段耗时并采样调用栈 (默认读取 PYMCP_PROFILE)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        metavar="DIR",
+        help="剖析结果的输出目录 (默认读取 PYMCP_PROFILE_DIR，否则为 ./profiles)",
+    )
+    parser.add_argument(
+        "--ready-fd",
+        type=int,
+        default=None,
+        metavar="FD",
+        help="服务器开始接受连接后向该文件描述符写入 READY=1 并关闭，用于就绪通知",
+    )
+    return parser
+
+
+def parse_args(argv: list[str] | None = None, prog: str | None = None, with_server: bool = False) -> argparse.Namespace:
+    """解析命令行参数并校验参数组合"""
+    parser = build_parser(prog, with_server)
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_concurrency is not None and args.max_concurrency < 1:
+        parser.error("--max-concurrency must be at least 1")
+    if args.profile is not None and not 0 <= args.profile <= 1:
+        parser.error("--profile must be between 0 and 1")
+    for option in ("max_sessions", "max_session_requests", "max_pending"):
+        value = getattr(args, option)
+        if value is not None and value < 0:
+            parser.error(f"--{option.replace('_', '-')} must not be negative")
+        if value is not None and args.transport not in HTTP_TRANSPORTS:
+            parser.error(f"--{option.replace('_', '-')} is only supported for the sse and streamable-http transports")
+    if args.session_idle_timeout is not None and args.session_idle_timeout < 0:
+        parser.error("--session-idle-timeout must not be negative")
+    if args.session_idle_timeout is not None and args.transport != "streamable-http":
+        parser.error("--session-idle-timeout is only supported for the streamable-http transport")
+    for option in ("sse_idle_timeout", "sse_heartbeat", "sse_max_queued"):
+        value = getattr(args, option)
+        if value is not None and value < 0:
+            parser.error(f"--{option.replace('_', '-')} must not be negative")
+        if value is not None and args.transport != "sse":
+            parser.error(f"--{option.replace('_', '-')} is only supported for the sse transport")
+    if args.socket is not None and args.transport != "shm":
+        parser.error("--socket is only supported for the shm transport")
+    if args.workers > 1 and args.transport not in HTTP_TRANSPORTS:
+        parser.error("--workers is only supported for the sse and streamable-http transports")
+    if args.stateless and args.transport != "streamable-http":
+        parser.error("--stateless is only supported for the streamable-http transport")
+    return args
@@ -0,0 +1,278 @@
+"""带连接池的异步MCP客户端
+
+每次调用都打开 streamablehttp_client、创建 ClientSession、initialize 再关闭，
+握手和建立连接的开销远大于一次加法。ClientPool 为每个服务器URL保持若干个已完成握手的会话：
+
+    async with ClientPool(size=4) as pool:
+        result = await pool.call_tool("http://127.0.0.1:8000/mcp", "sum", {"a": 1, "b": 2})
+        tools = await pool.list_tools("http://127.0.0.1:8000/mcp")
+
+- 并发的调用分摊到池中的会话上，每个会话本身也可以同时处理多个请求 (按JSON-RPC id匹配响应)；
+  已有会话都在忙且未达到 size 时才建立新会话
+- list_tools 的结果按URL缓存，服务器发出 tools/list_changed 通知或会话重建后失效；
+  强制刷新时携带上次的 etag，列表未变化时服务器不再返回完整列表
+- 会话断开 (服务器重启、会话被删除、连接关闭) 时丢弃该会话。请求还没有发出时在新会话上重试一次；
+  已经发出的请求可能已在服务器上执行，只有 tools/list 和服务器标注为只读或幂等
+  (readOnlyHint / idempotentHint) 的工具才重试，call_tool 的 retry 参数可以覆盖这一判断。
+  工具本身返回的错误不会重试
+
+会话在池的任务组中运行，因此 ClientPool 需要用 async with 使用。
+"""
+
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import timedelta
+from typing import Any, Literal
+
+import anyio
+import anyio.abc
+import mcp.types as types
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+
+Transport = Literal["streamable-http", "sse"]
+
+# 会话已不可用的错误：连接关闭，或服务器不再认识这个会话ID (SDK使用正数32600表示)
+_CONNECTION_ERRORS = (types.CONNECTION_CLOSED, 32600)
+
+
+def _open_transport(transport: Transport, url: str, headers: dict[str, str] | None) -> AbstractAsyncContextManager:
+    if transport == "sse":
+        from mcp.client.sse import sse_client
+
+        return sse_client(url, headers=headers)
+    from mcp.client.streamable_http import streamablehttp_client
+
+    return streamablehttp_client(url, headers=headers)
+
+
+def _is_disconnect(exc: BaseException) -> bool:
+    if isinstance(exc, McpError):
+        return exc.error.code in _CONNECTION_ERRORS
+    return isinstance(exc, anyio.ClosedResourceError | anyio.BrokenResourceError)
+
+
+class _Connection:
+    """池中的一个会话，在池的任务组中运行，直到被关闭或断开"""
+
+    def __init__(self, pool: "ClientPool", url: str):
+        self.pool = pool
+        self.url = url
+        self.session: ClientSession | None = None
+        self.in_flight = 0
+        self.closed = False
+        self.error: BaseException | None = None
+        self._ready = anyio.Event()
+        self._stop = anyio.Event()
+        # 等待响应的请求；会话意外结束时SDK不一定会通知它们，需要主动取消
+        self._waiters: set[anyio.CancelScope] = set()
+
+    async def run(self) -> None:
+        pool = self.pool
+        try:
+            async with _open_transport(pool.transport, self.url, pool.headers) as streams:
+                async with ClientSession(
+                    streams[0], streams[1], read_timeout_seconds=pool.timeout, message_handler=self._on_message
+                ) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.closed = True
+            self._ready.set()
+            for scope in self._waiters:
+                scope.cancel()
+            pool._discard(self)
+
+    async def wait_ready(self) -> ClientSession:
+        await self._ready.wait()
+        if self.session is None or self.closed:
+            raise self.error or ConnectionError(f"Failed to connect to {self.url}")
+        return self.session
+
+    async def send(self, send: Callable[[ClientSession], Any]) -> Any:
+        """在会话上发送请求，会话在等待响应期间结束时抛出 anyio.BrokenResourceError"""
+        session = await self.wait_ready()
+        with anyio.CancelScope() as scope:
+            self._waiters.add(scope)
+            self.in_flight += 1
+            try:
+                return await send(session)
+            finally:
+                self.in_flight -= 1
+                self._waiters.discard(scope)
+        raise anyio.BrokenResourceError(f"Session to {self.url} closed while waiting for a response")
+
+    async def _on_message(self, message: Any) -> None:
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            self.pool._tools.pop(self.url, None)
+
+    def close(self) -> None:
+        self.closed = True
+        self._stop.set()
+
+
+class ClientPool:
+    """按服务器URL保持已初始化会话的连接池"""
+
+    def __init__(
+        self,
+        size: int = 4,
+        transport: Transport = "streamable-http",
+        headers: dict[str, str] | None = None,
+        timeout: float | None = 30,
+    ):
+        """
+        Args:
+            size: 每个URL最多保持的会话数
+            transport: "streamable-http" 或 "sse"
+            headers: 建立连接时附带的HTTP请求头
+            timeout: 单个请求等待响应的秒数，None表示不限制
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.transport = transport
+        self.headers = headers
+        self.timeout = timedelta(seconds=timeout) if timeout is not None else None
+        self._connections: dict[str, list[_Connection]] = {}
+        self._opening: dict[str, anyio.Lock] = {}
+        self._tools: dict[str, types.ListToolsResult] = {}
+        self._task_group: anyio.abc.TaskGroup | None = None
+
+    async def __aenter__(self) -> "ClientPool":
+        self._task_group = anyio.create_task_group()
+        await self._task_group.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool | None:
+        self.close()
+        try:
+            return await self._task_group.__aexit__(*exc_info)
+        finally:
+            self._task_group = None
+
+    def close(self) -> None:
+        """关闭所有会话，会话在退出 async with 时结束"""
+        for connections in self._connections.values():
+            for connection in connections:
+                connection.close()
+        self._connections.clear()
+        self._tools.clear()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """按URL返回会话数和进行中的请求数"""
+        return {
+            url: {"sessions": len(connections), "in_flight": sum(c.in_flight for c in connections)}
+            for url, connections in self._connections.items()
+        }
+
+    def _discard(self, connection: _Connection) -> None:
+        connections = self._connections.get(connection.url)
+        if connections and connection in connections:
+            connections.remove(connection)
+            # 新会话上的工具列表可能不同
+            self._tools.pop(connection.url, None)
+
+    def _pick(self, url: str) -> _Connection | None:
+        """选择进行中请求最少的会话；都在忙且还能扩容时返回None"""
+        connections = [c for c in self._connections.get(url, ()) if not c.closed]
+        if not connections:
+            return None
+        connection = min(connections, key=lambda c: c.in_flight)
+        if connection.in_flight and len(connections) < self.size:
+            return None
+        return connection
+
+    async def _acquire(self, url: str, fresh: bool = False) -> _Connection:
+        """取得一个会话，fresh为True时总是建立新会话"""
+        connection = None if fresh else self._pick(url)
+        if connection is not None:
+            return connection
+        if self._task_group is None:
+            raise RuntimeError("ClientPool must be used with 'async with'")
+        lock = self._opening.setdefault(url, anyio.Lock())
+        async with lock:
+            # 等锁期间其他调用可能已经建立了新会话
+            connection = None if fresh else self._pick(url)
+            if connection is not None:
+                return connection
+            connection = _Connection(self, url)
+            self._connections.setdefault(url, []).append(connection)
+            self._task_group.start_soon(connection.run)
+            await connection.wait_ready()
+            return connection
+
+    async def _request(
+        self,
+        url: str,
+        send: Callable[[ClientSession], Any],
+        can_retry: Callable[[], Awaitable[bool]] | None = None,
+    ) -> Any:
+        """发送请求；会话断开时，请求还没有发出或 can_retry 返回True (None表示总是可以) 才重试"""
+        connection = await self._acquire(url)
+        sent = False
+
+        def send_once(session: ClientSession) -> Any:
+            nonlocal sent
+            sent = True
+            return send(session)
+
+        try:
+            return await connection.send(send_once)
+        except Exception as exc:
+            if not _is_disconnect(exc):
+                raise
+            # 会话已断开 (例如服务器重启)，丢弃后在新建立的会话上重试一次；
+            # 池中其他失效的会话在各自下次使用时以同样方式替换
+            connection.close()
+            self._discard(connection)
+            if sent and can_retry is not None and not await can_retry():
+                raise
+        return await (await self._acquire(url, fresh=True)).send(send)
+
+    async def _idempotent(self, url: str, name: str) -> bool:
+        """服务器是否把工具标注为只读或幂等"""
+        tools = await self.list_tools(url)
+        annotations = next((tool.annotations for tool in tools.tools if tool.name == name), None)
+        return annotations is not None and bool(annotations.readOnlyHint or annotations.idempotentHint)
+
+    async def call_tool(
+        self, url: str, name: str, arguments: dict[str, Any] | None = None, retry: bool | None = None,
+    ) -> types.CallToolResult:
+        """在池中的会话上调用工具
+
+        retry: 请求发出后会话断开时是否在新会话上重试。None时只重试服务器标注为只读或幂等的工具
+            (在新会话上确认工具列表)；其他工具 (例如 sum_stream_push) 重试可能被执行两次，
+            这时抛出断开的错误，由调用方决定如何处理。
+        """
+
+        async def can_retry() -> bool:
+            return retry if retry is not None else await self._idempotent(url, name)
+
+        return await self._request(url, lambda session: session.call_tool(name, arguments), can_retry)
+
+    async def list_tools(self, url: str, refresh: bool = False) -> types.ListToolsResult:
+        """返回服务器的工具列表，结果会被缓存
+
+        refresh为True时向服务器确认，服务器支持 etag (见 tool_list.py) 且列表未变化时继续使用缓存的结果。
+        """
+        cached = self._tools.get(url)
+        if cached is not None and not refresh:
+            return cached
+        etag = (cached.meta or {}).get("etag") if cached is not None else None
+        if etag is None:
+            result = await self._request(url, lambda session: session.list_tools())
+        else:
+            request = types.ClientRequest(types.ListToolsRequest(
+                method="tools/list", params=types.PaginatedRequestParams(_meta={"ifNoneMatch": etag})))
+            result = await self._request(url, lambda session: session.send_request(request, types.ListToolsResult))
+            if (result.meta or {}).get("notModified"):
+                return cached
+        self._tools[url] = result
+        return result
@@ -0,0 +1,101 @@
+"""可替换的JSON编解码器
+
+get_codec 按 PYMCP_JSON_CODEC 环境变量选择编解码器：
+- auto (默认): 依次尝试 orjson、msgspec，都未安装时使用标准库 json
+- orjson / msgspec / json: 指定实现，未安装时报错
+
+所有编解码器输出紧凑的JSON (无多余空格)。加速实现无法处理的值
+(例如 orjson 不支持超过64位的整数) 会自动回退到标准库。
+
+编解码器用于stdio传输的JSON-RPC消息 (见 transport.py)、工具结果的文本内容
+(见 tool_runner.py)、缓存键的参数规范化和进程池的消息转发。
+本模块不依赖MCP SDK，可以在不导入SDK的进程中使用。
+"""
+
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+CODECS = ("auto", "orjson", "msgspec", "json")
+
+
+class JsonCodec:
+    """标准库json实现，同时作为其他实现的回退"""
+
+    name = "json"
+
+    def dumps(self, obj: Any, sort_keys: bool = False) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys)
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def dumps(self, obj: Any, sort_keys: bool = False) -> str:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+        except TypeError:
+            # 超过64位的整数等orjson不支持的值
+            return super().dumps(obj, sort_keys)
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._sorted_encoder = msgspec.json.Encoder(order="sorted")
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any, sort_keys: bool = False) -> str:
+        encoder = self._sorted_encoder if sort_keys else self._encoder
+        try:
+            return encoder.encode(obj).decode()
+        except (TypeError, OverflowError):
+            return super().dumps(obj, sort_keys)
+
+    def loads(self, data: str | bytes) -> Any:
+        return self._decoder.decode(data)
+
+
+_codec: JsonCodec | None = None
+
+
+def get_codec(name: str | None = None) -> JsonCodec:
+    """返回指定的编解码器，name为None时使用环境变量配置 (结果会被缓存)"""
+    global _codec
+    if name is None and _codec is not None:
+        return _codec
+
+    choice = name or os.environ.get("PYMCP_JSON_CODEC", "auto")
+    if choice not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {choice}, expected one of {', '.join(CODECS)}")
+    if choice in ("auto", "orjson") and orjson is not None:
+        codec = OrjsonCodec()
+    elif choice in ("auto", "msgspec") and msgspec is not None:
+        codec = MsgspecCodec()
+    elif choice in ("auto", "json"):
+        codec = JsonCodec()
+    else:
+        raise ImportError(f"JSON codec {choice} is not installed")
+
+    if name is None:
+        _codec = codec
+    return codec
+
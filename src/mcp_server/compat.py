@@ -0,0 +1,26 @@
+"""针对MCP Python SDK已知问题的兼容处理"""
+
+import logging
+
+import anyio
+
+
+class _StatelessTeardownFilter(logging.Filter):
+    """过滤无状态请求结束时误报的 "Error in message router"
+
+    无状态模式下每个请求处理完都会关闭传输，消息路由任务随之收到
+    ClosedResourceError 并以 logger.exception 记录。这并不是真正的错误，
+    但带富文本traceback的日志每次要耗费上百毫秒，严重拖慢吞吐量。
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.exc_info and isinstance(record.exc_info[1], anyio.ClosedResourceError):
+            return False
+        return True
+
+
+def suppress_stateless_teardown_errors() -> None:
+    """安装无状态模式下的日志过滤器，可重复调用"""
+    logger = logging.getLogger("mcp.server.streamable_http")
+    if not any(isinstance(f, _StatelessTeardownFilter) for f in logger.filters):
+        logger.addFilter(_StatelessTeardownFilter())
@@ -0,0 +1,109 @@
+"""工具的执行策略
+
+用 @execution 声明同步工具在哪里执行，ToolRunner 按策略调度：
+- inline: 直接在事件循环上执行，适合加法这类微秒级的工具，省去线程切换
+- thread (默认): 在线程池中执行，不阻塞事件循环，适合会释放GIL或耗时较短的工具
+- process: 在共享的进程池中执行，适合长时间占用GIL的CPU密集型工具；
+  参数和结果需要可以pickle，工具函数必须定义在模块顶层
+
+    @mcp.tool()
+    @execution("process", timeout=30)
+    def sum_big(a: str, b: str) -> str:
+        ...
+
+timeout 限制单次调用的总耗时 (包括排队时间)，超时后向客户端返回错误。
+线程和进程无法被强制中断，超时的调用会在后台执行完毕后释放资源。
+异步工具总是在事件循环上执行，只支持 timeout。
+"""
+
+import asyncio
+import inspect
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Literal
+
+Mode = Literal["inline", "thread", "process"]
+MODES = ("inline", "thread", "process")
+
+
+@dataclass(frozen=True)
+class ExecutionPolicy:
+    """执行策略：执行位置和超时时间 (秒，None 表示不限制)"""
+    mode: Mode = "thread"
+    timeout: float | None = None
+
+
+DEFAULT_POLICY = ExecutionPolicy()
+
+
+def execution(mode: Mode = "thread", timeout: float | None = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """声明工具函数的执行策略，放在 @mcp.tool() 下面使用"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown execution mode: {mode}, expected one of {', '.join(MODES)}")
+    if timeout is not None and timeout <= 0:
+        raise ValueError("timeout must be positive")
+    if mode == "inline" and timeout is not None:
+        raise ValueError("inline tools run on the event loop and cannot time out")
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        fn.__pymcp_execution__ = ExecutionPolicy(mode, timeout)
+        return fn
+
+    return decorator
+
+
+def execution_policy(fn: Callable[..., Any]) -> ExecutionPolicy:
+    """读取函数上的执行策略，未声明时返回默认策略 (thread，不限时)"""
+    return getattr(inspect.unwrap(fn), "__pymcp_execution__", DEFAULT_POLICY)
+
+
+def _call(fn: Callable[..., Any], kwargs: dict[str, Any]) -> Any:
+    return fn(**kwargs)
+
+
+class ProcessPool:
+    """所有 process 策略的工具共享的进程池，首次使用时创建
+
+    使用spawn方式启动子进程：服务器进程已经有事件循环和线程池的线程，fork可能继承被锁住的锁。
+    子进程按模块名导入工具函数，每个子进程只在启动时导入一次。
+    子进程异常退出 (被OOM杀死、段错误) 后进程池不再可用，丢弃它，下一次调用重新创建。
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def run(self, fn: Callable[..., Any], kwargs: dict[str, Any]) -> Any:
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_call, fn, kwargs)
+        except BrokenProcessPool:
+            # 空闲时子进程已经退出：调用还没有执行，换一个新的进程池提交
+            self._discard(executor)
+            future = self._get_executor().submit(_call, fn, kwargs)
+        try:
+            # 等待被取消 (超时) 时，尚未开始执行的任务会从进程池队列中移除
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # 执行中子进程退出：这次调用可能就是原因 (如内存耗尽)，不重试，只保证之后的调用可用
+            self._discard(executor)
+            raise
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # 并发的调用可能已经换了新的进程池，只丢弃出错的那个
+        executor.shutdown(wait=False, cancel_futures=True)
+        if self._executor is executor:
+            self._executor = None
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._discard(self._executor)
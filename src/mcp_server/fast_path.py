@@ -0,0 +1,94 @@
+"""简单类型工具的参数校验快速路径
+
+ToolRunner 的通用路径对每次调用做 JSON Schema 校验、pydantic 参数模型校验、
+结果的 pydantic 包装和输出 JSON Schema 校验，对 sum(a: int, b: int) 这类工具来说远超过加法本身。
+参数和返回值都是 int/float/str/bool 的工具可以用 @fast_path 开启快速路径：
+
+    @mcp.tool()
+    @fast_path
+    def sum(a: int, b: int) -> int:
+        ...
+
+- 参数: 逐个检查必填项和值的类型 (type(value) is int 等)，缺省的参数使用默认值
+- 结果: 类型与声明一致时直接生成 {"result": value} 和文本内容，跳过输出模型和输出schema校验
+
+快速检查只接受明确合法的输入：缺少参数、类型不符、bool传给int、超出float精确范围的整数等
+任何不确定的情况都回到通用路径，因此错误信息和返回结构与通用路径完全一致。
+"""
+
+import inspect
+import math
+from collections.abc import Callable
+from typing import Any
+
+from mcp.server.fastmcp.tools import Tool
+from pydantic_core import PydanticUndefined
+
+PRIMITIVE_TYPES = (int, float, str, bool)
+
+# float参数接受的整数范围：超出后 float() 不再精确，交给通用路径
+_FLOAT_EXACT = 2**53
+
+_MISSING = object()
+
+
+def fast_path(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """为参数和返回值都是简单类型的工具开启快速路径，放在 @mcp.tool() 下面使用"""
+    fn.__pymcp_fast_path__ = True
+    return fn
+
+
+def wants_fast_path(fn: Callable[..., Any]) -> bool:
+    """读取函数是否声明了 @fast_path，兼容被装饰器包装过的函数"""
+    return getattr(inspect.unwrap(fn), "__pymcp_fast_path__", False)
+
+
+class FastPath:
+    """一个工具预先编译好的参数检查和结果编码"""
+
+    def __init__(self, tool: Tool):
+        metadata = tool.fn_metadata
+        if tool.context_kwarg is not None:
+            raise ValueError(f"Tool {tool.name} takes a Context and cannot use the fast path")
+        # (参数名, 类型, 默认值)，必填参数的默认值为 _MISSING
+        self.params: list[tuple[str, type, Any]] = []
+        for name, field in metadata.arg_model.model_fields.items():
+            if field.annotation not in PRIMITIVE_TYPES or (field.alias and field.alias != name):
+                raise ValueError(f"Tool {tool.name} parameter {name} is not a plain int/float/str/bool")
+            if field.default_factory is not None:
+                raise ValueError(f"Tool {tool.name} parameter {name} uses a default factory")
+            default = _MISSING if field.default is PydanticUndefined else field.default
+            self.params.append((name, field.annotation, default))
+
+        self.result_type: type | None = None
+        if metadata.output_model is not None and metadata.wrap_output:
+            annotation = metadata.output_model.model_fields["result"].annotation
+            if annotation in PRIMITIVE_TYPES:
+                self.result_type = annotation
+        if self.result_type is None:
+            raise ValueError(f"Tool {tool.name} must return a plain int/float/str/bool to use the fast path")
+
+    def parse(self, arguments: dict[str, Any]) -> dict[str, Any] | None:
+        """返回调用参数；不是明确合法的输入时返回None，由通用路径处理"""
+        kwargs = {}
+        for name, kind, default in self.params:
+            value = arguments.get(name, _MISSING)
+            if value is _MISSING:
+                if default is _MISSING:
+                    return None
+                kwargs[name] = default
+            elif type(value) is kind:
+                kwargs[name] = value
+            elif kind is float and type(value) is int and -_FLOAT_EXACT <= value <= _FLOAT_EXACT:
+                kwargs[name] = float(value)
+            else:
+                return None
+        return kwargs
+
+    def encode(self, result: Any, dumps: Callable[[Any], str]) -> tuple[str, dict[str, Any]] | None:
+        """返回 (文本内容, 结构化结果)；结果类型与声明不一致时返回None，由通用路径转换和校验"""
+        kind = type(result)
+        if kind is not self.result_type or (kind is float and not math.isfinite(result)):
+            return None
+        text = result if kind is str else dumps(result)
+        return text, {"result": result}
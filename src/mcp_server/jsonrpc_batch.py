@@ -0,0 +1,446 @@
+"""JSON-RPC 批量请求
+
+客户端需要很多个 sum 结果时，每次调用一条消息要各自承担分帧、分派以及HTTP请求的开销。
+install_batching 让服务器在所有传输上接受JSON-RPC批量数组：数组中的请求并发执行，
+全部完成后以一个数组返回响应 (按请求在数组中的顺序)：
+- stdio / shm: 传输把数组解析为 JSONRPCBatch 交给会话，底层Server的会话循环在这里展开
+- sse: POST到消息路径的数组直接放入对应会话的读取流，批量响应作为一条事件发出
+- streamable-http: 数组中的每个元素作为独立的POST在进程内分派给原应用，
+  响应合并为一个JSON数组返回
+
+与 JSON-RPC 2.0 规范一致：
+- 通知没有响应，只含通知的批量不返回任何内容 (HTTP 202)
+- 空数组返回单个 Invalid Request 错误；无效的元素、批量中的 initialize 和重复的请求ID
+  各自得到 Invalid Request 错误，不影响其他元素
+- 响应只带请求ID，因此同一会话中未响应的请求ID必须唯一：与进行中的批量元素ID相同的单个请求、
+  与进行中的单个请求ID相同的批量元素，都直接得到 duplicate request id 错误
+- 批量中的请求仍逐个经过准入控制和工具执行的并发限制；为避免一个大批量占满队列，
+  每个会话同时执行的批量元素不超过 max_concurrency 个，其余元素等待空位后再分派
+"""
+
+import json
+from typing import Any
+from uuid import UUID
+
+import anyio
+import anyio.lowlevel
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.message import ServerMessageMetadata, SessionMessage
+from pydantic import RootModel, ValidationError
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from .codec import get_codec
+except ImportError:
+    from codec import get_codec
+
+# 每个会话同时执行的批量元素数上限
+MAX_CONCURRENCY = 64
+
+# 元素没有可用的请求ID时错误响应使用的ID (与SDK和准入控制一致)
+NO_ID = "server-error"
+
+
+class JSONRPCBatch(RootModel[list[Any]]):
+    """JSON-RPC 批量数组：收到时元素尚未校验，发出时元素是已经序列化的响应"""
+
+
+def is_batch(data: str | bytes) -> bool:
+    return data.lstrip()[:1] in (b"[", "[")
+
+
+def _error(request_id: Any, message: str, code: int = types.INVALID_REQUEST) -> types.JSONRPCError:
+    if not isinstance(request_id, str | int) or isinstance(request_id, bool):
+        request_id = NO_ID
+    return types.JSONRPCError(jsonrpc="2.0", id=request_id, error=types.ErrorData(code=code, message=message))
+
+
+def _dump(message: types.JSONRPCError | types.JSONRPCResponse) -> dict[str, Any]:
+    return message.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+
+def parse_item(item: Any) -> types.JSONRPCMessage | types.JSONRPCError:
+    """校验批量中的一个元素，无效时返回对应的错误响应"""
+    request_id = item.get("id") if isinstance(item, dict) else None
+    try:
+        message = types.JSONRPCMessage.model_validate(item)
+    except ValidationError:
+        return _error(request_id, "Invalid Request")
+    if isinstance(message.root, types.JSONRPCRequest) and message.root.method == "initialize":
+        return _error(request_id, "Invalid Request: initialize cannot be part of a batch")
+    return message
+
+
+def empty_batch_error() -> types.JSONRPCMessage:
+    return types.JSONRPCMessage(_error(None, "Invalid Request: empty batch"))
+
+
+class _Batch:
+    """一个批量的响应槽位，按请求在数组中的顺序排列"""
+
+    def __init__(self):
+        self.results: list[dict[str, Any] | None] = []
+        self.remaining = 0
+        # 所有元素都已分派，剩余的请求全部响应后即可发出
+        self.dispatched = False
+        self.sent = False
+
+    def add(self, result: dict[str, Any] | None = None) -> int:
+        self.results.append(result)
+        if result is None:
+            self.remaining += 1
+        return len(self.results) - 1
+
+    def fill(self, slot: int, result: dict[str, Any]) -> None:
+        self.results[slot] = result
+        self.remaining -= 1
+
+    def ready(self) -> bool:
+        return self.dispatched and not self.remaining and not self.sent
+
+
+class _SessionBatches:
+    """包装一个会话的读写流：读取时展开批量数组，写出时把批量元素的响应合并为一个数组"""
+
+    def __init__(self, write_stream: Any, max_concurrency: int):
+        self._write_stream = write_stream
+        self._slots = anyio.Semaphore(max_concurrency)
+        # 请求ID -> (所属批量, 槽位)
+        self._pending: dict[types.RequestId, tuple[_Batch, int]] = {}
+        # 尚未响应的单个 (批量之外的) 请求ID
+        self._inflight: set[types.RequestId] = set()
+        self.writer = _WriteStream(self)
+
+    async def pump(self, read_stream: Any, send: Any) -> None:
+        """把原读取流中的消息转交给会话，批量在独立的任务中逐个分派"""
+        try:
+            async with read_stream, send, anyio.create_task_group() as tg:
+                async for message in read_stream:
+                    if isinstance(message, SessionMessage) and isinstance(message.message, JSONRPCBatch):
+                        tg.start_soon(self._dispatch, message, send)
+                        continue
+                    root = getattr(getattr(message, "message", None), "root", None)
+                    if isinstance(root, types.JSONRPCRequest):
+                        if root.id in self._pending:
+                            # 响应会被当作批量元素的响应，单个请求的调用方永远等不到结果
+                            error = _error(root.id, "Invalid Request: duplicate request id")
+                            await self._write_stream.send(SessionMessage(types.JSONRPCMessage(error)))
+                            continue
+                        self._inflight.add(root.id)
+                    await send.send(message)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    async def _dispatch(self, message: SessionMessage, send: Any) -> None:
+        items = message.message.root
+        if not items:
+            await self._write_stream.send(SessionMessage(empty_batch_error()))
+            return
+        batch = _Batch()
+        seen: set[types.RequestId] = set()
+        for item in items:
+            parsed = parse_item(item)
+            if isinstance(parsed, types.JSONRPCError):
+                batch.add(_dump(parsed))
+                continue
+            root = parsed.root
+            if isinstance(root, types.JSONRPCRequest):
+                # 同一批量中的ID，或者与尚未响应的请求重复
+                if root.id in seen or root.id in self._pending or root.id in self._inflight:
+                    batch.add(_dump(_error(root.id, "Invalid Request: duplicate request id")))
+                    continue
+                seen.add(root.id)
+                # 等待空位，响应写出时释放
+                await self._slots.acquire()
+                self._pending[root.id] = (batch, batch.add())
+            await send.send(SessionMessage(parsed, metadata=message.metadata))
+        batch.dispatched = True
+        await self._flush(batch)
+
+    async def _flush(self, batch: _Batch) -> None:
+        if batch.ready():
+            batch.sent = True
+            if batch.results:
+                await self._write_stream.send(SessionMessage(JSONRPCBatch(batch.results)))
+
+    async def send(self, message: Any) -> None:
+        root = getattr(getattr(message, "message", None), "root", None)
+        if isinstance(root, types.JSONRPCResponse | types.JSONRPCError):
+            entry = self._pending.pop(root.id, None)
+            if entry is not None:
+                self._slots.release()
+                batch, slot = entry
+                batch.fill(slot, _dump(root))
+                await self._flush(batch)
+                return
+            self._inflight.discard(root.id)
+        await self._write_stream.send(message)
+
+
+class _WriteStream:
+    def __init__(self, batches: _SessionBatches):
+        self._batches = batches
+        self._stream = batches._write_stream
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    async def send(self, message: Any) -> None:
+        await self._batches.send(message)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    """先返回已读取的请求体，之后交回原receive (等待断开连接)"""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+def _sse_events(body: bytes) -> list[Any]:
+    return [
+        json.loads(line[5:]) for line in body.decode().splitlines()
+        if line.startswith("data:") and line[5:].strip()
+    ]
+
+
+def find_sse_transport(app: Any) -> tuple[str, Any] | None:
+    """在 FastMCP.sse_app() 创建的应用中找到消息路径和处理它的 SseServerTransport
+
+    SDK没有公开这个对象；外层的ASGI中间件 (带 .app 属性) 会被跳过。
+    """
+    while not hasattr(app, "routes") and hasattr(app, "app"):
+        app = app.app
+    for route in getattr(app, "routes", ()):
+        handler = getattr(route, "app", None)
+        if getattr(handler, "__name__", None) == "handle_post_message":
+            return route.path.rstrip("/"), handler.__self__
+    return None
+
+
+class _BatchMiddleware:
+    """ASGI中间件：SSE 和 Streamable HTTP 的POST请求体为数组时按批量处理"""
+
+    def __init__(self, app: ASGIApp, mcp: FastMCP, max_concurrency: int):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.http_path = mcp.settings.streamable_http_path
+        # SSE应用的消息路径 (多进程worker模式下每个worker不同) 和处理它的传输
+        self.sse_path, self.sse_transport = find_sse_transport(app) or (None, None)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path == self.http_path:
+            handle = self._http_batch
+        elif self.sse_path is not None and path.rstrip("/") == self.sse_path:
+            handle = self._sse_batch
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        replay = _replay(body, receive)
+        if not is_batch(body):
+            await self.app(scope, replay, send)
+            return
+        try:
+            items = json.loads(body)
+        except ValueError:
+            # 交给原应用返回解析错误
+            await self.app(scope, replay, send)
+            return
+        if not items:
+            await self._respond(send, 400, empty_batch_error().model_dump(by_alias=True, mode="json", exclude_none=True))
+            return
+        await handle(scope, replay, send, items)
+
+    async def _respond(self, send: Send, status: int, payload: Any = None) -> None:
+        body = b"" if payload is None else get_codec().dumps(payload).encode()
+        headers = [(b"content-length", str(len(body)).encode())]
+        if payload is not None:
+            headers.append((b"content-type", b"application/json"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _sse_batch(self, scope: Scope, receive: Receive, send: Send, items: list[Any]) -> None:
+        """把批量放入会话的读取流，由会话循环展开，批量响应作为一条事件发出"""
+        transport = self.sse_transport
+        request = Request(scope, receive)
+        error_response = await transport._security.validate_request(request, is_post=True)
+        if error_response:
+            await error_response(scope, receive, send)
+            return
+        writer = None
+        try:
+            writer = transport._read_stream_writers.get(UUID(hex=request.query_params.get("session_id", "")))
+        except ValueError:
+            pass
+        if writer is None:
+            # 缺少或未知的会话ID，由原应用返回相应的错误
+            await self.app(scope, receive, send)
+            return
+        await self._respond(send, 202)
+        metadata = ServerMessageMetadata(request_context=request)
+        await writer.send(SessionMessage(JSONRPCBatch(items), metadata=metadata))
+
+    async def _http_batch(self, scope: Scope, receive: Receive, send: Send, items: list[Any]) -> None:
+        """每个元素作为独立的POST分派给原应用，响应合并为一个数组"""
+        codec = get_codec()
+        # 每个请求元素的HTTP响应 (状态码, content-type, 响应体)
+        responses: list[tuple[int, str, bytes]] = []
+        results: list[Any] = []
+        slots = anyio.Semaphore(self.max_concurrency)
+        seen: set[Any] = set()
+        forwarded: list[tuple[int, Any]] = []
+        for item in items:
+            parsed = parse_item(item)
+            if isinstance(parsed, types.JSONRPCError):
+                results.append(_dump(parsed))
+                continue
+            root = parsed.root
+            if isinstance(root, types.JSONRPCRequest):
+                if root.id in seen:
+                    results.append(_dump(_error(root.id, "Invalid Request: duplicate request id")))
+                    continue
+                seen.add(root.id)
+                results.append(None)
+                forwarded.append((len(results) - 1, item))
+            else:
+                forwarded.append((-1, item))
+
+        async def forward(slot: int, item: Any) -> None:
+            async with slots:
+                status, content_type, body = await self._subrequest(scope, codec.dumps(item).encode())
+            if slot < 0:
+                return
+            responses.append((status, content_type, body))
+            results[slot] = self._response(item["id"], status, content_type, body)
+
+        async with anyio.create_task_group() as tg:
+            for slot, item in forwarded:
+                tg.start_soon(forward, slot, item)
+
+        statuses = {status for status, _, _ in responses}
+        if len(responses) == len(results) and len(statuses) == 1 and min(statuses) >= 400:
+            # 会话不存在、缺少请求头等请求本身的错误，所有元素得到相同的结果，按单个请求的方式返回
+            status, content_type, body = responses[0]
+            headers = [(b"content-length", str(len(body)).encode())]
+            if content_type:
+                headers.append((b"content-type", content_type.encode("latin-1")))
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+        elif results:
+            await self._respond(send, 200, results)
+        else:
+            await self._respond(send, 202)
+
+    async def _subrequest(self, scope: Scope, body: bytes) -> tuple[int, str, bytes]:
+        headers = [(k, v) for k, v in scope["headers"] if k != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode()))
+        sent = False
+        done = anyio.Event()
+
+        async def receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # SSE响应在发出结果后结束，在此之前不能报告断开连接
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        status = 500
+        content_type = ""
+        chunks: list[bytes] = []
+
+        async def send(message: Message) -> None:
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", ())).get(b"content-type", b"").decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(dict(scope, headers=headers), receive, send)
+        finally:
+            done.set()
+        return status, content_type, b"".join(chunks)
+
+    @staticmethod
+    def _response(request_id: Any, status: int, content_type: str, body: bytes) -> dict[str, Any]:
+        """从单个请求的HTTP响应中取出JSON-RPC响应"""
+        try:
+            if content_type.startswith("text/event-stream"):
+                for message in _sse_events(body):
+                    if isinstance(message, dict) and message.get("id") == request_id and (
+                            "result" in message or "error" in message):
+                        return message
+            elif body:
+                message = json.loads(body)
+                if isinstance(message, dict) and "error" in message:
+                    # SDK对请求本身的错误使用固定的ID
+                    message["id"] = request_id
+                if isinstance(message, dict) and ("result" in message or "error" in message):
+                    return message
+        except ValueError:
+            pass
+        return _dump(_error(request_id, f"HTTP {status}", types.INTERNAL_ERROR))
+
+
+def install_batching(mcp: FastMCP, max_concurrency: int = MAX_CONCURRENCY) -> None:
+    """为FastMCP实例的所有传输启用JSON-RPC批量请求
+
+    包装底层Server的会话循环 (stdio、shm、sse 的批量在这里展开)，并替换实例上的
+    sse_app/streamable_http_app。应在准入控制之后安装，使批量中的每个请求都经过准入检查。
+    """
+    server = mcp._mcp_server
+    if getattr(server, "__pymcp_batching__", False):
+        return
+    server.__pymcp_batching__ = True
+    original_run = server.run
+
+    async def run(read_stream, write_stream, *args, **kwargs):
+        batches = _SessionBatches(write_stream, max_concurrency)
+        send, receive = anyio.create_memory_object_stream(0)
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(batches.pump, read_stream, send)
+            try:
+                return await original_run(receive, batches.writer, *args, **kwargs)
+            finally:
+                tg.cancel_scope.cancel()
+
+    server.run = run
+    sse_app, streamable_http_app = mcp.sse_app, mcp.streamable_http_app
+    mcp.sse_app = lambda *args, **kwargs: _BatchMiddleware(sse_app(*args, **kwargs), mcp, max_concurrency)
+    mcp.streamable_http_app = lambda: _BatchMiddleware(streamable_http_app(), mcp, max_concurrency)
@@ -0,0 +1,374 @@
+"""Prometheus格式的运行指标
+
+install_metrics 为FastMCP实例安装埋点：
+- 每个工具调用的延迟直方图、进行中的调用数、调用/错误次数、响应内容的大小
+- 每类MCP请求 (tools/list、ping等) 的处理延迟
+- 会话数以及 initialize 握手耗时
+并在HTTP传输上注册 /metrics 路由 (与 /sse、/mcp 并列)。
+
+所有指标都带 transport 标签，由 run() 通过 set_transport 设置。
+多进程worker模式下每个worker各自统计，/metrics 返回处理该请求的worker的数据。
+埋点只在请求路径上做计时和字典累加，不引入额外的序列化。
+请求参数的大小需要把已解码的参数重新编码才能得到，对 sum_batch、sum_many 这类大数组参数代价较高，
+因此默认不统计，设置环境变量 PYMCP_METRICS_REQUEST_SIZES=1 (或 install_metrics 的 request_sizes 参数) 后启用。
+"""
+
+import bisect
+import os
+import time
+from collections.abc import Callable, Iterable
+from typing import Any, get_args
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+
+try:
+    from .codec import get_codec
+    from .middleware import use
+except ImportError:
+    from codec import get_codec
+    from middleware import use
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_transport = "stdio"
+
+
+def set_transport(transport: str) -> None:
+    """设置当前进程使用的传输方式，作为所有指标的 transport 标签"""
+    global _transport
+    _transport = transport
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # 每组标签对应 [各桶计数..., +Inf计数], 总和
+        self.values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total[0]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class _SessionReadStream:
+    """包装会话的读取流，记录 initialize 请求到 initialized 通知之间的握手耗时"""
+
+    def __init__(self, stream: Any, on_initialized: Callable[[float], None]):
+        self._stream = stream
+        self._on_initialized = on_initialized
+        self._started: float | None = None
+        self._done = False
+
+    def _inspect(self, message: Any) -> None:
+        root = getattr(getattr(message, "message", None), "root", None)
+        method = getattr(root, "method", None)
+        if method == "initialize":
+            self._started = time.perf_counter()
+        elif method == "notifications/initialized" and self._started is not None:
+            self._on_initialized(time.perf_counter() - self._started)
+            self._done = True
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._stream.__anext__()
+        if not self._done:
+            self._inspect(message)
+        return message
+
+    async def receive(self):
+        message = await self._stream.receive()
+        if not self._done:
+            self._inspect(message)
+        return message
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class Metrics:
+    """一个FastMCP实例的全部指标"""
+
+    def __init__(self, request_sizes: bool = False):
+        self.request_sizes = request_sizes
+        self.tool_calls = Counter("pymcp_tool_calls_total", "Tool calls handled.", ("tool", "transport"))
+        self.tool_errors = Counter("pymcp_tool_errors_total", "Tool calls that returned an error.", ("tool", "transport"))
+        self.tool_in_flight = Gauge("pymcp_tool_calls_in_flight", "Tool calls currently executing.", ("tool", "transport"))
+        self.tool_duration = Histogram(
+            "pymcp_tool_call_duration_seconds", "Tool call latency.", ("tool", "transport"))
+        self.tool_request_bytes = Histogram(
+            "pymcp_tool_request_bytes", "Size of tool call arguments as compact JSON.", ("tool", "transport"), SIZE_BUCKETS)
+        self.tool_response_bytes = Histogram(
+            "pymcp_tool_response_bytes", "Size of text content returned by tool calls.", ("tool", "transport"), SIZE_BUCKETS)
+        self.request_duration = Histogram(
+            "pymcp_request_duration_seconds", "MCP request handling latency by method.", ("method", "transport"))
+        self.sessions_active = Gauge("pymcp_sessions_active", "Sessions currently open.", ("transport",))
+        self.sessions_total = Counter("pymcp_sessions_total", "Sessions opened.", ("transport",))
+        self.session_init_duration = Histogram(
+            "pymcp_session_init_duration_seconds", "Time from initialize request to initialized notification.",
+            ("transport",))
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def add_collector(self, collect: Callable[[], Iterable[str]]) -> None:
+        """注册额外的指标采集函数，渲染时调用，返回Prometheus文本行"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in (
+            self.tool_calls, self.tool_errors, self.tool_in_flight, self.tool_duration,
+            self.tool_request_bytes, self.tool_response_bytes, self.request_duration,
+            self.sessions_active, self.sessions_total, self.session_init_duration,
+        ):
+            if metric is self.tool_request_bytes and not self.request_sizes:
+                continue
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+    async def tool_middleware(self, request: types.CallToolRequest, call_next) -> types.ServerResult:
+        labels = (request.params.name, _transport)
+        if self.request_sizes:
+            self.tool_request_bytes.observe(labels, len(get_codec().dumps(request.params.arguments or {})))
+        self.tool_in_flight.inc(labels)
+        start = time.perf_counter()
+        try:
+            result = await call_next(request)
+        except Exception:
+            self.tool_errors.inc(labels)
+            raise
+        finally:
+            self.tool_duration.observe(labels, time.perf_counter() - start)
+            self.tool_in_flight.dec(labels)
+            self.tool_calls.inc(labels)
+
+        root = result.root
+        if getattr(root, "isError", False):
+            self.tool_errors.inc(labels)
+        content = getattr(root, "content", None) or ()
+        self.tool_response_bytes.observe(labels, sum(len(getattr(block, "text", "")) for block in content))
+        return result
+
+    def request_middleware(self, method: str):
+        async def middleware(request: Any, call_next) -> types.ServerResult:
+            start = time.perf_counter()
+            try:
+                return await call_next(request)
+            finally:
+                self.request_duration.observe((method, _transport), time.perf_counter() - start)
+
+        return middleware
+
+    def instrument_sessions(self, mcp: FastMCP) -> None:
+        server = mcp._mcp_server
+        original_run = server.run
+
+        def on_initialized(duration: float) -> None:
+            self.session_init_duration.observe((_transport,), duration)
+
+        async def run(read_stream, write_stream, *args, **kwargs):
+            labels = (_transport,)
+            self.sessions_total.inc(labels)
+            self.sessions_active.inc(labels)
+            try:
+                return await original_run(_SessionReadStream(read_stream, on_initialized), write_stream, *args, **kwargs)
+            finally:
+                self.sessions_active.dec(labels)
+
+        server.run = run
+
+
+def _method_name(request_type: type) -> str:
+    """从请求类型的 method: Literal[...] 字段读取JSON-RPC方法名"""
+    return get_args(request_type.model_fields["method"].annotation)[0]
+
+
+def cache_collector(result_cache: Any) -> Callable[[], Iterable[str]]:
+    """把 tool_cache.ResultCacheMiddleware 的计数导出为指标"""
+
+    def collect() -> list[str]:
+        stats = result_cache.stats()
+        lines: list[str] = []
+        for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                            ("expirations", "counter"), ("size", "gauge")):
+            name = f"pymcp_cache_{field}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} Result cache {field} per pure tool.")
+            lines.append(f"# TYPE {name} {kind}")
+            for tool, values in stats.items():
+                lines.append(f'{name}{{tool="{_escape(tool)}"}} {values[field]}')
+        return lines
+
+    return collect
+
+
+def coalescing_collector(coalescer: Any) -> Callable[[], Iterable[str]]:
+    """把 tool_cache.CoalescingMiddleware 的计数导出为指标"""
+
+    def collect() -> list[str]:
+        stats = coalescer.stats()
+        lines: list[str] = []
+        for field, kind, description in (
+            ("executions", "counter", "Executions of pure tools that reached the tool."),
+            ("coalesced", "counter", "Calls answered by an identical call already in flight."),
+            ("inflight", "gauge", "Distinct pure tool calls currently executing."),
+        ):
+            name = f"pymcp_coalescing_{field}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for tool, values in stats.items():
+                lines.append(f'{name}{{tool="{_escape(tool)}"}} {values[field]}')
+        return lines
+
+    return collect
+
+
+def admission_collector(admission: Any) -> Callable[[], Iterable[str]]:
+    """把 admission.AdmissionControl 的会话数、未响应请求数和拒绝次数导出为指标"""
+
+    def collect() -> list[str]:
+        stats = admission.stats()
+        labels = f'transport="{_escape(_transport)}"'
+        lines = [
+            "# HELP pymcp_admission_sessions Sessions counted against max_sessions.",
+            "# TYPE pymcp_admission_sessions gauge",
+            f"pymcp_admission_sessions{{{labels}}} {stats['sessions']}",
+            "# HELP pymcp_admission_pending_requests Requests awaiting a response, counted against max_pending.",
+            "# TYPE pymcp_admission_pending_requests gauge",
+            f"pymcp_admission_pending_requests{{{labels}}} {stats['pending']}",
+            "# HELP pymcp_admission_rejected_total Sessions and requests shed by admission control.",
+            "# TYPE pymcp_admission_rejected_total counter",
+        ]
+        for reason, count in stats["rejected"].items():
+            lines.append(f'pymcp_admission_rejected_total{{reason="{reason}",{labels}}} {count}')
+        lines += [
+            "# HELP pymcp_admission_expired_sessions_total Idle Streamable HTTP sessions reclaimed.",
+            "# TYPE pymcp_admission_expired_sessions_total counter",
+            f"pymcp_admission_expired_sessions_total{{{labels}}} {stats['expired']}",
+        ]
+        return lines
+
+    return collect
+
+
+def sse_session_collector(sessions: Any) -> Callable[[], Iterable[str]]:
+    """把 sse_sessions.SseSessions 的存活会话数、排队的出站消息数和断开次数导出为指标"""
+
+    def collect() -> list[str]:
+        stats = sessions.stats()
+        labels = f'transport="{_escape(_transport)}"'
+        lines = [
+            "# HELP pymcp_sse_sessions Live SSE sessions.",
+            "# TYPE pymcp_sse_sessions gauge",
+            f"pymcp_sse_sessions{{{labels}}} {stats['sessions']}",
+            "# HELP pymcp_sse_queued_messages Outbound messages waiting to be written to SSE streams.",
+            "# TYPE pymcp_sse_queued_messages gauge",
+            f"pymcp_sse_queued_messages{{{labels}}} {stats['queued']}",
+            "# HELP pymcp_sse_evicted_total SSE sessions closed by the server.",
+            "# TYPE pymcp_sse_evicted_total counter",
+        ]
+        for reason, count in stats["evicted"].items():
+            lines.append(f'pymcp_sse_evicted_total{{reason="{reason}",{labels}}} {count}')
+        return lines
+
+    return collect
+
+
+def install_metrics(mcp: FastMCP, path: str = "/metrics", request_sizes: bool | None = None) -> Metrics:
+    """为FastMCP实例安装埋点并注册 /metrics 路由，需在工具注册完成后调用
+
+    request_sizes 为None时读取环境变量 PYMCP_METRICS_REQUEST_SIZES
+    """
+    if request_sizes is None:
+        request_sizes = os.environ.get("PYMCP_METRICS_REQUEST_SIZES", "") not in ("", "0")
+    metrics = Metrics(request_sizes)
+    use(mcp, metrics.tool_middleware, outermost=True)
+    for request_type in list(mcp._mcp_server.request_handlers):
+        use(mcp, metrics.request_middleware(_method_name(request_type)), request_type, outermost=True)
+    metrics.instrument_sessions(mcp)
+
+    @mcp.custom_route(path, methods=["GET"], include_in_schema=False)
+    async def metrics_endpoint(request):
+        from starlette.responses import Response
+
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return metrics
@@ -0,0 +1,76 @@
+"""请求处理中间件
+
+FastMCP把每类请求的处理函数注册在底层Server的 request_handlers 上。
+这里把它包装成可组合的中间件链：
+
+    async def middleware(request, call_next):
+        ...
+        return await call_next(request)
+
+先注册的中间件位于外层 (outermost=True 时插入到最外层)。
+链在注册时组装好，处理请求时不再额外创建闭包。
+"""
+
+import functools
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+
+Handler = Callable[[Any], Awaitable[types.ServerResult]]
+Middleware = Callable[..., Awaitable[types.ServerResult]]
+
+
+class _Chain:
+    """某一类请求的处理链，替换底层Server上原有的处理函数"""
+
+    def __init__(self, base: Handler):
+        self.base = base
+        self.middlewares: list[Middleware] = []
+        self._entry: Handler = base
+
+    def rebuild(self) -> None:
+        handler = self.base
+        for middleware in reversed(self.middlewares):
+            handler = functools.partial(middleware, call_next=handler)
+        self._entry = handler
+
+    async def __call__(self, request: Any) -> types.ServerResult:
+        return await self._entry(request)
+
+
+def _chain(mcp: FastMCP, request_type: type) -> _Chain:
+    server = mcp._mcp_server
+    handler = server.request_handlers[request_type]
+    if not isinstance(handler, _Chain):
+        handler = _Chain(handler)
+        server.request_handlers[request_type] = handler
+    return handler
+
+
+def use(
+    mcp: FastMCP,
+    middleware: Middleware,
+    request_type: type = types.CallToolRequest,
+    outermost: bool = False,
+) -> None:
+    """为某类请求注册中间件，默认为 tools/call"""
+    chain = _chain(mcp, request_type)
+    if outermost:
+        chain.middlewares.insert(0, middleware)
+    else:
+        chain.middlewares.append(middleware)
+    chain.rebuild()
+
+
+def set_handler(mcp: FastMCP, handler: Handler, request_type: type = types.CallToolRequest) -> None:
+    """替换中间件链最内层的实际处理函数，已注册的中间件保持不变"""
+    chain = _chain(mcp, request_type)
+    chain.base = handler
+    chain.rebuild()
+
+
+def base_handler(mcp: FastMCP, request_type: type = types.CallToolRequest) -> Handler:
+    """返回中间件链最内层的处理函数"""
+    return _chain(mcp, request_type).base
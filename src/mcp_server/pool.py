@@ -0,0 +1,425 @@
+"""预热的stdio服务器进程池
+
+每次以stdio方式启动服务器都要重新拉起Python进程、导入MCP SDK (约0.5秒)。
+supervisor预先启动一组服务器进程并完成 initialize 握手和 tools/list，
+客户端通过Unix socket连接后直接拿到一个已预热的进程，省去启动开销：
+
+    python src/mcp_server/pool.py serve --size 4
+    python src/mcp_server/pool.py connect      # stdio <-> Unix socket 桥接
+
+connect 不导入MCP SDK，可以直接作为MCP客户端配置里的服务器命令使用；
+进程内的客户端可以用 pool_client() 得到与 stdio_client() 相同的读写流。
+
+客户端自己的 initialize 会转发给服务器进程 (服务器支持重新初始化)，
+因此客户端参数和协议版本协商与直接启动时一致。
+连接断开后进程归还到池中，以下情况改为回收并在后台补充新进程：
+- 累计工具调用次数达到 --max-calls
+- 常驻内存比预热完成时增长超过 --max-rss-growth MB
+- 断开时仍有未返回的请求 (避免迟到的响应发给下一个客户端)
+- 调用过非只读的工具 (没有 readOnlyHint 注解，如 sum_stream_open 打开的流) 或其他可能改变
+  进程状态的请求 (如 logging/setLevel)：这些状态属于上一个客户端，不能留给下一个客户端
+只读工具的结果缓存会随进程保留，缓存的结果只取决于参数。
+所有进程都被占用时，新连接会额外启动一个进程，归还时超出池大小的进程直接关闭。
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+try:
+    from .codec import get_codec
+    from .registry import SERVERS
+except ImportError:
+    from codec import get_codec
+    from registry import SERVERS
+
+# 单条JSON-RPC消息的最大长度，批量工具的参数和结果可能比较大
+LINE_LIMIT = 64 * 1024 * 1024
+# 客户端断开后等待未返回请求的最长时间 (秒)
+DRAIN_TIMEOUT = 5.0
+# 不改变服务器进程状态的请求，只有这些请求 (和只读工具的调用) 的进程可以交给下一个客户端
+STATELESS_METHODS = frozenset({
+    "initialize", "ping", "tools/list", "prompts/list", "prompts/get",
+    "resources/list", "resources/templates/list", "resources/read", "completion/complete",
+})
+
+
+def default_socket_path() -> str:
+    return os.environ.get("PYMCP_POOL_SOCKET") or os.path.join(tempfile.gettempdir(), "pymcp-pool.sock")
+
+
+def _rss_kb(pid: int) -> int:
+    """读取进程常驻内存 (KB)，非Linux平台返回0"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class WarmServer:
+    """一个已完成握手的stdio服务器进程"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.calls = 0
+        self.baseline_rss_kb = 0
+        # 预热时 tools/list 中带有 readOnlyHint 注解的工具
+        self.read_only: frozenset[str] = frozenset()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    @classmethod
+    async def start(cls, command: list[str]) -> "WarmServer":
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=LINE_LIMIT,
+        )
+        server = cls(process)
+        try:
+            await server._warm()
+        except BaseException:
+            await server.close()
+            raise
+        server.baseline_rss_kb = _rss_kb(server.pid)
+        return server
+
+    async def _request(self, request_id: int, method: str, params: dict) -> dict:
+        await self.send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise ConnectionError(f"Server process {self.pid} exited during warm-up")
+            message = get_codec().loads(line)
+            if message.get("id") == request_id:
+                if "error" in message:
+                    raise ConnectionError(f"Warm-up {method} failed: {message['error']}")
+                return message["result"]
+
+    async def _warm(self) -> None:
+        """完成一次完整握手并列出工具，让导入和首次请求的开销发生在分配之前"""
+        from mcp.types import LATEST_PROTOCOL_VERSION
+
+        await self._request(0, "initialize", {
+            "protocolVersion": LATEST_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "pymcp-pool", "version": "0.1.0"},
+        })
+        await self.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        tools = await self._request(1, "tools/list", {})
+        self.read_only = frozenset(
+            tool["name"] for tool in tools["tools"] if (tool.get("annotations") or {}).get("readOnlyHint")
+        )
+
+    async def send(self, message: dict) -> None:
+        self.process.stdin.write(get_codec().dumps(message).encode() + b"\n")
+        await self.process.stdin.drain()
+
+    def rss_growth_kb(self) -> int:
+        return _rss_kb(self.pid) - self.baseline_rss_kb
+
+    async def close(self) -> None:
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+
+
+class ServerPool:
+    """维护固定数量的预热进程，按调用次数和内存增长回收"""
+
+    def __init__(self, command: list[str], size: int = 2, max_calls: int = 1000, max_rss_growth_mb: float = 64):
+        self.command = command
+        self.size = size
+        self.max_calls = max_calls
+        self.max_rss_growth_kb = max_rss_growth_mb * 1024
+        self._idle: list[WarmServer] = []
+        self._starting = 0
+        self._leased = 0
+        self._available = asyncio.Condition()
+        self._tasks: set[asyncio.Task] = set()
+        self.closed = False
+
+    @property
+    def total(self) -> int:
+        return len(self._idle) + self._starting + self._leased
+
+    async def fill(self) -> None:
+        """启动进程直到池满，等待全部预热完成"""
+        await asyncio.gather(*(self._spawn() for _ in range(self.size - self.total)))
+
+    def _refill(self) -> None:
+        for _ in range(self.size - self.total):
+            task = asyncio.create_task(self._spawn())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _spawn(self) -> None:
+        self._starting += 1
+        server = None
+        try:
+            server = await WarmServer.start(self.command)
+        except Exception as exc:
+            print(f"Failed to start server: {exc}", file=sys.stderr)
+        finally:
+            self._starting -= 1
+        async with self._available:
+            if server is not None:
+                if self.closed:
+                    await server.close()
+                else:
+                    self._idle.append(server)
+            # 启动失败也要唤醒等待者，让它们自行启动进程
+            self._available.notify_all()
+
+    async def acquire(self) -> WarmServer:
+        async with self._available:
+            while self._idle:
+                server = self._idle.pop()
+                if server.alive:
+                    self._leased += 1
+                    return server
+                self._refill()
+            if self._starting:
+                # 已有进程在预热，等待它完成通常比重新启动更快
+                await self._available.wait_for(lambda: self._idle or not self._starting)
+                if self._idle:
+                    self._leased += 1
+                    return self._idle.pop()
+        # 池已耗尽，为这个连接额外启动一个进程
+        self._leased += 1
+        try:
+            return await WarmServer.start(self.command)
+        except BaseException:
+            self._leased -= 1
+            raise
+
+    async def release(self, server: WarmServer, clean: bool) -> None:
+        self._leased -= 1
+        recycle = (
+            not clean
+            or not server.alive
+            or self.closed
+            or server.calls >= self.max_calls
+            or server.rss_growth_kb() > self.max_rss_growth_kb
+            or len(self._idle) + self._starting >= self.size
+        )
+        if recycle:
+            await server.close()
+            if not self.closed:
+                self._refill()
+            return
+        async with self._available:
+            self._idle.append(server)
+            self._available.notify()
+
+    async def close(self) -> None:
+        self.closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(server.close() for server in idle))
+
+
+class _Lease:
+    """一次连接期间转发的消息，记录尚未返回的请求，以及是否可能改变了进程状态"""
+
+    def __init__(self, server: WarmServer):
+        self.server = server
+        self.pending: set = set()
+        self.stateful = False
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.codec = get_codec()
+
+    async def client_to_server(self, reader: asyncio.StreamReader) -> None:
+        stdin = self.server.process.stdin
+        while line := await reader.readline():
+            try:
+                message = self.codec.loads(line)
+            except Exception:
+                message = None
+            if isinstance(message, dict) and "method" in message and "id" in message:
+                self.pending.add(message["id"])
+                self.drained.clear()
+                if message["method"] == "tools/call":
+                    self.server.calls += 1
+                    params = message.get("params")
+                    name = params.get("name") if isinstance(params, dict) else None
+                    if name not in self.server.read_only:
+                        self.stateful = True
+                elif message["method"] not in STATELESS_METHODS:
+                    self.stateful = True
+            stdin.write(line)
+            await stdin.drain()
+
+    async def server_to_client(self, writer: asyncio.StreamWriter) -> None:
+        stdout = self.server.process.stdout
+        while line := await stdout.readline():
+            if self.pending:
+                try:
+                    message = self.codec.loads(line)
+                except Exception:
+                    message = None
+                if isinstance(message, dict) and "method" not in message:
+                    self.pending.discard(message.get("id"))
+                    if not self.pending:
+                        self.drained.set()
+            writer.write(line)
+            await writer.drain()
+
+
+async def _handle(pool: ServerPool, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """把一个客户端连接和一个预热进程对接，直到任一方断开"""
+    try:
+        server = await pool.acquire()
+    except Exception as exc:
+        print(f"No server available: {exc}", file=sys.stderr)
+        writer.close()
+        return
+
+    lease = _Lease(server)
+    upstream = asyncio.create_task(lease.client_to_server(reader))
+    downstream = asyncio.create_task(lease.server_to_client(writer))
+    clean = False
+    try:
+        await asyncio.wait((upstream, downstream), return_when=asyncio.FIRST_COMPLETED)
+        if upstream.done() and upstream.exception() is None:
+            # 客户端关闭写端后仍可能在等待响应，先把已发出的请求处理完
+            drained = asyncio.create_task(lease.drained.wait())
+            await asyncio.wait((drained, downstream), timeout=DRAIN_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+            drained.cancel()
+            clean = not downstream.done() and not lease.pending and not lease.stateful
+    finally:
+        for task in (upstream, downstream):
+            task.cancel()
+        await asyncio.gather(upstream, downstream, return_exceptions=True)
+        writer.close()
+        await pool.release(server, clean)
+
+
+async def serve(socket_path: str, command: list[str], size: int, max_calls: int, max_rss_growth_mb: float) -> None:
+    """运行supervisor，收到SIGINT/SIGTERM时退出。socket在池预热完成后才创建，可用于判断就绪"""
+    pool = ServerPool(command, size, max_calls, max_rss_growth_mb)
+    await pool.fill()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    unix_server = await asyncio.start_unix_server(
+        lambda reader, writer: _handle(pool, reader, writer), socket_path, limit=LINE_LIMIT,
+    )
+    print(f"Server pool ready: {size} warm servers on {socket_path}", file=sys.stderr)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        unix_server.close()
+        await pool.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def connect(socket_path: str) -> None:
+    """在标准输入输出和supervisor的Unix socket之间转发数据"""
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+
+    def pump_stdin() -> None:
+        while data := os.read(sys.stdin.fileno(), 65536):
+            sock.sendall(data)
+        sock.shutdown(socket.SHUT_WR)
+
+    threading.Thread(target=pump_stdin, daemon=True).start()
+    stdout = sys.stdout.fileno()
+    while data := sock.recv(65536):
+        while data:
+            data = data[os.write(stdout, data):]
+
+
+@asynccontextmanager
+async def pool_client(socket_path: str | None = None):
+    """连接supervisor，返回可直接传给 ClientSession 的 (read, write) 流"""
+    import anyio
+    import mcp.types as types
+    from mcp.shared.message import SessionMessage
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    stream = await anyio.connect_unix(socket_path or default_socket_path())
+
+    async def reader() -> None:
+        buffer = b""
+        async with read_stream_writer:
+            async for chunk in stream:
+                lines = (buffer + chunk).split(b"\n")
+                buffer = lines.pop()
+                for line in lines:
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(SessionMessage(message))
+
+    async def writer() -> None:
+        async with write_stream_reader:
+            async for session_message in write_stream_reader:
+                data = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                await stream.send(data.encode() + b"\n")
+
+    async with stream, anyio.create_task_group() as tg:
+        tg.start_soon(reader)
+        tg.start_soon(writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            tg.cancel_scope.cancel()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="pool", description="预热的stdio服务器进程池")
+    parser.add_argument("--socket", default=default_socket_path(), help="supervisor监听的Unix socket路径")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="启动supervisor")
+    serve_parser.add_argument("--server", default="sum_int", choices=list(SERVERS), help="池中运行的服务器")
+    serve_parser.add_argument("--size", type=int, default=2, help="保持预热的进程数")
+    serve_parser.add_argument("--max-calls", type=int, default=1000, help="进程累计处理多少次工具调用后回收")
+    serve_parser.add_argument("--max-rss-growth", type=float, default=64, help="进程内存比预热时增长超过多少MB后回收")
+    commands.add_parser("connect", help="把标准输入输出桥接到supervisor (用作MCP客户端的服务器命令)")
+
+    args = parser.parse_args(argv)
+    if args.command == "connect":
+        connect(args.socket)
+        return
+    if args.size < 1:
+        parser.error("--size must be at least 1")
+    command = [sys.executable, str(Path(__file__).with_name(f"{args.server}.py"))]
+    asyncio.run(serve(args.socket, command, args.size, args.max_calls, args.max_rss_growth))
+
+
+if __name__ == "__main__":
+    main()
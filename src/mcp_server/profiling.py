@@ -0,0 +1,296 @@
+"""工具调用的采样剖析
+
+服务器变慢时用来查看时间花在哪里：FastMCP的分派、参数校验、工具本身、结果编码还是传输。
+通过 --profile RATE (或环境变量 PYMCP_PROFILE) 开启，按比例抽取工具调用：
+
+- 阶段耗时：被抽中的调用记录每个阶段的耗时
+    dispatch  中间件链 (指标、结果缓存等) 和请求分派
+    validate  参数的JSON Schema校验或快速路径的类型检查
+    execute   工具执行，包括排队、线程或进程切换，以及与工具一起执行的pydantic参数转换
+    encode    结果转换、输出校验和错误结果的生成
+  stdio传输另外记录每条消息的解析 (transport_decode) 和序列化 (transport_encode)
+- 调用栈采样：有被抽中的调用正在执行时，后台线程每隔 interval 秒采样所有线程的Python调用栈
+  (跳过阻塞在 select/wait 上的空闲线程)，按 collapsed stack 格式累计，
+  可以直接交给 flamegraph.pl、speedscope 或 inferno 生成火焰图
+
+结果定期 (以及进程退出时) 写入输出目录 (--profile-dir 或 PYMCP_PROFILE_DIR，默认 ./profiles)：
+
+    pymcp-<pid>.collapsed     每行 "thread;frame;frame;... count"
+    pymcp-<pid>.phases.json   每个工具各阶段的次数、总耗时、平均值和p50/p99
+
+多进程worker各自写入以pid区分的文件。未开启时请求路径上只多一次ContextVar读取。
+"""
+
+import atexit
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+
+try:
+    from .middleware import use
+except ImportError:
+    from middleware import use
+
+DEFAULT_OUTPUT = "profiles"
+DEFAULT_INTERVAL = 0.001
+DEFAULT_DUMP_EVERY = 10.0
+# 每个 (工具, 阶段) 保留最近的耗时样本数，用于计算分位数
+MAX_DURATIONS = 10000
+
+# 叶子帧为这些函数的线程视为空闲 (事件循环等待IO、线程池等待任务)
+_IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get")}
+
+_current_call: ContextVar["CallProfile | None"] = ContextVar("pymcp_profile_call", default=None)
+_active: "Profiler | None" = None
+
+
+def current_call() -> "CallProfile | None":
+    """当前请求被抽中时返回它的 CallProfile"""
+    return _current_call.get()
+
+
+def active_profiler() -> "Profiler | None":
+    """当前进程安装的 Profiler，传输层据此决定是否计时"""
+    return _active
+
+
+class CallProfile:
+    """一次被抽中的工具调用，mark 把上次标记以来的耗时计入指定阶段"""
+
+    __slots__ = ("tool", "started", "last", "phases")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = self.last = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+class _Durations:
+    """某个阶段的累计耗时和最近的样本"""
+
+    __slots__ = ("count", "total", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent: deque[float] = deque(maxlen=MAX_DURATIONS)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self) -> dict[str, float]:
+        ordered = sorted(self.recent)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1e3, 3),
+            "mean_us": round(self.total / self.count * 1e6, 3),
+            "p50_us": round(ordered[len(ordered) // 2] * 1e6, 3),
+            "p99_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6, 3),
+        }
+
+
+def _frame_name(frame: Any) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name})"
+
+
+def _is_idle(frame: Any) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+class Profiler:
+    """按比例抽取工具调用，记录阶段耗时并采样调用栈"""
+
+    def __init__(
+        self,
+        rate: float,
+        output: str | os.PathLike[str] = DEFAULT_OUTPUT,
+        interval: float = DEFAULT_INTERVAL,
+        dump_every: float = DEFAULT_DUMP_EVERY,
+    ):
+        if not 0 < rate <= 1:
+            raise ValueError(f"profile rate must be in (0, 1], got {rate}")
+        self.rate = rate
+        self.output = Path(output)
+        self.interval = interval
+        self.dump_every = dump_every
+        self.sampled_calls = 0
+        self.stack_samples = 0
+        self.stacks: dict[str, int] = {}
+        # 工具名 -> 阶段 (含 total) -> 耗时
+        self.phases: dict[str, dict[str, _Durations]] = {}
+        # transport_decode / transport_encode -> 每条消息的耗时
+        self.transport: dict[str, _Durations] = {}
+        self._in_flight = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._sampler: threading.Thread | None = None
+        self._sampler_pid: int | None = None
+        self._dirty = False
+
+    async def middleware(self, request: types.CallToolRequest, call_next: Callable) -> types.ServerResult:
+        if self.rate < 1 and random.random() >= self.rate:
+            return await call_next(request)
+        profile = CallProfile(request.params.name)
+        token = _current_call.set(profile)
+        self._enter()
+        try:
+            return await call_next(request)
+        finally:
+            # 中间件链返回途中的耗时同样计入 dispatch
+            profile.mark("dispatch")
+            _current_call.reset(token)
+            self._leave()
+            self.record_call(profile)
+
+    def record_call(self, profile: CallProfile) -> None:
+        with self._lock:
+            phases = self.phases.setdefault(profile.tool, {})
+            for phase, seconds in profile.phases.items():
+                phases.setdefault(phase, _Durations()).add(seconds)
+            phases.setdefault("total", _Durations()).add(profile.last - profile.started)
+            self.sampled_calls += 1
+            self._dirty = True
+
+    def record_transport(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            durations = self.transport.get(phase)
+            if durations is None:
+                durations = self.transport[phase] = _Durations()
+            durations.add(seconds)
+            self._dirty = True
+
+    def timed(self, phase: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """返回记录每次调用耗时的 fn，供传输层包装消息的解析和序列化"""
+
+        def wrapper(*args: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.record_transport(phase, time.perf_counter() - started)
+
+        return wrapper
+
+    def _enter(self) -> None:
+        self._in_flight += 1
+        if self._sampler is None or self._sampler_pid != os.getpid():
+            # fork出的worker不会继承父进程的线程，在各自进程中首次抽中调用时启动
+            self._sampler_pid = os.getpid()
+            self._sampler = threading.Thread(target=self._sample_loop, name="pymcp-profiler", daemon=True)
+            self._sampler.start()
+        self._wake.set()
+
+    def _leave(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight == 0:
+            self._wake.clear()
+
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        last_dump = time.monotonic()
+        while True:
+            if self._wake.wait(self.dump_every):
+                self.sample(skip=me)
+                time.sleep(self.interval)
+            if time.monotonic() - last_dump >= self.dump_every:
+                last_dump = time.monotonic()
+                if self._dirty:
+                    self.dump()
+
+    def sample(self, skip: int | None = None) -> None:
+        """采样一次所有非空闲线程的调用栈"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        collapsed = []
+        for ident, frame in sys._current_frames().items():
+            if ident == skip or _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            collapsed.append(";".join(reversed(stack)))
+        with self._lock:
+            for line in collapsed:
+                self.stacks[line] = self.stacks.get(line, 0) + 1
+            self.stack_samples += 1
+
+    def report(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "rate": self.rate,
+                "interval_ms": self.interval * 1e3,
+                "sampled_calls": self.sampled_calls,
+                "stack_samples": self.stack_samples,
+                "tools": {
+                    tool: {phase: durations.summary() for phase, durations in phases.items()}
+                    for tool, phases in self.phases.items()
+                },
+                "transport": {phase: durations.summary() for phase, durations in self.transport.items()},
+            }
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def dump(self) -> tuple[Path, Path]:
+        """写入 collapsed stacks 和阶段耗时，返回两个文件的路径"""
+        self.output.mkdir(parents=True, exist_ok=True)
+        prefix = self.output / f"pymcp-{os.getpid()}"
+        stacks_path = prefix.with_suffix(".collapsed")
+        phases_path = prefix.with_suffix(".phases.json")
+        self._dirty = False
+        _write_atomic(stacks_path, self.collapsed())
+        _write_atomic(phases_path, json.dumps(self.report(), indent=2) + "\n")
+        return stacks_path, phases_path
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(text)
+    os.replace(temporary, path)
+
+
+def install_profiler(
+    mcp: FastMCP,
+    rate: float | None = None,
+    output: str | os.PathLike[str] | None = None,
+    interval: float = DEFAULT_INTERVAL,
+) -> Profiler | None:
+    """按 rate (未指定时读取 PYMCP_PROFILE) 开启剖析，rate为0或未设置时返回None
+
+    剖析中间件注册在 tools/call 链的最外层，需在其他中间件之后调用，
+    这样 dispatch 阶段包含指标、结果缓存等中间件的耗时。
+    """
+    global _active
+    if rate is None:
+        rate = float(os.environ.get("PYMCP_PROFILE") or 0)
+    if not rate:
+        return None
+    output = output or os.environ.get("PYMCP_PROFILE_DIR") or DEFAULT_OUTPUT
+    profiler = Profiler(rate, output, interval)
+    use(mcp, profiler.middleware, outermost=True)
+    _active = profiler
+    atexit.register(profiler.dump)
+    return profiler
@@ -0,0 +1,69 @@
+"""就绪检查与就绪通知
+
+- install_healthz 在HTTP传输上注册 /healthz 路由，供负载均衡和编排系统做健康检查
+- notify_ready 在服务器开始接受连接后发出就绪通知：
+  - --ready-fd N: 向文件描述符N写入 "READY=1\\n" 后关闭 (s6等监督程序的 notification-fd 约定)，
+    测试可以传入管道写端，读到数据即可开始发送请求，无需轮询
+  - 环境变量 NOTIFY_SOCKET: 发送 "READY=1" 数据报 (systemd Type=notify)
+- ReadyServer 是在监听socket绑定、lifespan启动完成后调用回调的uvicorn.Server
+"""
+
+import json
+import os
+import socket
+from collections.abc import Callable
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+
+def install_healthz(mcp: FastMCP, path: str = "/healthz") -> None:
+    """注册健康检查路由，服务器能处理请求时返回200"""
+
+    @mcp.custom_route(path, methods=["GET"], include_in_schema=False)
+    async def healthz(request):
+        from starlette.responses import Response
+
+        return Response(json.dumps({"status": "ok"}), media_type="application/json")
+
+
+def notify_ready(ready_fd: int | None = None) -> None:
+    """发出就绪通知，没有配置任何通知方式时不做任何事"""
+    if ready_fd is not None:
+        try:
+            os.write(ready_fd, b"READY=1\n")
+        finally:
+            os.close(ready_fd)
+
+    notify_socket = os.environ.get("NOTIFY_SOCKET")
+    if notify_socket:
+        # 以@开头表示Linux抽象命名空间socket
+        address = "\0" + notify_socket[1:] if notify_socket.startswith("@") else notify_socket
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(b"READY=1")
+
+
+class ReadyServer(uvicorn.Server):
+    """启动完成 (socket已绑定、lifespan已启动) 后调用 on_ready 的uvicorn服务器"""
+
+    def __init__(self, config: uvicorn.Config, on_ready: Callable[[], None]):
+        super().__init__(config)
+        self.on_ready = on_ready
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets)
+        if not self.should_exit:
+            self.on_ready()
+
+
+async def serve_http(mcp: FastMCP, transport: str, on_ready: Callable[[], None]) -> None:
+    """与 FastMCP.run 相同的方式运行HTTP传输，就绪时调用 on_ready"""
+    app = mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+    config = uvicorn.Config(
+        app,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+    )
+    await ReadyServer(config, on_ready).serve()
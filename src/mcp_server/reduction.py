@@ -0,0 +1,363 @@
+"""整数的增量归约和文件归约
+
+RunningSums 保存 sum_stream_* 工具打开的流：客户端分块上传整数，每块到达时折叠进累计值后丢弃，
+服务器为每个流只保存总和与个数，内存占用与输入规模无关。
+
+    handle = running_sums.open()
+    running_sums.push(handle, [1, 2, 3])
+    running_sums.close(handle)  # -> RunningSum(total=6, count=3)
+
+客户端中途放弃的流在 ttl 秒内没有新的分块后被丢弃；同时打开的流不超过 max_open 个。
+流保存在创建它的进程中，多进程worker模式下 (streamable-http的worker以无状态模式运行，
+请求可能被任意worker处理) 无法跨请求使用：这时服务器设置 unavailable，所有操作都返回其中的原因。
+
+reduce_file 对本地文件中的整数求和、最小值、最大值和个数：文件以mmap映射，按字节范围切分成块，
+各块在进程池中并行归约后合并。支持的格式：
+- int64 / int32: 二进制整数数组，byteorder 指定字节序 (默认小端)
+- csv: 每行一条记录，column 为列号 (从0开始) 或表头中的列名；不支持带引号的逗号
+安装了numpy时二进制格式用numpy归约 (int64按高低32位分别求和，结果不会溢出)，否则用标准库。
+只能读取 PYMCP_DATA_DIRS (以 os.pathsep 分隔) 中的文件，未设置时为当前工作目录。
+
+reduce_chunk 在进程池的子进程中执行；本模块不依赖MCP SDK，子进程导入它的开销很小。
+"""
+
+import array
+import functools
+import mmap
+import os
+import secrets
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Literal
+from urllib.parse import urlparse
+
+import anyio
+import anyio.to_thread
+
+
+@dataclass
+class RunningSum:
+    """一个流的累计状态；expected 为客户端声明的整数总个数 (用作进度的总量)"""
+    total: int = 0
+    count: int = 0
+    expected: int | None = None
+    last_used: float = field(default=0.0, repr=False)
+
+    def fold(self, values: list[int]) -> None:
+        self.total += sum(values)
+        self.count += len(values)
+
+
+class RunningSums:
+    """按句柄保存进行中的流"""
+
+    def __init__(self, ttl: float | None = 600, max_open: int | None = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_open = max_open
+        self._clock = clock
+        self._streams: dict[str, RunningSum] = {}
+        self.expired = 0
+        # 不为None时流式求和不可用，open/push/close 都以此为错误信息
+        self.unavailable: str | None = None
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def _expire(self) -> None:
+        if self.ttl is None:
+            return
+        deadline = self._clock() - self.ttl
+        for handle in [handle for handle, state in self._streams.items() if state.last_used < deadline]:
+            del self._streams[handle]
+            self.expired += 1
+
+    def _check_available(self) -> None:
+        if self.unavailable is not None:
+            raise ValueError(self.unavailable)
+
+    def _get(self, handle: str) -> RunningSum:
+        self._check_available()
+        self._expire()
+        state = self._streams.get(handle)
+        if state is None:
+            raise ValueError(f"Unknown or expired stream handle: {handle}")
+        state.last_used = self._clock()
+        return state
+
+    def open(self, expected: int | None = None) -> str:
+        if expected is not None and expected < 0:
+            raise ValueError("expected must not be negative")
+        self._check_available()
+        self._expire()
+        if self.max_open is not None and len(self._streams) >= self.max_open:
+            raise ValueError(f"Too many open streams ({len(self._streams)}), close some before opening more")
+        handle = secrets.token_hex(16)
+        self._streams[handle] = RunningSum(expected=expected, last_used=self._clock())
+        return handle
+
+    def push(self, handle: str, values: list[int]) -> RunningSum:
+        state = self._get(handle)
+        state.fold(values)
+        return state
+
+    def close(self, handle: str) -> RunningSum:
+        state = self._get(handle)
+        del self._streams[handle]
+        return state
+
+
+FileFormat = Literal["int64", "int32", "csv"]
+ByteOrder = Literal["little", "big"]
+
+# 二进制格式的 (array/memoryview 类型码, 每个整数的字节数)
+_BINARY = {"int64": ("q", 8), "int32": ("i", 4)}
+
+# 块大小的上下限：块太小时进程间通信的开销占主导，太大时并行度不足
+MIN_CHUNK = 8 * 1024 * 1024
+MAX_CHUNK = 256 * 1024 * 1024
+# 块内每次处理的字节数，限制临时数据 (numpy的中间数组、字节序转换后的副本、解析出的整数) 占用的内存
+_SLICE = 8 * 1024 * 1024
+_CSV_SLICE = 1024 * 1024
+
+DATA_DIRS_ENV = "PYMCP_DATA_DIRS"
+
+# numpy在首次归约二进制数组时才导入 (约40ms，不计入服务器的冷启动)；None 表示未安装
+_numpy: Any = False
+
+# 一个块的归约结果：(总和, 个数, 最小值, 最大值)，没有整数时最小值和最大值为None
+Partial = tuple[int, int, int | None, int | None]
+
+
+@dataclass
+class FileStats:
+    """文件中整数的总和、个数、最小值和最大值"""
+    sum: int = 0
+    count: int = 0
+    min: int | None = None
+    max: int | None = None
+
+    def add(self, total: int, count: int, low: int | None, high: int | None) -> None:
+        if not count:
+            return
+        self.sum += total
+        self.count += count
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+
+def data_dirs() -> list[str]:
+    value = os.environ.get(DATA_DIRS_ENV)
+    return [path for path in value.split(os.pathsep) if path] if value else [os.getcwd()]
+
+
+def resolve_path(path: str, roots: list[str] | None = None) -> str:
+    """把本地路径或 file:// URI 解析为真实路径，并检查它是允许读取的普通文件"""
+    if "://" in path:
+        parsed = urlparse(path)
+        if parsed.scheme != "file" or parsed.netloc not in ("", "localhost"):
+            raise ValueError(f"Unsupported URI: {path}, expected a local path or a file:// URI")
+        from urllib.request import url2pathname
+
+        path = url2pathname(parsed.path)
+    resolved = os.path.realpath(path)
+    roots = [os.path.realpath(root) for root in (roots if roots is not None else data_dirs())]
+    if not any(os.path.commonpath([resolved, root]) == root for root in roots):
+        raise ValueError(f"{path} is outside the allowed data directories (set {DATA_DIRS_ENV})")
+    if not os.path.isfile(resolved):
+        raise ValueError(f"Not a file: {path}")
+    return resolved
+
+
+def plan_chunks(size: int, workers: int, align: int = 1) -> list[tuple[int, int]]:
+    """把 [0, size) 切分成字节范围，块数约为worker数的4倍 (各块耗时不均时负载更平衡)"""
+    chunk = min(max(-(-size // (workers * 4)), MIN_CHUNK), MAX_CHUNK)
+    chunk -= chunk % align
+    return [(start, min(start + chunk, size)) for start in range(0, size, chunk)]
+
+
+def _get_numpy() -> Any:
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def _merge(partials: Any) -> Partial:
+    stats = FileStats()
+    for partial in partials:
+        stats.add(*partial)
+    return stats.sum, stats.count, stats.min, stats.max
+
+
+def _numpy_partial(values: Any) -> Partial:
+    if not len(values):
+        return 0, 0, None, None
+    if values.dtype.itemsize == 8:
+        # int64的和可能溢出：高32位 (有符号) 和低32位 (无符号) 分别求和，在Python整数中合并
+        total = int((values >> 32).sum()) * 2**32 + int((values & 0xFFFFFFFF).sum())
+    else:
+        total = int(values.sum(dtype="int64"))
+    return total, len(values), int(values.min()), int(values.max())
+
+
+def _reduce_binary(mm: mmap.mmap, format: str, start: int, stop: int, byteorder: str) -> Partial:
+    code, itemsize = _BINARY[format]
+    slices = [(low, min(low + _SLICE, stop)) for low in range(start, stop, _SLICE)]
+    numpy = _get_numpy()
+    if numpy is not None:
+        dtype = numpy.dtype(f"{'<' if byteorder == 'little' else '>'}i{itemsize}")
+        partials = []
+        for low, high in slices:
+            values = numpy.frombuffer(mm, dtype=dtype, count=(high - low) // itemsize, offset=low)
+            partials.append(_numpy_partial(values))
+            # 释放对mmap的引用，否则无法关闭映射
+            del values
+        return _merge(partials)
+    if byteorder != sys.byteorder:
+        partials = []
+        for low, high in slices:
+            values = array.array(code, mm[low:high])
+            values.byteswap()
+            partials.append((sum(values), len(values), min(values), max(values)))
+        return _merge(partials)
+    partials = []
+    with memoryview(mm) as view:
+        for low, high in slices:
+            with view[low:high] as raw, raw.cast(code) as values:
+                partials.append((sum(values), len(values), min(values), max(values)))
+    return _merge(partials)
+
+
+def _parse_csv(data: bytes, column: int, offset: int) -> list[int]:
+    if column == 0 and b"," not in data and b'"' not in data:
+        # 不带引号的单列文件：按行切分，不能按任意空白切分，否则 "1 2" 这样的行会被当作两个值
+        fields = [field for field in map(bytes.strip, data.splitlines()) if field]
+    else:
+        fields = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            row = line.split(b",")
+            if column >= len(row):
+                raise ValueError(f"Missing CSV column {column} near byte offset {offset}")
+            fields.append(row[column].strip().strip(b'"'))
+    try:
+        return list(map(int, fields))
+    except ValueError:
+        raise ValueError(f"Invalid integer in CSV column {column} near byte offset {offset}") from None
+
+
+def _reduce_csv(mm: mmap.mmap, start: int, stop: int, column: int, skip_header: bool) -> Partial:
+    size = len(mm)
+    # 块负责起始字节落在 [start, stop) 中的行
+    begin = 0 if start == 0 else (mm.find(b"\n", start - 1) + 1 or size)
+    end = mm.find(b"\n", stop - 1) + 1 or size
+    if skip_header and start == 0:
+        begin = mm.find(b"\n") + 1 or size
+    partials = []
+    position = begin
+    while position < end:
+        newline = mm.find(b"\n", min(position + _CSV_SLICE, end) - 1, end)
+        cut = newline + 1 if newline >= 0 else end
+        values = _parse_csv(mm[position:cut], column, position)
+        if values:
+            partials.append((sum(values), len(values), min(values), max(values)))
+        position = cut
+    return _merge(partials)
+
+
+def reduce_chunk(
+    path: str,
+    format: FileFormat,
+    start: int,
+    stop: int,
+    byteorder: ByteOrder = "little",
+    column: int = 0,
+    skip_header: bool = False,
+) -> Partial:
+    """归约文件的一个字节范围，在进程池的子进程中执行"""
+    with open(path, "rb") as f:
+        if stop <= start or os.fstat(f.fileno()).st_size == 0:
+            return 0, 0, None, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if format == "csv":
+                return _reduce_csv(mm, start, stop, column, skip_header)
+            return _reduce_binary(mm, format, start, stop, byteorder)
+
+
+def csv_column(path: str, column: int | str) -> int:
+    """把表头中的列名解析为列号"""
+    if isinstance(column, int):
+        if column < 0:
+            raise ValueError("column must not be negative")
+        return column
+    with open(path, "rb") as f:
+        names = [name.strip().strip(b'"').decode(errors="replace") for name in f.readline().split(b",")]
+    if column not in names:
+        raise ValueError(f"CSV header has no column {column!r}")
+    return names.index(column)
+
+
+async def reduce_file(
+    path: str,
+    format: FileFormat = "int64",
+    *,
+    byteorder: ByteOrder = "little",
+    column: int | str = 0,
+    header: bool = False,
+    workers: int = 1,
+    run_chunk: Callable[[Callable[..., Partial], dict[str, Any]], Awaitable[Partial]] | None = None,
+    on_progress: Callable[[int, int, FileStats], Awaitable[None]] | None = None,
+) -> FileStats:
+    """并行归约整个文件
+
+    run_chunk(reduce_chunk, kwargs) 在进程池中执行一个块；只有一个块或未提供时在线程中执行。
+    每个块完成后调用 on_progress(已处理的字节数, 文件大小, 目前的结果)。
+    """
+    if format not in ("csv", *_BINARY):
+        raise ValueError(f"Unknown format: {format}")
+    size = os.path.getsize(path)
+    options: dict[str, Any] = {"path": path, "format": format}
+    if format == "csv":
+        # 按列名选择时第一行必然是表头
+        options.update(column=csv_column(path, column), skip_header=header or isinstance(column, str))
+        align = 1
+    else:
+        align = _BINARY[format][1]
+        if size % align:
+            raise ValueError(f"File size {size} is not a multiple of {align} bytes for {format}")
+        options.update(byteorder=byteorder)
+
+    chunks = plan_chunks(size, workers, align)
+    stats = FileStats()
+    done = 0
+
+    async def reduce(start: int, stop: int) -> None:
+        nonlocal done
+        kwargs = dict(options, start=start, stop=stop)
+        if run_chunk is None or len(chunks) == 1:
+            partial = await anyio.to_thread.run_sync(functools.partial(reduce_chunk, **kwargs))
+        else:
+            partial = await run_chunk(reduce_chunk, kwargs)
+        stats.add(*partial)
+        done += stop - start
+        if on_progress is not None:
+            await on_progress(done, size, stats)
+
+    try:
+        async with anyio.create_task_group() as tg:
+            for start, stop in chunks:
+                tg.start_soon(reduce, start, stop)
+    except Exception as group:
+        # 其余块随之取消，向调用方报告第一个失败的块的错误，而不是异常组
+        error = group
+        while isinstance(error, BaseExceptionGroup):
+            error = error.exceptions[0]
+        raise error from None
+    return stats
@@ -0,0 +1,36 @@
+"""服务器注册表
+
+run_server 通过这里的静态表查找服务器，列出可用服务器和校验名称时不需要导入任何服务器模块。
+新增服务器模块后需要同步更新 SERVERS，scan() 会通过解析源码 (不导入) 找出包内所有
+定义了模块级 `mcp = FastMCP(...)` 的模块，测试用它检查注册表是否与源码一致。
+服务器模块还需定义 `run(transport, **options)`，由它处理全部命令行选项 (见 cli.py)。
+"""
+
+import ast
+from pathlib import Path
+
+# 服务器名称 -> 简要说明
+SERVERS: dict[str, str] = {
+    "sum_int": "Integer addition tools (sum, sum_batch, sum_many, sum_big)",
+}
+
+
+def scan(package_dir: Path | None = None) -> set[str]:
+    """扫描包目录，返回定义了模块级FastMCP实例的模块名"""
+    package_dir = package_dir or Path(__file__).parent
+    servers = set()
+    for path in sorted(package_dir.glob("*.py")):
+        if path.name.startswith("_"):
+            continue
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        for node in tree.body:
+            if (
+                isinstance(node, ast.Assign)
+                and any(isinstance(target, ast.Name) and target.id == "mcp" for target in node.targets)
+                and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Name)
+                and node.value.func.id == "FastMCP"
+            ):
+                servers.add(path.stem)
+                break
+    return servers
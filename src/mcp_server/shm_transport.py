@@ -0,0 +1,289 @@
+"""同一主机上的共享内存传输
+
+客户端和服务器在同一台机器上时，stdio管道和本机HTTP都要把每条消息完整地复制进内核再复制出来，
+还要做分行或HTTP分帧。shm 传输通过Unix socket建立会话，消息内容放在两块共享内存环形缓冲区中：
+
+- 连接建立后服务器为本会话创建两块共享内存 (客户端->服务器、服务器->客户端)，
+  把名称和容量以一行JSON发给客户端；客户端映射后回复一个字节，服务器随即unlink名称，
+  任何一方异常退出都不会留下共享内存
+- 发送方把序列化后的消息写入环形缓冲区，只通过socket发送13字节的帧头 (类型、长度、偏移)；
+  接收方直接从共享内存解析 (orjson/msgspec 可以解析memoryview，不再复制)，
+  解析完成后把读位置写回缓冲区头部，发送方据此复用空间
+- 缓冲区剩余空间不足或消息超过容量时，消息内容直接跟在帧头后通过socket发送，不会阻塞
+- 已就绪的多条响应合并为一次socket写入
+
+每个环只有一个写方和一个读方，读位置是单调递增的64位计数，以对齐的单次64位存取读写。
+
+    python src/mcp_server/sum_int.py shm --socket /tmp/pymcp-shm.sock
+
+进程内的客户端使用 shm_client()，它返回与 stdio_client() 相同的读写流：
+
+    async with shm_client("/tmp/pymcp-shm.sock") as (read, write):
+        async with ClientSession(read, write) as session:
+            ...
+"""
+
+import json
+import os
+import struct
+import tempfile
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import anyio
+import anyio.lowlevel
+import mcp.types as types
+from anyio.abc import ByteStream
+from anyio.streams.buffered import BufferedByteReceiveStream
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.message import SessionMessage
+
+try:
+    from .codec import JsonCodec, get_codec
+    from .jsonrpc_batch import JSONRPCBatch
+except ImportError:
+    from codec import JsonCodec, get_codec
+    from jsonrpc_batch import JSONRPCBatch
+
+# 每个方向的环形缓冲区容量
+RING_SIZE = 4 * 1024 * 1024
+# 缓冲区头部保存读位置，占一个缓存行
+_HEADER = 64
+# 帧头: 类型, 消息长度, 消息在环中的偏移 (单调递增的字节计数)
+_FRAME = struct.Struct("<BIQ")
+_IN_RING = 1
+_INLINE = 2
+_ACK = b"\x01"
+# 握手行的最大长度
+_HANDSHAKE_LIMIT = 4096
+
+
+def default_socket_path() -> str:
+    return os.environ.get("PYMCP_SHM_SOCKET") or os.path.join(tempfile.gettempdir(), "pymcp-shm.sock")
+
+
+# 本进程创建的共享内存名称
+_created: set[str] = set()
+
+
+def _create(size: int) -> SharedMemory:
+    """创建共享内存，名称由服务器在握手后或连接结束时unlink"""
+    shm = SharedMemory(create=True, size=size)
+    _created.add(shm.name)
+    return shm
+
+
+def _unlink(shm: SharedMemory) -> None:
+    shm.unlink()
+    _created.discard(shm.name)
+
+
+def _attach(name: str) -> SharedMemory:
+    """映射对方创建的共享内存，不交给本进程的resource_tracker管理 (名称由创建方unlink)"""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.12 没有 track 参数，映射时也会登记，需要手动取消；
+        # 客户端和服务器在同一进程中时登记是重复的，保留给服务器unlink时注销
+        shm = SharedMemory(name=name)
+        if name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class _Ring:
+    """单写单读的环形缓冲区，消息在环中连续存放，放不下环尾时从头开始"""
+
+    def __init__(self, shm: SharedMemory, capacity: int):
+        self.shm = shm
+        self.capacity = capacity
+        self._data = shm.buf[_HEADER:_HEADER + capacity]
+        # 读位置，只由读方写入
+        self._tail = shm.buf[:8].cast("Q")
+        # 写位置，只在写方进程中使用
+        self._head = 0
+
+    def write(self, payload: bytes) -> int | None:
+        """写入消息并返回偏移，空间不足时返回None"""
+        size = len(payload)
+        position = self._head % self.capacity
+        start = self._head + (self.capacity - position if position + size > self.capacity else 0)
+        if start + size - self._tail[0] > self.capacity:
+            return None
+        index = start % self.capacity
+        self._data[index:index + size] = payload
+        self._head = start + size
+        return start
+
+    def read(self, offset: int, size: int) -> memoryview:
+        index = offset % self.capacity
+        return self._data[index:index + size]
+
+    def release(self, offset: int, size: int) -> None:
+        self._tail[0] = offset + size
+
+    def close(self) -> None:
+        self._data.release()
+        self._tail.release()
+        self.shm.close()
+
+
+def _encode(codec: JsonCodec, message: types.JSONRPCMessage | JSONRPCBatch) -> bytes:
+    if codec.name == "json":
+        return message.model_dump_json(by_alias=True, exclude_none=True).encode()
+    return codec.dumps(message.model_dump(by_alias=True, mode="json", exclude_none=True)).encode()
+
+
+def _decode(codec: JsonCodec, data: memoryview | bytes) -> types.JSONRPCMessage | JSONRPCBatch:
+    if data[:1] == b"[":
+        # 批量数组的元素由 jsonrpc_batch 在会话中逐个校验
+        return JSONRPCBatch(codec.loads(bytes(data) if codec.name == "json" else data))
+    if codec.name == "json":
+        return types.JSONRPCMessage.model_validate_json(bytes(data))
+    return types.JSONRPCMessage.model_validate(codec.loads(data))
+
+
+@asynccontextmanager
+async def _session_streams(stream: ByteStream, receive: BufferedByteReceiveStream, outgoing: _Ring,
+                           incoming: _Ring, codec: JsonCodec):
+    """在已完成握手的连接上收发消息，返回 (read_stream, write_stream)"""
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(64)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def reader() -> None:
+        try:
+            async with read_stream_writer:
+                while True:
+                    try:
+                        kind, size, offset = _FRAME.unpack(await receive.receive_exactly(_FRAME.size))
+                    except (anyio.IncompleteRead, anyio.EndOfStream, anyio.BrokenResourceError):
+                        return
+                    try:
+                        if kind == _IN_RING:
+                            view = incoming.read(offset, size)
+                            try:
+                                message = _decode(codec, view)
+                            finally:
+                                view.release()
+                                incoming.release(offset, size)
+                        else:
+                            message = _decode(codec, await receive.receive_exactly(size))
+                    except (anyio.IncompleteRead, anyio.EndOfStream, anyio.BrokenResourceError):
+                        return
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(SessionMessage(message))
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    def frame(message: types.JSONRPCMessage) -> bytes:
+        payload = _encode(codec, message)
+        offset = outgoing.write(payload)
+        if offset is None:
+            return _FRAME.pack(_INLINE, len(payload), 0) + payload
+        return _FRAME.pack(_IN_RING, len(payload), offset)
+
+    async def writer() -> None:
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    # 合并已经就绪的消息，一次写入socket
+                    parts = [frame(session_message.message)]
+                    while True:
+                        try:
+                            parts.append(frame(write_stream_reader.receive_nowait().message))
+                        except (anyio.WouldBlock, anyio.EndOfStream):
+                            break
+                    await stream.send(b"".join(parts))
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(reader)
+        tg.start_soon(writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            tg.cancel_scope.cancel()
+
+
+async def _serve_connection(mcp: FastMCP, stream: ByteStream, codec: JsonCodec, ring_size: int) -> None:
+    server = mcp._mcp_server
+    segments = [_create(_HEADER + ring_size) for _ in range(2)]
+    to_server, to_client = (_Ring(shm, ring_size) for shm in segments)
+    unlinked = False
+    try:
+        async with stream:
+            handshake = {"version": 1, "capacity": ring_size,
+                         "client_to_server": segments[0].name, "server_to_client": segments[1].name}
+            await stream.send(json.dumps(handshake).encode() + b"\n")
+            receive = BufferedByteReceiveStream(stream)
+            try:
+                ack = await receive.receive_exactly(1)
+            except (anyio.IncompleteRead, anyio.EndOfStream, anyio.BrokenResourceError):
+                return
+            if ack != _ACK:
+                return
+            for shm in segments:
+                _unlink(shm)
+            unlinked = True
+            async with _session_streams(stream, receive, to_client, to_server, codec) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        to_server.close()
+        to_client.close()
+        if not unlinked:
+            for shm in segments:
+                _unlink(shm)
+
+
+async def run_shm(
+    mcp: FastMCP,
+    socket_path: str | None = None,
+    on_ready: Callable[[], None] | None = None,
+    codec: JsonCodec | None = None,
+    ring_size: int = RING_SIZE,
+) -> None:
+    """在Unix socket上接受shm传输的连接，每个连接是一个独立的MCP会话"""
+    socket_path = socket_path or default_socket_path()
+    codec = codec or get_codec()
+    if os.path.exists(socket_path):
+        # 上次异常退出留下的socket文件
+        os.unlink(socket_path)
+    listener = await anyio.create_unix_listener(socket_path)
+    try:
+        if on_ready is not None:
+            on_ready()
+
+        async def handle(stream: ByteStream) -> None:
+            await _serve_connection(mcp, stream, codec, ring_size)
+
+        await listener.serve(handle)
+    finally:
+        await listener.aclose()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+@asynccontextmanager
+async def shm_client(socket_path: str | None = None, codec: JsonCodec | None = None):
+    """连接shm传输的服务器，返回可直接传给 ClientSession 的 (read, write) 流"""
+    codec = codec or get_codec()
+    stream = await anyio.connect_unix(socket_path or default_socket_path())
+    async with stream:
+        receive = BufferedByteReceiveStream(stream)
+        handshake: dict[str, Any] = json.loads(await receive.receive_until(b"\n", _HANDSHAKE_LIMIT))
+        capacity = handshake["capacity"]
+        to_server = _Ring(_attach(handshake["client_to_server"]), capacity)
+        to_client = _Ring(_attach(handshake["server_to_client"]), capacity)
+        try:
+            await stream.send(_ACK)
+            async with _session_streams(stream, receive, to_server, to_client, codec) as streams:
+                yield streams
+        finally:
+            to_server.close()
+            to_client.close()
@@ -0,0 +1,371 @@
+"""SSE会话的空闲回收和内存上限
+
+SDK的SSE传输中，每个 GET /sse 连接持有一个事件流、若干内存流和会话对象，直到socket断开才释放；
+客户端进程卡住或者连接被NAT静默丢弃时，这些资源会一直占用下去。而且SDK从不删除
+会话ID到读取流的映射，正常断开的会话也会留下一项。install_sse_sessions 为每个SSE会话：
+- idle_timeout: 没有收发任何消息、也没有进行中的请求超过该秒数后断开会话
+- heartbeat: 事件流空闲超过该秒数时发送一条SSE注释作为心跳，代替sse_starlette固定15秒的ping，
+  让代理不会关闭空闲连接，并尽早发现已经失效的连接
+- max_queued: 等待写入事件流的出站消息数上限。SDK的写入流没有缓冲区，客户端不读取时
+  每个响应都阻塞在发送上，超出上限时断开会话 (客户端读取太慢或已经不再读取)
+会话结束 (包括被断开) 时删除SDK中的映射，之后发往该会话的POST得到404，客户端据此重新连接。
+
+/sessions 返回当前进程中存活的会话：建立时长、空闲时长、进行中的请求数、排队的出站消息数、
+已发送的字节数，以及缓冲消息 (进行中的请求和排队的出站消息) 序列化后的字节数 footprint_bytes。
+断开次数按原因 (idle/queue) 计数，可以通过 metrics.sse_session_collector 导出到 /metrics。
+多进程worker模式下每个worker各自管理和报告自己的会话。
+"""
+
+import json
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any
+from uuid import UUID
+
+import anyio
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+from pydantic import BaseModel
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from .codec import get_codec
+    from .jsonrpc_batch import JSONRPCBatch, find_sse_transport
+except ImportError:
+    from codec import get_codec
+    from jsonrpc_batch import JSONRPCBatch, find_sse_transport
+
+REASONS = ("idle", "queue")
+
+HEARTBEAT = b": ping\r\n\r\n"
+
+# sse_starlette 自带的ping事件，由这里的心跳代替
+_STARLETTE_PING = b": ping - "
+
+_ENDPOINT_SESSION_ID = re.compile(rb"session_id=([0-9a-f]{32})")
+
+# 当前请求所属的SSE会话，GET /sse 的处理过程中设置
+_current: ContextVar["_SseSession | None"] = ContextVar("pymcp_sse_session", default=None)
+
+
+@dataclass(frozen=True)
+class SessionLimits:
+    """SSE会话的上限，None 表示不启用该项"""
+    idle_timeout: float | None = 300
+    heartbeat: float | None = 15
+    max_queued: int | None = 256
+
+
+def _size(message: Any) -> int:
+    """消息序列化后的字节数"""
+    if isinstance(message, BaseModel):
+        return len(message.model_dump_json(by_alias=True, exclude_none=True))
+    return len(get_codec().dumps(message))
+
+
+class _SseSession:
+    """一个SSE连接的状态"""
+
+    def __init__(self, clock: Any):
+        self.clock = clock
+        self.created = self.last_activity = self.last_write = clock()
+        self.session_id: str | None = None
+        self.scope = anyio.CancelScope()
+        self.send_lock = anyio.Lock()
+        self.started = False
+        self.finished = False
+        self.evicted: str | None = None
+        # 进行中的请求 (请求ID -> 请求) 和排队的出站消息 (序号 -> 消息)
+        self.inflight: dict[Any, Any] = {}
+        self.queued: dict[int, Any] = {}
+        self._next_queued = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+
+    @property
+    def busy(self) -> bool:
+        # 响应已经生成、只是客户端没有读取时不算忙碌，超时后照常回收
+        return bool(self.inflight)
+
+    def touch(self) -> None:
+        self.last_activity = self.clock()
+
+    def received(self, message: Any) -> None:
+        self.touch()
+        root = getattr(getattr(message, "message", None), "root", None)
+        if isinstance(root, types.JSONRPCRequest):
+            self.inflight[root.id] = root
+        elif isinstance(root, JSONRPCBatch):
+            for item in root.root:
+                if isinstance(item, dict) and "method" in item and "id" in item:
+                    self.inflight[item["id"]] = item
+
+    def responded(self, message: Any) -> None:
+        root = getattr(getattr(message, "message", None), "root", None)
+        if isinstance(root, types.JSONRPCResponse | types.JSONRPCError):
+            self.inflight.pop(root.id, None)
+        elif isinstance(root, JSONRPCBatch):
+            for item in root.root:
+                if isinstance(item, dict):
+                    self.inflight.pop(item.get("id"), None)
+
+    def enqueue(self, message: Any) -> int:
+        key = self._next_queued
+        self._next_queued += 1
+        self.queued[key] = message
+        return key
+
+    def evict(self, reason: str) -> None:
+        if self.evicted is None:
+            self.evicted = reason
+            self.scope.cancel()
+
+    def report(self, now: float) -> dict[str, Any]:
+        buffered = [*self.inflight.values(), *(queued.message for queued in self.queued.values())]
+        return {
+            # 会话ID是POST消息的唯一凭据，报告中只给出前缀用于区分会话
+            "session": self.session_id and self.session_id[:8],
+            "age": round(now - self.created, 3),
+            "idle": round(now - self.last_activity, 3),
+            "inflight": len(self.inflight),
+            "queued": len(self.queued),
+            "sent_messages": self.sent_messages,
+            "sent_bytes": self.sent_bytes,
+            "footprint_bytes": sum(_size(message) for message in buffered),
+        }
+
+
+class _ReadStream:
+    def __init__(self, stream: Any, session: _SseSession):
+        self._stream = stream
+        self._session = session
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._stream.__anext__()
+        self._session.received(message)
+        return message
+
+    async def receive(self):
+        message = await self._stream.receive()
+        self._session.received(message)
+        return message
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _WriteStream:
+    def __init__(self, stream: Any, session: _SseSession, max_queued: int | None):
+        self._stream = stream
+        self._session = session
+        self._max_queued = max_queued
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    async def send(self, message: Any) -> None:
+        session = self._session
+        key = session.enqueue(message)
+        session.responded(message)
+        if self._max_queued is not None and len(session.queued) > self._max_queued:
+            session.evict("queue")
+        try:
+            await self._stream.send(message)
+        finally:
+            del session.queued[key]
+        session.touch()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class SseSessions:
+    """一个FastMCP实例的SSE会话表和断开计数"""
+
+    def __init__(self, mcp: FastMCP, limits: SessionLimits, clock: Any = time.monotonic):
+        self.mcp = mcp
+        self.limits = limits
+        self.clock = clock
+        self.sessions: set[_SseSession] = set()
+        self.evicted = dict.fromkeys(REASONS, 0)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "queued": sum(len(session.queued) for session in self.sessions),
+            "evicted": dict(self.evicted),
+        }
+
+    def report(self) -> dict[str, Any]:
+        now = self.clock()
+        sessions = sorted((session.report(now) for session in self.sessions), key=lambda s: -s["age"])
+        return {
+            "count": len(sessions),
+            "footprint_bytes": sum(session["footprint_bytes"] for session in sessions),
+            "evicted": dict(self.evicted),
+            "limits": asdict(self.limits),
+            "sessions": sessions,
+        }
+
+    def instrument_sessions(self) -> None:
+        """包装底层Server的会话循环，记录SSE会话的收发和排队的出站消息"""
+        server = self.mcp._mcp_server
+        original_run = server.run
+        max_queued = self.limits.max_queued
+
+        async def run(read_stream, write_stream, *args, **kwargs):
+            session = _current.get()
+            if session is None:
+                return await original_run(read_stream, write_stream, *args, **kwargs)
+            return await original_run(
+                _ReadStream(read_stream, session), _WriteStream(write_stream, session, max_queued), *args, **kwargs
+            )
+
+        server.run = run
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        return _SseSessionMiddleware(app, self)
+
+
+class _SseSessionMiddleware:
+    """ASGI中间件：为每个 GET /sse 事件流发送心跳、回收空闲会话，结束时清理SDK的会话映射"""
+
+    def __init__(self, app: ASGIApp, sessions: SseSessions):
+        self.app = app
+        self.sessions = sessions
+        self.sse_path = sessions.mcp.settings.sse_path
+        self.message_path, self.transport = find_sse_transport(app) or (None, None)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+        elif scope["method"] == "GET" and scope["path"] == self.sse_path:
+            await self._serve(scope, receive, send)
+        elif scope["method"] == "POST" and scope["path"].rstrip("/") == self.message_path:
+            try:
+                await self.app(scope, receive, send)
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                # 会话在SDK接受这条消息 (已经返回202) 之后、交给会话之前被断开，消息随会话一起丢弃
+                pass
+        else:
+            await self.app(scope, receive, send)
+
+    async def _serve(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        sessions = self.sessions
+        session = _SseSession(sessions.clock)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                session.started = True
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if body.startswith(_STARLETTE_PING):
+                    return
+                if session.session_id is None:
+                    match = _ENDPOINT_SESSION_ID.search(body)
+                    if match is not None:
+                        session.session_id = match.group(1).decode()
+                if body:
+                    session.sent_messages += 1
+                    session.sent_bytes += len(body)
+                    session.last_write = session.clock()
+                session.finished = not message.get("more_body", False)
+            async with session.send_lock:
+                await send(message)
+
+        sessions.sessions.add(session)
+        token = _current.set(session)
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(self._heartbeat, session, send)
+                tg.start_soon(self._reap, session)
+                with session.scope:
+                    await self.app(scope, receive, send_wrapper)
+                tg.cancel_scope.cancel()
+        finally:
+            _current.reset(token)
+            sessions.sessions.discard(session)
+            # SDK在连接结束后不会删除这一项
+            self._forget(session)
+        if session.evicted is not None:
+            sessions.evicted[session.evicted] += 1
+            await self._finish(session, send)
+
+    def _forget(self, session: _SseSession) -> None:
+        """删除SDK中会话ID到读取流的映射，之后发往该会话的POST得到404"""
+        if session.session_id is not None and self.transport is not None:
+            self.transport._read_stream_writers.pop(UUID(hex=session.session_id), None)
+
+    async def _finish(self, session: _SseSession, send: Send) -> None:
+        """结束被断开会话的事件流；客户端已经不再读取时不等待"""
+        if not session.started or session.finished:
+            return
+        with anyio.move_on_after(1):
+            try:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            except OSError:
+                pass
+
+    async def _heartbeat(self, session: _SseSession, send: Send) -> None:
+        interval = self.sessions.limits.heartbeat
+        if interval is None:
+            return
+        while True:
+            await anyio.sleep(max(session.last_write + interval - session.clock(), 0))
+            if session.clock() - session.last_write < interval:
+                continue
+            session.last_write = session.clock()
+            if session.started and not session.finished:
+                async with session.send_lock:
+                    await send({"type": "http.response.body", "body": HEARTBEAT, "more_body": True})
+
+    async def _reap(self, session: _SseSession) -> None:
+        timeout = self.sessions.limits.idle_timeout
+        if timeout is None:
+            return
+        while True:
+            if session.busy:
+                # 工具调用还在执行时不算空闲
+                session.touch()
+            idle = session.clock() - session.last_activity
+            if idle >= timeout:
+                session.evict("idle")
+                return
+            await anyio.sleep(timeout - idle)
+
+
+def install_sse_sessions(mcp: FastMCP, limits: SessionLimits | None = None, path: str = "/sessions") -> SseSessions:
+    """为FastMCP实例的SSE应用启用会话回收和出站消息上限，并注册 /sessions 路由
+
+    应在准入控制和批量请求之后安装，使会话循环的包装位于最外层，
+    看到的是实际写入事件流的消息 (批量响应是一条消息)。
+    """
+    sessions = SseSessions(mcp, limits or SessionLimits())
+    sessions.instrument_sessions()
+    sse_app = mcp.sse_app
+    mcp.sse_app = lambda *args, **kwargs: sessions.wrap(sse_app(*args, **kwargs))
+
+    @mcp.custom_route(path, methods=["GET"], include_in_schema=False)
+    async def sessions_endpoint(request):
+        from starlette.responses import Response
+
+        return Response(json.dumps(sessions.report()), media_type="application/json")
+
+    return sessions
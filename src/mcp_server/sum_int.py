@@ -1,15 +1,59 @@
-from mcp.server.fastmcp import FastMCP
-import sys
-from typing import Literal, cast
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.types import ToolAnnotations
+import anyio
+import builtins
+import operator
+from typing import Literal, TypedDict, cast
 import os
 
-# 创建一个MCP服务器实例，支持从环境变量获取端口配置
+try:
+    from .bigint import Encoding, decode, encode
+    from .execution import execution
+    from .fast_path import fast_path
+    from .jsonrpc_batch import install_batching
+    from .metrics import (
+        admission_collector, cache_collector, coalescing_collector, install_metrics, set_transport, sse_session_collector,
+    )
+    from .profiling import install_profiler
+    from .readiness import install_healthz, notify_ready, serve_http
+    from .reduction import ByteOrder, FileFormat, RunningSum, RunningSums, reduce_file, resolve_path
+    from .tool_cache import install_coalescing, install_result_cache, pure
+    from .tool_list import install_tool_list_cache
+    from .tool_runner import install_tool_runner
+    from .transport import run_stdio
+except ImportError:
+    from bigint import Encoding, decode, encode
+    from execution import execution
+    from fast_path import fast_path
+    from jsonrpc_batch import install_batching
+    from metrics import (
+        admission_collector, cache_collector, coalescing_collector, install_metrics, set_transport, sse_session_collector,
+    )
+    from profiling import install_profiler
+    from readiness import install_healthz, notify_ready, serve_http
+    from reduction import ByteOrder, FileFormat, RunningSum, RunningSums, reduce_file, resolve_path
+    from tool_cache import install_coalescing, install_result_cache, pure
+    from tool_list import install_tool_list_cache
+    from tool_runner import install_tool_runner
+    from transport import run_stdio
+
+# 创建一个MCP服务器实例，支持从环境变量获取端口和日志级别配置
+# (FastMCP 构造参数的默认值会覆盖 FASTMCP_LOG_LEVEL，这里显式读取；INFO级别下每个请求都输出一条日志)
 mcp_port = int(os.environ.get("MCP_SERVER_PORT", "8000"))
-mcp = FastMCP("pymcp", port=mcp_port)
+mcp = FastMCP("pymcp", port=mcp_port, log_level=os.environ.get("FASTMCP_LOG_LEVEL", "INFO").upper())
+
+# 没有副作用的工具：客户端 (如 client.ClientPool) 可以在连接断开后安全地重试
+# (@pure 工具由 install_result_cache 自动加上同样的注解)
+READ_ONLY = ToolAnnotations(readOnlyHint=True, idempotentHint=True)
 
 
 # 添加一个加法工具，计算两个整数的和
+# 加法是纯函数，相同参数的重复调用直接返回缓存的结果；执行只需微秒，直接在事件循环上完成，
+# 参数和结果都是整数，跳过通用的schema和pydantic校验
 @mcp.tool()
+@pure(maxsize=4096)
+@execution("inline")
+@fast_path
 def sum(a: int, b: int) -> int:
     """
     Add two integers together.
@@ -24,25 +68,346 @@ def sum(a: int, b: int) -> int:
     return a + b
 
 
-def run(transport: Literal["stdio", "sse", "streamable-http"] = "stdio"):
+class BatchResult(TypedDict):
+    """批量加法的列式结果"""
+    sums: list[int]
+    count: int
+
+
+# 批量加法工具，一次调用完成多组整数相加，避免逐个调用的往返开销
+@mcp.tool(annotations=READ_ONLY)
+def sum_batch(a: list[int], b: list[int]) -> BatchResult:
+    """
+    Add integers pairwise: sums[i] = a[i] + b[i].
+    
+    Use this instead of calling `sum` repeatedly when many additions are needed.
+    
+    Args:
+        a: First operands, one per pair
+        b: Second operands, same length as `a`
+        
+    Returns:
+        The pairwise sums in input order and the number of pairs
+    """
+    if len(a) != len(b):
+        raise ValueError(f"a and b must have the same length, got {len(a)} and {len(b)}")
+    # map(operator.add)在C层一次遍历完成，Python整数天然支持任意精度，不会溢出
+    sums = list(map(operator.add, a, b))
+    return {"sums": sums, "count": len(sums)}
+
+
+# 归约工具，计算一组整数的总和
+@mcp.tool(annotations=READ_ONLY)
+def sum_many(values: list[int]) -> int:
+    """
+    Add up a list of integers.
+    
+    Args:
+        values: Integers to add together
+        
+    Returns:
+        The sum of all values (0 for an empty list)
+    """
+    # 模块内的sum工具覆盖了内置sum，这里显式使用内置函数
+    return builtins.sum(values)
+
+
+class StreamTotal(TypedDict):
+    """流式求和的累计值"""
+    total: int
+    count: int
+
+
+def _stream_total(state: RunningSum) -> StreamTotal:
+    return {"total": state.total, "count": state.count}
+
+
+# 流式求和：整数分块上传，每块折叠进累计值后丢弃，服务器为每个流只保存总和与个数
+running_sums = RunningSums()
+
+
+@mcp.tool()
+@execution("inline")
+def sum_stream_open(expected: int | None = None) -> str:
+    """
+    Start a streaming sum and return its handle.
+    
+    Use this to add up more integers than fit comfortably in one `sum_many`
+    call: push them in chunks with `sum_stream_push`, then call
+    `sum_stream_close` for the result. Streams unused for 10 minutes expire.
+    
+    Args:
+        expected: Total number of integers that will be pushed, if known;
+            used as the total in progress notifications
+        
+    Returns:
+        The stream handle
+    """
+    return running_sums.open(expected)
+
+
+@mcp.tool()
+async def sum_stream_push(handle: str, values: list[int], ctx: Context) -> StreamTotal:
+    """
+    Add a chunk of integers to a streaming sum.
+    
+    When the request carries a progress token, a progress notification reports
+    the number of integers received so far and the running total.
+    
+    Args:
+        handle: Handle returned by `sum_stream_open`
+        values: The next chunk of integers
+        
+    Returns:
+        The running total and the number of integers received so far
+    """
+    state = running_sums.push(handle, values)
+    await ctx.report_progress(state.count, state.expected, f"running total: {state.total}")
+    return _stream_total(state)
+
+
+@mcp.tool()
+@execution("inline")
+def sum_stream_close(handle: str) -> StreamTotal:
+    """
+    Finish a streaming sum and release its handle.
+    
+    Args:
+        handle: Handle returned by `sum_stream_open`
+        
+    Returns:
+        The final total and the number of integers pushed
+    """
+    return _stream_total(running_sums.close(handle))
+
+
+class FileSummary(TypedDict):
+    """文件中整数的归约结果，文件中没有整数时 min 和 max 为 None"""
+    sum: int
+    count: int
+    min: int | None
+    max: int | None
+
+
+async def _run_chunk(fn, kwargs):
+    """在工具共享的进程池中归约文件的一个块，同时提交的块数不超过进程数"""
+    async with tool_runner.process_limiter:
+        return await tool_runner.processes.run(fn, kwargs)
+
+
+# 本地文件归约：文件以mmap映射，切分成块后在进程池中并行归约，数据不经过客户端和JSON
+@mcp.tool(annotations=READ_ONLY)
+async def sum_file(
+    path: str,
+    ctx: Context,
+    format: FileFormat = "int64",
+    column: int | str = 0,
+    header: bool = False,
+    byteorder: ByteOrder = "little",
+) -> FileSummary:
+    """
+    Sum, count, min and max of the integers stored in a local file.
+    
+    Use this instead of reading the file and calling `sum_many` when the data
+    is already on the server's disk. Only files under the directories in
+    PYMCP_DATA_DIRS (default: the server's working directory) can be read.
+    
+    Args:
+        path: Local file path or file:// URI
+        format: "int64" or "int32" for a binary array of integers,
+            "csv" for one record per line
+        column: CSV column index (from 0) or header name
+        header: Whether the first CSV line is a header (implied when
+            `column` is a name)
+        byteorder: Byte order of binary arrays, "little" or "big"
+        
+    Returns:
+        The sum, count, min and max (null when the file has no integers)
+    """
+    resolved = resolve_path(path)
+
+    async def progress(done: int, size: int, stats) -> None:
+        await ctx.report_progress(done, size, f"running total: {stats.sum}")
+
+    stats = await reduce_file(
+        resolved, format, byteorder=byteorder, column=column, header=header,
+        workers=tool_runner.processes.max_workers, run_chunk=_run_chunk, on_progress=progress,
+    )
+    return {"sum": stats.sum, "count": stats.count, "min": stats.min, "max": stats.max}
+
+
+# 大整数加法，操作数和结果以字符串传输，避免JSON数字超过2^53后在客户端丢失精度
+# 上万位的十进制转换会长时间占用GIL，放到进程池中执行，避免拖慢其他客户端的请求
+@mcp.tool(annotations=READ_ONLY)
+@execution("process", timeout=60)
+def sum_big(a: str, b: str, encoding: Encoding = "decimal") -> str:
+    """
+    Add two arbitrarily large integers passed as strings.
+    
+    Use this instead of `sum` when an operand or the result may exceed 2^53,
+    since many JSON clients cannot represent larger numbers exactly.
+    
+    Args:
+        a: First integer in the given encoding
+        b: Second integer in the given encoding
+        encoding: "decimal" for a base-10 string with an optional sign, or
+            "base64" for the base64 of little-endian two's-complement bytes
+        
+    Returns:
+        The sum in the same encoding as the operands
+    """
+    return encode(decode(a, encoding) + decode(b, encoding), encoding)
+
+
+# tools/call 使用缓存的schema校验器，结构化结果只序列化一次，同步工具按执行策略并发执行
+tool_runner = install_tool_runner(mcp)
+
+# tools/list 的响应预先生成并缓存，注册新工具时失效
+tool_list = install_tool_list_cache(mcp)
+
+# 工具注册完成后启用纯函数工具的结果缓存
+result_cache = install_result_cache(mcp)
+
+# 缓存未命中时，同时到达的相同调用只执行一次
+coalescer = install_coalescing(mcp)
+
+# 运行指标，HTTP传输下通过 /metrics 访问
+server_metrics = install_metrics(mcp)
+server_metrics.add_collector(cache_collector(result_cache))
+server_metrics.add_collector(coalescing_collector(coalescer))
+
+# 健康检查，HTTP传输下通过 /healthz 访问
+install_healthz(mcp)
+
+
+def _overrides(**values: float | None) -> dict[str, float | None]:
+    """命令行给出的上限：None (未指定) 使用默认值，不传入；0表示不限制，转换为None"""
+    return {name: value or None for name, value in values.items() if value is not None}
+
+
+def run(
+    transport: Literal["stdio", "sse", "streamable-http", "shm"] = "stdio",
+    workers: int = 1,
+    stateless: bool = False,
+    ready_fd: int | None = None,
+    max_concurrency: int | None = None,
+    max_sessions: int | None = None,
+    max_session_requests: int | None = None,
+    max_pending: int | None = None,
+    session_idle_timeout: float | None = None,
+    profile: float | None = None,
+    profile_dir: str | None = None,
+    socket_path: str | None = None,
+    sse_idle_timeout: float | None = None,
+    sse_heartbeat: float | None = None,
+    sse_max_queued: int | None = None,
+):
     """运行MCP服务器
     
     Args:
-        transport: 传输方式，可选值为 "stdio", "sse", "streamable-http"
+        transport: 传输方式，可选值为 "stdio", "sse", "streamable-http", "shm"
+            (同一主机上的客户端通过Unix socket和共享内存通信，见 shm_transport.py)
+        workers: worker进程数，大于1时以多进程模式运行 (仅支持 sse 和 streamable-http)
+        stateless: 无状态模式 (仅streamable-http)，不保存会话，单个结果直接返回JSON而不是SSE流，
+            多个实例可以放在负载均衡后面而无需会话粘滞
+        ready_fd: 就绪后写入 "READY=1\\n" 并关闭的文件描述符；设置了 NOTIFY_SOCKET 时同时通知systemd
+        max_concurrency: 每个进程同时执行的工具调用数上限，超出的调用排队等待
+        max_sessions: 每个进程同时打开的会话数上限 (仅HTTP传输)，None使用默认值，0表示不限制
+        max_session_requests: 单个会话中未响应的请求数上限 (仅HTTP传输)
+        max_pending: 每个进程所有会话未响应的请求总数上限 (仅HTTP传输)
+        session_idle_timeout: Streamable HTTP会话多少秒没有请求后可被回收，None使用默认值，0表示不回收
+        profile: 剖析的工具调用比例 (0到1)，None时读取环境变量 PYMCP_PROFILE，0表示不剖析
+        profile_dir: 剖析结果的输出目录，None时读取 PYMCP_PROFILE_DIR，默认为 ./profiles
+        socket_path: shm传输监听的Unix socket路径，None时读取 PYMCP_SHM_SOCKET
+        sse_idle_timeout: SSE会话没有收发消息多少秒后断开 (仅sse)，None使用默认值，0表示不断开
+        sse_heartbeat: SSE事件流空闲多少秒后发送心跳 (仅sse)，None使用默认值，0表示不发送
+        sse_max_queued: 单个SSE会话等待写出的消息数上限，超出时断开会话 (仅sse)，0表示不限制
     """
-    mcp.run(transport)
+    set_transport(transport)
+    if workers > 1 and transport == "streamable-http":
+        # worker以无状态模式运行，同一个流的后续调用可能落到没有该流的worker上
+        running_sums.unavailable = (
+            "Streaming sums are unavailable: this server runs stateless streamable-http workers, "
+            "so successive calls may reach different processes. Use sum_many instead."
+        )
+    # 剖析中间件位于最外层，在其他中间件都注册完成后安装
+    install_profiler(mcp, profile, profile_dir)
+    if max_concurrency is not None:
+        tool_runner.max_concurrency = max_concurrency
+    if stateless:
+        try:
+            from .compat import suppress_stateless_teardown_errors
+        except ImportError:
+            from compat import suppress_stateless_teardown_errors
+        suppress_stateless_teardown_errors()
+        mcp.settings.stateless_http = True
+        mcp.settings.json_response = True
+    if transport in ("sse", "streamable-http"):
+        try:
+            from .admission import AdmissionLimits, install_admission
+        except ImportError:
+            from admission import AdmissionLimits, install_admission
+        # 超出上限的会话和请求被快速拒绝，而不是在内存中无限排队
+        limits = AdmissionLimits(**_overrides(
+            max_sessions=max_sessions, max_session_requests=max_session_requests, max_pending=max_pending,
+            session_idle_timeout=session_idle_timeout,
+        ))
+        admission = install_admission(mcp, limits)
+        server_metrics.add_collector(admission_collector(admission))
+    # 在准入控制之后安装，批量中的每个请求都经过准入检查
+    install_batching(mcp)
+    if transport == "sse":
+        try:
+            from .sse_sessions import SessionLimits, install_sse_sessions
+        except ImportError:
+            from sse_sessions import SessionLimits, install_sse_sessions
+        # 最后安装，会话循环的包装位于最外层，看到实际写入事件流的消息
+        limits = SessionLimits(**_overrides(
+            idle_timeout=sse_idle_timeout, heartbeat=sse_heartbeat, max_queued=sse_max_queued,
+        ))
+        sse_sessions = install_sse_sessions(mcp, limits)
+        server_metrics.add_collector(sse_session_collector(sse_sessions))
+
+    if workers > 1:
+        try:
+            from .workers import serve
+        except ImportError:
+            from workers import serve
+        serve(mcp, transport, workers, on_ready=lambda: notify_ready(ready_fd))
+        return
+    if transport == "stdio":
+        # stdio没有需要绑定的端口，进入消息循环前即可视为就绪
+        notify_ready(ready_fd)
+        anyio.run(run_stdio, mcp)
+    elif transport == "shm":
+        try:
+            from .shm_transport import run_shm
+        except ImportError:
+            from shm_transport import run_shm
+        anyio.run(run_shm, mcp, socket_path, lambda: notify_ready(ready_fd))
+    else:
+        anyio.run(serve_http, mcp, transport, lambda: notify_ready(ready_fd))
 
 
 if __name__ == "__main__":
-    # 运行MCP服务器，支持指定传输方式
-    transport = "stdio"
-    if len(sys.argv) > 1:
-        transport = sys.argv[1]
-    
-    # 确保传输方式是有效的选项之一
-    if transport not in ["stdio", "sse", "streamable-http"]:
-        print(f"Invalid transport: {transport}")
-        print("Available transports: stdio (default), sse, streamable-http")
-        sys.exit(1)
-    
-    run(cast(Literal["stdio", "sse", "streamable-http"], transport))
\ No newline at end of file
+    # 运行MCP服务器，支持指定传输方式和worker进程数
+    from cli import parse_args
+
+    args = parse_args()
+    run(
+        cast(Literal["stdio", "sse", "streamable-http", "shm"], args.transport),
+        workers=args.workers,
+        stateless=args.stateless,
+        ready_fd=args.ready_fd,
+        max_concurrency=args.max_concurrency,
+        max_sessions=args.max_sessions,
+        max_session_requests=args.max_session_requests,
+        max_pending=args.max_pending,
+        session_idle_timeout=args.session_idle_timeout,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        socket_path=args.socket,
+        sse_idle_timeout=args.sse_idle_timeout,
+        sse_heartbeat=args.sse_heartbeat,
+        sse_max_queued=args.sse_max_queued,
+    )
@@ -0,0 +1,233 @@
+"""纯函数工具的结果缓存
+
+用 @pure 声明工具是纯函数 (相同参数总是得到相同结果且没有副作用)，
+install_result_cache 会为这些工具缓存完整的 CallToolResult：命中时直接返回，
+跳过参数校验、工具执行、结果转换和输出schema校验。
+
+    @mcp.tool()
+    @pure(maxsize=4096, ttl=300)
+    def sum(a: int, b: int) -> int:
+        ...
+
+    result_cache = install_result_cache(mcp)
+
+install_result_cache 同时为这些工具加上 readOnlyHint/idempotentHint 注解 (未设置注解时)，
+客户端据此知道调用可以安全地重试。
+
+结果缓存只对已经完成的调用生效：多个客户端同时发出相同的调用时，它们都会未命中。
+install_coalescing 为纯函数工具合并进行中的相同调用 (singleflight)：第一个调用执行，
+其余调用等待并共享它的结果对象 (文本内容和结构化结果只生成和序列化一次)。
+
+    coalescer = install_coalescing(mcp)
+"""
+
+import inspect
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import anyio
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+
+try:
+    from .codec import get_codec
+    from .middleware import use
+except ImportError:
+    from codec import get_codec
+    from middleware import use
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """缓存策略：最多保留 maxsize 条结果，ttl 秒后过期 (None 表示不过期)"""
+    maxsize: int = 1024
+    ttl: float | None = None
+
+
+def pure(maxsize: int = 1024, ttl: float | None = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """把工具函数标记为纯函数，放在 @mcp.tool() 下面使用"""
+    if maxsize < 1:
+        raise ValueError("maxsize must be at least 1")
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        fn.__pymcp_pure__ = CachePolicy(maxsize, ttl)
+        return fn
+
+    return decorator
+
+
+def cache_policy(fn: Callable[..., Any]) -> CachePolicy | None:
+    """读取函数上的缓存策略，兼容被装饰器包装过的函数"""
+    return getattr(inspect.unwrap(fn), "__pymcp_pure__", None)
+
+
+def canonical_arguments(arguments: dict[str, Any]) -> str:
+    """把参数规范化为稳定的缓存键：键排序、紧凑分隔符"""
+    return get_codec().dumps(arguments, sort_keys=True)
+
+
+class ResultCache:
+    """带容量上限和可选过期时间的LRU缓存"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at is not None and self._clock() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class ResultCacheMiddleware:
+    """tools/call中间件：为纯函数工具缓存完整的结果"""
+
+    def __init__(self):
+        self.caches: dict[str, ResultCache] = {}
+
+    async def __call__(self, request: types.CallToolRequest, call_next) -> types.ServerResult:
+        cache = self.caches.get(request.params.name)
+        if cache is None:
+            return await call_next(request)
+
+        key = canonical_arguments(request.params.arguments or {})
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        result = await call_next(request)
+        # 错误结果不缓存，下一次调用重新执行
+        if not getattr(result.root, "isError", False):
+            cache.put(key, result)
+        return result
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """按工具名返回各缓存的命中/未命中等计数"""
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+
+def install_result_cache(mcp: FastMCP) -> ResultCacheMiddleware:
+    """为所有标记了 @pure 的已注册工具启用结果缓存，需在工具注册完成后调用"""
+    middleware = ResultCacheMiddleware()
+    for tool in mcp._tool_manager.list_tools():
+        policy = cache_policy(tool.fn)
+        if policy is not None:
+            middleware.caches[tool.name] = ResultCache(policy.maxsize, policy.ttl)
+            if tool.annotations is None:
+                tool.annotations = types.ToolAnnotations(readOnlyHint=True, idempotentHint=True)
+    use(mcp, middleware)
+    return middleware
+
+
+class _Flight:
+    """一次进行中的调用，结束时唤醒所有等待者"""
+
+    def __init__(self):
+        self.done = anyio.Event()
+        self.result: types.ServerResult | None = None
+        self.error: Exception | None = None
+
+
+class CoalescingMiddleware:
+    """tools/call中间件：纯函数工具进行中的相同调用只执行一次，结果分发给所有等待者"""
+
+    def __init__(self, tools: set[str] | None = None):
+        self.tools = tools or set()
+        self._inflight: dict[tuple[str, str], _Flight] = {}
+        self.executions: dict[str, int] = dict.fromkeys(self.tools, 0)
+        self.coalesced: dict[str, int] = dict.fromkeys(self.tools, 0)
+
+    async def __call__(self, request: types.CallToolRequest, call_next) -> types.ServerResult:
+        name = request.params.name
+        if name not in self.tools:
+            return await call_next(request)
+
+        key = (name, canonical_arguments(request.params.arguments or {}))
+        while True:
+            flight = self._inflight.get(key)
+            if flight is None:
+                break
+            await flight.done.wait()
+            if flight.result is not None:
+                self.coalesced[name] += 1
+                return flight.result
+            if flight.error is not None:
+                raise flight.error
+            # 执行的调用被取消 (例如客户端取消了请求)，由一个等待者重新执行
+
+        flight = self._inflight[key] = _Flight()
+        self.executions[name] += 1
+        try:
+            flight.result = await call_next(request)
+            return flight.result
+        except anyio.get_cancelled_exc_class():
+            raise
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            del self._inflight[key]
+            flight.done.set()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """按工具名返回执行次数、被合并的调用数和进行中的调用数"""
+        inflight = dict.fromkeys(self.tools, 0)
+        for name, _ in self._inflight:
+            inflight[name] += 1
+        return {
+            name: {"executions": self.executions[name], "coalesced": self.coalesced[name], "inflight": inflight[name]}
+            for name in self.tools
+        }
+
+
+def install_coalescing(mcp: FastMCP) -> CoalescingMiddleware:
+    """为所有标记了 @pure 的已注册工具合并进行中的相同调用，需在工具注册完成后调用
+
+    在结果缓存之后安装时位于缓存内层：命中缓存的调用不经过这里。
+    """
+    tools = {tool.name for tool in mcp._tool_manager.list_tools() if cache_policy(tool.fn) is not None}
+    middleware = CoalescingMiddleware(tools)
+    use(mcp, middleware)
+    return middleware
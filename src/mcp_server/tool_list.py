@@ -0,0 +1,104 @@
+"""预先生成的 tools/list 响应
+
+FastMCP 每次处理 tools/list 都会为每个工具重新构造 Tool 对象 (inputSchema/outputSchema)，
+会话再把结果 model_dump 一遍。工具列表只在注册工具时变化，install_tool_list_cache
+把结果和它的 model_dump 缓存起来，注册新工具时失效，下次请求时重新生成。
+
+响应的 _meta.etag 是工具列表内容的哈希。客户端可以在请求参数中带上之前的值：
+
+    {"method": "tools/list", "params": {"_meta": {"ifNoneMatch": "<etag>"}}}
+
+列表未变化时服务器返回空的 tools 和 _meta.notModified = true，客户端继续使用缓存的列表。
+未携带 ifNoneMatch 的客户端总是得到完整列表。
+"""
+
+import hashlib
+from typing import Any
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+from pydantic import PrivateAttr
+
+try:
+    from .codec import get_codec
+    from .middleware import set_handler
+except ImportError:
+    from codec import get_codec
+    from middleware import set_handler
+
+# 会话发送响应时使用的 model_dump 参数
+_DUMP_OPTIONS = {"by_alias": True, "mode": "json", "exclude_none": True}
+
+
+class _PrecomputedResult(types.ServerResult):
+    """会话发送响应时的 model_dump 直接返回生成列表时转换好的字典"""
+
+    _dumped: dict[str, Any] | None = PrivateAttr(default=None)
+
+    def model_dump(self, **kwargs: Any) -> dict[str, Any]:
+        if self._dumped is not None and kwargs == _DUMP_OPTIONS:
+            return self._dumped
+        return super().model_dump(**kwargs)
+
+
+def request_etag(request: types.ListToolsRequest | None) -> str | None:
+    """读取请求中 _meta.ifNoneMatch 的值 (SDK内部刷新工具定义时以None调用处理函数)"""
+    params = request.params if request is not None else None
+    meta = params.meta if params is not None else None
+    return getattr(meta, "ifNoneMatch", None) if meta is not None else None
+
+
+class ToolListCache:
+    """tools/list 的处理函数，缓存完整的响应"""
+
+    def __init__(self, mcp: FastMCP):
+        self.mcp = mcp
+        self.etag: str | None = None
+        self._result: _PrecomputedResult | None = None
+        self._not_modified: types.ServerResult | None = None
+        self.builds = 0
+
+    def invalidate(self) -> None:
+        self._result = None
+
+    async def result(self) -> _PrecomputedResult:
+        """返回缓存的完整响应，失效后重新生成"""
+        if self._result is None:
+            tools = await self.mcp.list_tools()
+            # 与底层Server默认的处理函数一样刷新它的工具定义缓存 (SDK默认的tools/call用于校验参数)
+            server = self.mcp._mcp_server
+            server._tool_cache = {tool.name: tool for tool in tools}
+            listing = types.ListToolsResult(tools=tools).model_dump(**_DUMP_OPTIONS)
+            digest = hashlib.blake2b(get_codec().dumps(listing, sort_keys=True).encode(), digest_size=12)
+            self.etag = digest.hexdigest()
+
+            result = _PrecomputedResult(types.ListToolsResult(tools=tools, _meta={"etag": self.etag}))
+            result._dumped = result.model_dump(**_DUMP_OPTIONS)
+            self._not_modified = types.ServerResult(
+                types.ListToolsResult(tools=[], _meta={"etag": self.etag, "notModified": True})
+            )
+            self._result = result
+            self.builds += 1
+        return self._result
+
+    async def __call__(self, request: types.ListToolsRequest | None) -> types.ServerResult:
+        result = await self.result()
+        if request_etag(request) == self.etag:
+            return self._not_modified
+        return result
+
+
+def install_tool_list_cache(mcp: FastMCP) -> ToolListCache:
+    """用 ToolListCache 替换 tools/list 的处理函数，之后注册的工具会使缓存失效"""
+    cache = ToolListCache(mcp)
+    manager = mcp._tool_manager
+    add_tool = manager.add_tool
+
+    def add_tool_and_invalidate(*args: Any, **kwargs: Any):
+        tool = add_tool(*args, **kwargs)
+        cache.invalidate()
+        return tool
+
+    manager.add_tool = add_tool_and_invalidate
+    set_handler(mcp, cache, types.ListToolsRequest)
+    return cache
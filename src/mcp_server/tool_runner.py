@@ -0,0 +1,305 @@
+"""tools/call 的快速处理路径
+
+install_tool_runner 用 ToolRunner 替换 tools/call 中间件链最内层的处理函数
+(SDK底层Server注册的处理函数)，减少每次调用中由Python完成的工作：
+
+- 参数和输出的JSON Schema校验使用按工具缓存的校验器。
+  底层Server每次调用 jsonschema.validate，都会重新用元schema校验工具的schema，
+  单次调用约1ms，远超过加法和序列化本身
+- 结构化结果只序列化一次 (使用 codec.py 选出的编解码器)，文本内容直接复用；
+  FastMCP 默认会再用 pydantic 单独生成一份缩进格式的文本
+- 同步工具按 @execution 声明的策略 (见 execution.py) 在事件循环、线程池或共享的进程池中执行，
+  耗时的调用不阻塞事件循环，其他请求和传输的读写可以同时进行；异步工具仍在事件循环上执行。
+  同时执行的工具调用数不超过 max_concurrency (进程池为 process_workers)，超出的调用排队等待；
+  排队的调用超过 max_queue 时直接返回繁忙错误，客户端可以稍后重试，而不是无限制地堆积
+- 用 @fast_path 声明的简单类型工具 (见 fast_path.py) 在输入明确合法时跳过schema和pydantic校验，
+  结果直接编码；其他情况回到通用路径
+
+返回列表、内容块、图片或None的工具仍走FastMCP原有的结果转换，
+错误信息和返回结构与SDK的默认处理保持一致。
+"""
+
+from typing import Any, NamedTuple
+
+import anyio
+import anyio.to_thread
+import jsonschema
+import mcp.types as types
+from jsonschema.exceptions import best_match
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+from mcp.server.fastmcp.tools import Tool
+from mcp.server.fastmcp.utilities.types import Image
+
+try:
+    from .codec import JsonCodec, get_codec
+    from .execution import ExecutionPolicy, ProcessPool, execution_policy
+    from .fast_path import FastPath, wants_fast_path
+    from .middleware import set_handler
+    from .profiling import current_call
+except ImportError:
+    from codec import JsonCodec, get_codec
+    from execution import ExecutionPolicy, ProcessPool, execution_policy
+    from fast_path import FastPath, wants_fast_path
+    from middleware import set_handler
+    from profiling import current_call
+
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_QUEUE = 256
+
+# 这些结果由FastMCP的 _convert_to_content 展开成多个内容块，保持原有转换
+_CONTENT_RESULTS = (list, tuple, Image, types.TextContent, types.ImageContent, types.AudioContent,
+                    types.ResourceLink, types.EmbeddedResource)
+
+
+def _compile(schema: dict[str, Any] | None) -> Any:
+    """与 jsonschema.validate 相同的方式选择校验器类并检查schema，只在首次使用时执行"""
+    if schema is None:
+        return None
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+def _parse_arguments(tool: Tool, arguments: dict[str, Any], context: Any) -> dict[str, Any]:
+    """与 Tool.run 相同的参数校验和转换"""
+    metadata = tool.fn_metadata
+    parsed = metadata.arg_model.model_validate(metadata.pre_parse_json(arguments)).model_dump_one_level()
+    if tool.context_kwarg is not None:
+        parsed[tool.context_kwarg] = context
+    return parsed
+
+
+def _call_sync(tool: Tool, arguments: dict[str, Any], context: Any, kwargs: dict[str, Any] | None = None) -> Any:
+    """在事件循环或工作线程中完成与 Tool.run 相同的参数校验和调用，kwargs为快速路径已检查好的参数"""
+    try:
+        if kwargs is None:
+            kwargs = _parse_arguments(tool, arguments, context)
+        return tool.fn(**kwargs)
+    except Exception as e:
+        raise ToolError(f"Error executing tool {tool.name}: {e}") from e
+
+
+class _Prepared(NamedTuple):
+    """每个工具预先准备好的校验器、执行策略和快速路径"""
+    tool: Tool
+    input_validator: Any
+    output_validator: Any
+    policy: ExecutionPolicy
+    fast: FastPath | None
+
+
+def _error_message(validator: Any, instance: Any) -> str | None:
+    error = best_match(validator.iter_errors(instance))
+    return error.message if error is not None else None
+
+
+class ToolRunner:
+    """tools/call 的处理函数"""
+
+    def __init__(
+        self,
+        mcp: FastMCP,
+        codec: JsonCodec,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        process_workers: int | None = None,
+    ):
+        self.mcp = mcp
+        self.codec = codec
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.processes = ProcessPool(process_workers)
+        # 工具名 -> 预先准备的内容；工具被重新注册时重新准备
+        self._prepared: dict[str, _Prepared] = {}
+        self._limiter: anyio.CapacityLimiter | None = None
+        self._process_limiter: anyio.CapacityLimiter | None = None
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        """限制同时执行的工具调用数，在事件循环中首次使用时创建 (多进程worker各自创建)"""
+        if self._limiter is None or self._limiter.total_tokens != self.max_concurrency:
+            self._limiter = anyio.CapacityLimiter(self.max_concurrency)
+        return self._limiter
+
+    @property
+    def process_limiter(self) -> anyio.CapacityLimiter:
+        """限制同时提交到进程池的调用数，使排队发生在这里而不是进程池内部"""
+        if self._process_limiter is None:
+            self._process_limiter = anyio.CapacityLimiter(self.processes.max_workers)
+        return self._process_limiter
+
+    def _admit(self, tool: Tool, limiter: anyio.CapacityLimiter) -> None:
+        """排队的调用过多时拒绝新的调用"""
+        waiting = limiter.statistics().tasks_waiting
+        if waiting >= self.max_queue:
+            raise ToolError(f"Server busy: {waiting} tool calls are queued, retry {tool.name} later")
+
+    async def run(
+        self,
+        tool: Tool,
+        arguments: dict[str, Any],
+        policy: ExecutionPolicy | None = None,
+        kwargs: dict[str, Any] | None = None,
+    ) -> Any:
+        """按执行策略执行工具，超时时抛出 ToolError；kwargs为快速路径已检查好的参数"""
+        policy = policy or self._prepare(tool).policy
+        context = self.mcp.get_context()
+        if policy.mode == "inline" and not tool.is_async:
+            return _call_sync(tool, arguments, context, kwargs)
+        try:
+            with anyio.fail_after(policy.timeout):
+                return await self._dispatch(tool, arguments, context, policy, kwargs)
+        except TimeoutError:
+            raise ToolError(f"Error executing tool {tool.name}: timed out after {policy.timeout:g}s") from None
+
+    async def _dispatch(
+        self,
+        tool: Tool,
+        arguments: dict[str, Any],
+        context: Any,
+        policy: ExecutionPolicy,
+        kwargs: dict[str, Any] | None,
+    ) -> Any:
+        if tool.is_async:
+            limiter = self.limiter
+            self._admit(tool, limiter)
+            async with limiter:
+                if kwargs is None:
+                    return await tool.run(arguments, context=context)
+                try:
+                    return await tool.fn(**kwargs)
+                except Exception as e:
+                    raise ToolError(f"Error executing tool {tool.name}: {e}") from e
+
+        if policy.mode == "process":
+            limiter = self.process_limiter
+            self._admit(tool, limiter)
+            # 参数在当前进程中校验，子进程只执行工具函数
+            try:
+                if kwargs is None:
+                    kwargs = _parse_arguments(tool, arguments, context)
+            except Exception as e:
+                raise ToolError(f"Error executing tool {tool.name}: {e}") from e
+            async with limiter:
+                try:
+                    return await self.processes.run(tool.fn, kwargs)
+                except Exception as e:
+                    raise ToolError(f"Error executing tool {tool.name}: {e}") from e
+
+        limiter = self.limiter
+        self._admit(tool, limiter)
+        # 超时后不再等待工作线程，线程执行完毕后释放
+        return await anyio.to_thread.run_sync(
+            _call_sync, tool, arguments, context, kwargs, abandon_on_cancel=True, limiter=limiter
+        )
+
+    def _check(self, tool: Tool) -> tuple[ExecutionPolicy, FastPath | None]:
+        """检查工具的执行策略和快速路径声明"""
+        policy = execution_policy(tool.fn)
+        if policy.mode == "process" and (tool.is_async or tool.context_kwarg is not None):
+            raise ValueError(f"Tool {tool.name} cannot run in a process: async tools and tools "
+                             "taking a Context must run in the server process")
+        fast = FastPath(tool) if wants_fast_path(tool.fn) else None
+        return policy, fast
+
+    def _prepare(self, tool: Tool) -> _Prepared:
+        entry = self._prepared.get(tool.name)
+        if entry is None or entry.tool is not tool:
+            policy, fast = self._check(tool)
+            entry = _Prepared(tool, _compile(tool.parameters), _compile(tool.output_schema), policy, fast)
+            self._prepared[tool.name] = entry
+        return entry
+
+    def convert(self, tool: Tool, result: Any) -> tuple[list[types.ContentBlock], dict[str, Any] | None]:
+        """把工具返回值转换为 (内容块, 结构化结果)"""
+        metadata = tool.fn_metadata
+        if metadata.output_schema is None or result is None or isinstance(result, _CONTENT_RESULTS):
+            converted = metadata.convert_result(result)
+            if metadata.output_schema is None:
+                return list(converted), None
+            content, structured = converted
+            return list(content), structured
+
+        value = {"result": result} if metadata.wrap_output else result
+        structured = metadata.output_model.model_validate(value).model_dump(mode="json", by_alias=True)
+        if isinstance(result, str):
+            # 与FastMCP一致，字符串结果原样作为文本
+            text = result
+        else:
+            text = self.codec.dumps(structured["result"] if metadata.wrap_output else structured)
+        return [types.TextContent(type="text", text=text)], structured
+
+    async def __call__(self, request: types.CallToolRequest) -> types.ServerResult:
+        server = self.mcp._mcp_server
+        # 被剖析抽中的调用记录各阶段耗时 (见 profiling.py)
+        profile = current_call()
+        if profile is not None:
+            profile.mark("dispatch")
+        try:
+            name = request.params.name
+            arguments = request.params.arguments or {}
+            tool = self.mcp._tool_manager.get_tool(name)
+            if tool is None:
+                raise ToolError(f"Unknown tool: {name}")
+
+            prepared = self._prepare(tool)
+            fast = prepared.fast
+            kwargs = fast.parse(arguments) if fast is not None else None
+            if kwargs is None:
+                message = _error_message(prepared.input_validator, arguments)
+                if message is not None:
+                    return server._make_error_result(f"Input validation error: {message}")
+            if profile is not None:
+                profile.mark("validate")
+
+            result = await self.run(tool, arguments, prepared.policy, kwargs)
+            if profile is not None:
+                profile.mark("execute")
+            if kwargs is not None:
+                encoded = fast.encode(result, self.codec.dumps)
+                if encoded is not None:
+                    text, structured = encoded
+                    return types.ServerResult(types.CallToolResult(
+                        content=[types.TextContent(type="text", text=text)], structuredContent=structured, isError=False
+                    ))
+
+            content, structured = self.convert(tool, result)
+            output_validator = prepared.output_validator
+            if output_validator is not None:
+                if structured is None:
+                    return server._make_error_result(
+                        "Output validation error: outputSchema defined but no structured output returned"
+                    )
+                message = _error_message(output_validator, structured)
+                if message is not None:
+                    return server._make_error_result(f"Output validation error: {message}")
+
+            return types.ServerResult(
+                types.CallToolResult(content=content, structuredContent=structured, isError=False)
+            )
+        except Exception as e:
+            return server._make_error_result(str(e))
+        finally:
+            if profile is not None:
+                profile.mark("encode")
+
+
+def install_tool_runner(
+    mcp: FastMCP,
+    codec: JsonCodec | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_queue: int = DEFAULT_MAX_QUEUE,
+    process_workers: int | None = None,
+) -> ToolRunner:
+    """用 ToolRunner 替换 tools/call 的最内层处理函数，已注册的中间件保持不变
+
+    已注册工具的执行策略和快速路径在这里检查，不合法的声明
+    (例如异步工具使用 process、参数不是简单类型的工具使用 @fast_path) 立即报错。
+    schema校验器在工具首次被调用时编译 (检查schema本身每个工具约需2.5ms，不计入冷启动)。
+    """
+    runner = ToolRunner(mcp, codec or get_codec(), max_concurrency, max_queue, process_workers)
+    for tool in mcp._tool_manager.list_tools():
+        runner._check(tool)
+    set_handler(mcp, runner)
+    return runner
@@ -0,0 +1,126 @@
+"""使用可替换JSON编解码器的stdio传输
+
+与SDK的 mcp.server.stdio.stdio_server 协议一致 (每行一条JSON-RPC消息，UTF-8)，区别在于：
+- 按块读取标准输入并预先缓冲多条消息，客户端连续发送的请求不必等前一个处理完才被读取；
+  底层Server为每条消息启动独立的任务，响应按完成顺序写出
+- 写出时合并已就绪的多条响应，一次写入并flush；SDK每条消息都要经过两次线程切换
+- 消息的解析和序列化交给 codec.py 选出的编解码器：先解析为字典再交给 pydantic 校验，
+  输出时 model_dump 后再序列化。安装了 orjson/msgspec 时比 pydantic 的
+  model_validate_json/model_dump_json 更快，负载越大差距越明显 (见 benchmarks/bench_codec.py)；
+  标准库json比pydantic-core慢，使用标准库编解码器时直接用pydantic处理消息
+"""
+
+import sys
+from contextlib import asynccontextmanager
+from typing import BinaryIO
+
+import anyio
+import anyio.lowlevel
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.message import SessionMessage
+
+try:
+    from .codec import JsonCodec, get_codec
+    from .jsonrpc_batch import JSONRPCBatch, is_batch
+    from .profiling import active_profiler
+except ImportError:
+    from codec import JsonCodec, get_codec
+    from jsonrpc_batch import JSONRPCBatch, is_batch
+    from profiling import active_profiler
+
+# 每次从标准输入读取的最大字节数
+CHUNK_SIZE = 256 * 1024
+# 读取后尚未被会话取走的消息数上限
+READ_AHEAD = 64
+
+
+def encode_message(codec: JsonCodec, message: types.JSONRPCMessage | JSONRPCBatch) -> str:
+    if codec.name == "json":
+        return message.model_dump_json(by_alias=True, exclude_none=True)
+    return codec.dumps(message.model_dump(by_alias=True, mode="json", exclude_none=True))
+
+
+def decode_message(codec: JsonCodec, line: str | bytes) -> types.JSONRPCMessage | JSONRPCBatch:
+    if is_batch(line):
+        # 批量数组的元素由 jsonrpc_batch 在会话中逐个校验
+        return JSONRPCBatch(codec.loads(line))
+    if codec.name == "json":
+        return types.JSONRPCMessage.model_validate_json(line)
+    return types.JSONRPCMessage.model_validate(codec.loads(line))
+
+
+def _write(stdout: BinaryIO, data: bytes) -> None:
+    stdout.write(data)
+    stdout.flush()
+
+
+@asynccontextmanager
+async def stdio_server(codec: JsonCodec | None = None, stdin: BinaryIO | None = None, stdout: BinaryIO | None = None):
+    """stdio服务器传输，返回 (read_stream, write_stream)"""
+    codec = codec or get_codec()
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    read = getattr(stdin, "read1", stdin.read)
+    decode, encode = decode_message, encode_message
+    profiler = active_profiler()
+    if profiler is not None:
+        # 开启剖析时记录每条消息的解析和序列化耗时
+        decode = profiler.timed("transport_decode", decode_message)
+        encode = profiler.timed("transport_encode", encode_message)
+
+    # 读取端预先缓冲若干条消息，客户端连续发送的请求可以被立即分派
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(READ_AHEAD)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def dispatch(line: bytes) -> None:
+        try:
+            message = decode(codec, line)
+        except Exception as exc:
+            await read_stream_writer.send(exc)
+            return
+        await read_stream_writer.send(SessionMessage(message))
+
+    async def stdin_reader():
+        try:
+            async with read_stream_writer:
+                pending = b""
+                # 按块读取，一次线程切换处理块内的所有消息
+                while chunk := await anyio.to_thread.run_sync(read, CHUNK_SIZE, abandon_on_cancel=True):
+                    lines = (pending + chunk).split(b"\n")
+                    pending = lines.pop()
+                    for line in lines:
+                        if line.strip():
+                            await dispatch(line)
+                if pending.strip():
+                    await dispatch(pending)
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    # 合并已经就绪的响应，一次写入并flush
+                    parts = [encode(codec, session_message.message)]
+                    while True:
+                        try:
+                            parts.append(encode(codec, write_stream_reader.receive_nowait().message))
+                        except (anyio.WouldBlock, anyio.EndOfStream):
+                            break
+                    parts.append("")
+                    await anyio.to_thread.run_sync(_write, stdout, "\n".join(parts).encode())
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stdin_reader)
+        tg.start_soon(stdout_writer)
+        yield read_stream, write_stream
+
+
+async def run_stdio(mcp: FastMCP, codec: JsonCodec | None = None) -> None:
+    """与 FastMCP.run_stdio_async 相同，使用上面的stdio传输"""
+    server = mcp._mcp_server
+    async with stdio_server(codec) as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
@@ -0,0 +1,243 @@
+"""多进程worker模式
+
+父进程先绑定监听端口，再fork出N个worker进程。所有worker共享同一个监听socket，
+由内核把新连接分发给空闲的worker，吞吐量随CPU核数扩展。
+
+- streamable-http: worker以无状态模式运行，任意请求都可以由任意worker处理。
+- sse: SSE流建立在某个worker上，之后客户端POST的消息必须交给同一个worker。
+  每个worker使用自己的消息路径 /messages/<index>/，并额外监听一个私有的Unix socket；
+  worker收到属于其他worker的POST时，通过对方的Unix socket转发过去，实现会话亲和。
+
+worker依赖fork继承已注册好工具的FastMCP实例，因此仅支持POSIX平台。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+from collections.abc import Callable
+from multiprocessing.connection import Connection, wait
+from typing import Any
+
+from mcp.server.fastmcp import FastMCP
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    from .compat import suppress_stateless_teardown_errors
+    from .profiling import active_profiler
+    from .readiness import ReadyServer
+except ImportError:
+    from compat import suppress_stateless_teardown_errors
+    from profiling import active_profiler
+    from readiness import ReadyServer
+
+
+# 只对单个连接有效的头 (RFC 9110 7.6.1)，转发时不能原样传递
+_HOP_BY_HOP = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "proxy-connection",
+    "te", "trailer", "transfer-encoding", "upgrade",
+})
+# httpx已经按 content-encoding 解码了响应体，长度和编码头都要按转发的内容重新生成
+_BODY_HEADERS = frozenset({"content-encoding", "content-length"})
+
+
+def _forwardable(headers: Any, drop: frozenset[str] = frozenset()) -> list[tuple[str, str]]:
+    """去掉逐跳头 (包括 Connection 头中列出的) 以及 drop 中的头，保留重复的头"""
+    listed = {name.strip().lower() for value in headers.get_list("connection") for name in value.split(",")}
+    return [
+        (name, value) for name, value in headers.multi_items()
+        if name.lower() not in _HOP_BY_HOP and name.lower() not in listed and name.lower() not in drop
+    ]
+
+
+def _socket_path(runtime_dir: str, index: int) -> str:
+    return os.path.join(runtime_dir, f"worker-{index}.sock")
+
+
+class SessionAffinity:
+    """把SSE消息POST路由回建立该会话的worker"""
+
+    def __init__(self, app: ASGIApp, index: int, runtime_dir: str, message_prefix: str):
+        self.app = app
+        self.index = index
+        self.runtime_dir = runtime_dir
+        self.message_prefix = message_prefix
+        self._clients: dict[int, Any] = {}
+
+    def _owner(self, path: str) -> int | None:
+        """从 /messages/<index>/ 形式的路径中解析出所属worker"""
+        if not path.startswith(self.message_prefix):
+            return None
+        owner = path[len(self.message_prefix):].split("/", 1)[0]
+        return int(owner) if owner.isdigit() else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] == "POST":
+            owner = self._owner(scope["path"])
+            if owner is not None and owner != self.index:
+                await self._forward(owner, scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _client(self, owner: int):
+        import httpx
+
+        client = self._clients.get(owner)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(uds=_socket_path(self.runtime_dir, owner))
+            client = httpx.AsyncClient(transport=transport, base_url="http://worker")
+            self._clients[owner] = client
+        return client
+
+    async def _forward(self, owner: int, scope: Scope, receive: Receive, send: Send) -> None:
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        import httpx
+
+        # 请求体已经完整读出，长度由httpx按转发的内容重新设置；
+        # 不声明可接受的编码，对方返回未压缩的响应体
+        request_headers = httpx.Headers([(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]])
+        headers = _forwardable(request_headers, _BODY_HEADERS | {"host", "accept-encoding"})
+        url = scope["path"]
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode("latin-1")
+        response = await self._client(owner).post(url, content=body, headers=headers)
+
+        content = response.content
+        response_headers = _forwardable(response.headers, _BODY_HEADERS)
+        response_headers.append(("content-length", str(len(content))))
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response_headers],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+class _WorkerServer(ReadyServer):
+    """worker进程的uvicorn服务器，关闭时写出剖析结果
+
+    multiprocessing用os._exit结束子进程，uvicorn也会在serve返回前重新发出收到的退出信号，
+    atexit和serve之后的代码都不会执行，因此在关闭流程中写出。
+    """
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().shutdown(sockets)
+        profiler = active_profiler()
+        if profiler is not None:
+            profiler.dump()
+
+
+def _worker_main(
+    mcp: FastMCP, transport: str, index: int, listener: socket.socket, runtime_dir: str, ready: Connection
+) -> None:
+    """worker进程入口：在共享socket和私有Unix socket上运行uvicorn"""
+    import uvicorn
+
+    # fork会继承父进程的信号处理函数，这里恢复默认行为，交给uvicorn重新接管
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    sockets = [listener]
+    if transport == "sse":
+        base_path = mcp.settings.message_path.rstrip("/")
+        mcp.settings.message_path = f"{base_path}/{index}/"
+        app = SessionAffinity(mcp.sse_app(), index, runtime_dir, f"{base_path}/")
+
+        private = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        path = _socket_path(runtime_dir, index)
+        if os.path.exists(path):
+            os.unlink(path)
+        private.bind(path)
+        private.listen(128)
+        sockets.append(private)
+    else:
+        # 无状态模式下请求之间不共享会话，可以落在任意worker上
+        suppress_stateless_teardown_errors()
+        mcp.settings.stateless_http = True
+        app = mcp.streamable_http_app()
+
+    config = uvicorn.Config(app, log_level=mcp.settings.log_level.lower())
+    # 启动完成后告知父进程，全部worker就绪时父进程发出就绪通知
+    server = _WorkerServer(config, lambda: ready.send(index))
+    asyncio.run(server.serve(sockets=sockets))
+
+
+def serve(mcp: FastMCP, transport: str, workers: int, on_ready: Callable[[], None] | None = None) -> None:
+    """以多进程模式运行MCP服务器，阻塞直到收到退出信号
+
+    Args:
+        mcp: 已注册好工具的FastMCP实例
+        transport: 传输方式，"sse" 或 "streamable-http"
+        workers: worker进程数
+        on_ready: 所有worker首次启动完成后调用一次
+    """
+    if transport not in ("sse", "streamable-http"):
+        raise ValueError(f"Worker mode does not support transport: {transport}")
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    listener = socket.create_server((mcp.settings.host, mcp.settings.port), backlog=2048)
+    listener.set_inheritable(True)
+    runtime_dir = tempfile.mkdtemp(prefix="pymcp-workers-")
+    context = multiprocessing.get_context("fork")
+    ready_reader, ready_writer = context.Pipe(duplex=False)
+    processes: dict[int, Any] = {}
+    ready: set[int] = set()
+    stopping = False
+
+    def start(index: int) -> None:
+        process = context.Process(
+            target=_worker_main,
+            args=(mcp, transport, index, listener, runtime_dir, ready_writer),
+            name=f"pymcp-worker-{index}",
+        )
+        process.start()
+        processes[index] = process
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    print(f"Starting {workers} workers on http://{mcp.settings.host}:{mcp.settings.port} ({transport})")
+    try:
+        for index in range(workers):
+            start(index)
+
+        # 监控worker进程，意外退出的worker按原编号重新拉起
+        while not stopping:
+            readable = wait([ready_reader, *(process.sentinel for process in processes.values())])
+            if ready_reader in readable and len(ready) < workers:
+                ready.add(ready_reader.recv())
+                if len(ready) == workers and on_ready is not None:
+                    on_ready()
+            elif ready_reader in readable:
+                # worker重启后的就绪消息，只需读出
+                ready_reader.recv()
+            for index, process in list(processes.items()):
+                if not process.is_alive() and not stopping:
+                    print(f"Worker {index} exited with code {process.exitcode}, restarting")
+                    start(index)
+    finally:
+        for process in processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        listener.close()
+        ready_reader.close()
+        ready_writer.close()
+        shutil.rmtree(runtime_dir, ignore_errors=True)
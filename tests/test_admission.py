@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+测试HTTP传输的准入控制：会话数、单会话未响应请求数和全局未响应请求数超限时快速拒绝，
+以及客户端不发DELETE就离开的Streamable HTTP会话在空闲超时后释放名额
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+import httpx
+
+# 添加src目录到Python路径
+SRC_DIR = Path(__file__).parent.parent / "src" / "mcp_server"
+sys.path.insert(0, str(SRC_DIR))
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+
+from admission import SERVER_OVERLOADED
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize",
+              "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "test", "version": "0"}}}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+# 额外注册一个耗时的异步工具，用来制造未响应的请求
+SERVER_SCRIPT = f"""
+import asyncio
+import sys
+sys.path.insert(0, {str(SRC_DIR)!r})
+import sum_int
+
+@sum_int.mcp.tool()
+async def slow(seconds: float) -> float:
+    await asyncio.sleep(seconds)
+    return seconds
+
+sum_int.run(sys.argv[1], ready_fd=int(sys.argv[2]), max_sessions=2, max_session_requests=2, max_pending=3,
+            session_idle_timeout=2)
+"""
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_ready(ready_fd: int, timeout: float = 30) -> bool:
+    """等待服务器向就绪管道写入 READY=1"""
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(ready_fd, readable.set)
+    try:
+        await asyncio.wait_for(readable.wait(), timeout)
+        return os.read(ready_fd, 64).startswith(b"READY=1")
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(ready_fd)
+
+
+async def start_server(script: str, transport: str) -> tuple[subprocess.Popen, int]:
+    port = free_port()
+    ready_read, ready_write = os.pipe()
+    process = subprocess.Popen(
+        [sys.executable, script, transport, str(ready_write)],
+        env=dict(os.environ, MCP_SERVER_PORT=str(port)),
+        pass_fds=(ready_write,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(ready_write)
+    try:
+        assert await wait_for_ready(ready_read), "MCP server failed to start within timeout"
+    finally:
+        os.close(ready_read)
+    return process, port
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def open_session(stack: AsyncExitStack, client) -> ClientSession:
+    streams = await stack.enter_async_context(client)
+    session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+    await session.initialize()
+    return session
+
+
+async def call_slow(session: ClientSession, seconds: float = 0.5):
+    """返回工具结果，被拒绝时返回错误对象"""
+    try:
+        return await session.call_tool("slow", {"seconds": seconds})
+    except McpError as exc:
+        return exc.error
+
+
+def rejected(outcomes: list) -> list:
+    return [outcome for outcome in outcomes if getattr(outcome, "code", None) == SERVER_OVERLOADED]
+
+
+async def check_request_limits(first: ClientSession, second: ClientSession):
+    """单会话最多2个、全局最多3个未响应的请求"""
+    outcomes = await asyncio.gather(*(call_slow(first) for _ in range(3)))
+    errors = rejected(outcomes)
+    assert len(errors) == 1, outcomes
+    assert "too many requests in flight for this session" in errors[0].message
+    assert errors[0].data == {"retryAfter": 1}
+
+    async def second_session_calls():
+        await asyncio.sleep(0.1)
+        return await asyncio.gather(call_slow(second), call_slow(second))
+
+    first_outcomes, second_outcomes = await asyncio.gather(
+        asyncio.gather(call_slow(first), call_slow(first)), second_session_calls())
+    assert not rejected(first_outcomes), first_outcomes
+    errors = rejected(second_outcomes)
+    assert len(errors) == 1 and errors[0].message == "Server overloaded: too many requests in flight", second_outcomes
+
+    # 请求完成后计数释放，可以继续调用
+    result = await first.call_tool("sum", {"a": 1, "b": 2})
+    assert result.structuredContent["result"] == 3
+
+
+async def check_metrics(port: int, expected: dict[str, int]):
+    async with httpx.AsyncClient() as client:
+        text = (await client.get(f"http://127.0.0.1:{port}/metrics")).text
+    for reason, count in expected.items():
+        assert f'pymcp_admission_rejected_total{{reason="{reason}",' in text, text
+        line = next(line for line in text.splitlines() if f'reason="{reason}"' in line)
+        assert line.endswith(f" {count}"), line
+
+
+async def test_streamable_http(script: str):
+    process, port = await start_server(script, "streamable-http")
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        async with AsyncExitStack() as stack:
+            first = await open_session(stack, streamablehttp_client(url))
+            second = await open_session(stack, streamablehttp_client(url))
+
+            # 第三个会话在initialize时得到503
+            async with httpx.AsyncClient() as client:
+                response = await client.post(url, json=INITIALIZE, headers=HEADERS)
+                assert response.status_code == 503, response.text
+                assert response.headers["retry-after"] == "1"
+                assert response.json()["error"]["code"] == SERVER_OVERLOADED
+
+            await check_request_limits(first, second)
+
+        await check_metrics(port, {"sessions": 1, "session_requests": 1, "pending": 1})
+        print("✓ streamable-http")
+
+        # 两个会话初始化后不发DELETE就离开：名额一直被占用，直到空闲超时后被回收
+        async with httpx.AsyncClient() as client:
+            abandoned = []
+            for request_id in range(2):
+                response = await client.post(url, json=dict(INITIALIZE, id=request_id), headers=HEADERS)
+                assert response.status_code == 200, response.text
+                abandoned.append(response.headers["mcp-session-id"])
+            response = await client.post(url, json=INITIALIZE, headers=HEADERS)
+            assert response.status_code == 503, response.text
+            await asyncio.sleep(2.5)
+            response = await client.post(url, json=INITIALIZE, headers=HEADERS)
+            assert response.status_code == 200, response.text
+            # 被回收的会话在SDK中也已结束
+            response = await client.post(url, json=INITIALIZED, headers=dict(HEADERS, **{"mcp-session-id": abandoned[0]}))
+            assert response.status_code == 400, response.text
+            metrics = (await client.get(f"http://127.0.0.1:{port}/metrics")).text
+            assert 'pymcp_admission_expired_sessions_total{transport="streamable-http"} 2' in metrics, metrics
+        print("✓ idle streamable-http sessions reclaimed")
+    finally:
+        stop_server(process)
+
+
+async def test_sse(script: str):
+    process, port = await start_server(script, "sse")
+    url = f"http://127.0.0.1:{port}/sse"
+    try:
+        async with AsyncExitStack() as stack:
+            first = await open_session(stack, sse_client(url))
+            second = await open_session(stack, sse_client(url))
+
+            async with httpx.AsyncClient() as client:
+                response = await client.get(url)
+                assert response.status_code == 503, response.text
+                assert response.headers["retry-after"] == "1"
+
+            await check_request_limits(first, second)
+
+        # 事件流关闭后会话名额释放
+        await asyncio.sleep(0.2)
+        async with AsyncExitStack() as stack:
+            session = await open_session(stack, sse_client(url))
+            result = await session.call_tool("sum", {"a": 2, "b": 2})
+            assert result.structuredContent["result"] == 4
+
+        await check_metrics(port, {"sessions": 1, "session_requests": 1, "pending": 1})
+        print("✓ sse")
+    finally:
+        stop_server(process)
+
+
+async def main():
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(SERVER_SCRIPT)
+        script = f.name
+    try:
+        await test_streamable_http(script)
+        await test_sse(script)
+    finally:
+        Path(script).unlink()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
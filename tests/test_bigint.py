@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试大整数编码和 sum_big 工具
+"""
+
+import asyncio
+import base64
+import random
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from bigint import decode_base64, encode_base64, format_decimal, parse_decimal
+
+
+def random_digits(count: int) -> str:
+    return str(random.randint(1, 9)) + "".join(random.choices("0123456789", k=count - 1))
+
+
+def test_decimal_round_trip():
+    """分治转换的结果与内置转换一致，且不受 int_max_str_digits 限制"""
+    limit = sys.get_int_max_str_digits()
+    for count in (1, 17, 2048, 2049, 4097, 10_000, 50_001):
+        text = random_digits(count)
+        value = parse_decimal(text)
+        assert parse_decimal("-" + text) == -value
+        assert parse_decimal("+" + text) == value
+        assert format_decimal(value) == text
+        assert format_decimal(-value) == "-" + text
+        if count <= limit:
+            assert value == int(text)
+    # 低半部分含前导零的情况
+    assert format_decimal(10**9000) == "1" + "0" * 9000
+    assert format_decimal(10**9000 - 1) == "9" * 9000
+    assert parse_decimal("0" * 5000 + "12") == 12
+    for invalid in ("", "-", "1.5", "1e5", " 1", "1_000", "１２"):
+        try:
+            parse_decimal(invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f"{invalid!r} should be rejected")
+
+
+def test_base64_round_trip():
+    """base64编码为小端序二进制补码，使用最少字节数"""
+    assert encode_base64(0) == base64.b64encode(b"\x00").decode()
+    assert encode_base64(127) == base64.b64encode(b"\x7f").decode()
+    assert encode_base64(128) == base64.b64encode(b"\x80\x00").decode()
+    assert encode_base64(-128) == base64.b64encode(b"\x80").decode()
+    assert encode_base64(-129) == base64.b64encode(b"\x7f\xff").decode()
+    for value in (1, -1, 255, -256, 2**53 + 1, -(2**63), 7**5000, -(3**9000)):
+        assert decode_base64(encode_base64(value)) == value
+    for invalid in ("", "not base64!"):
+        try:
+            decode_base64(invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f"{invalid!r} should be rejected")
+
+
+async def test_sum_big_tool():
+    """sum_big 在两种编码下都能精确计算超过2^53和4300位的整数"""
+    server_params = StdioServerParameters(command=sys.executable, args=["src/mcp_server/sum_int.py"])
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            result = await session.call_tool("sum_big", {"a": "9007199254740993", "b": "1"})
+            assert not result.isError, result
+            assert result.structuredContent["result"] == "9007199254740994"
+
+            a, b = parse_decimal(random_digits(20_000)), -parse_decimal(random_digits(19_000))
+            result = await session.call_tool("sum_big", {"a": format_decimal(a), "b": format_decimal(b)})
+            assert parse_decimal(result.structuredContent["result"]) == a + b
+
+            result = await session.call_tool(
+                "sum_big", {"a": encode_base64(a), "b": encode_base64(b), "encoding": "base64"})
+            assert decode_base64(result.structuredContent["result"]) == a + b
+
+            result = await session.call_tool("sum_big", {"a": "12x", "b": "1"})
+            assert result.isError
+
+
+if __name__ == "__main__":
+    test_decimal_round_trip()
+    test_base64_round_trip()
+    asyncio.run(test_sum_big_tool())
+    print("All tests passed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+测试带连接池的MCP客户端：并发调用复用会话、工具列表缓存、服务器重启后自动重连
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import anyio
+from mcp.shared.exceptions import McpError
+
+from client import ClientPool
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_ready(ready_fd: int, timeout: float = 30) -> bool:
+    """等待服务器向就绪管道写入 READY=1"""
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(ready_fd, readable.set)
+    try:
+        await asyncio.wait_for(readable.wait(), timeout)
+        return os.read(ready_fd, 64).startswith(b"READY=1")
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(ready_fd)
+        os.close(ready_fd)
+
+
+async def start_server(transport: str, port: int) -> subprocess.Popen:
+    ready_read, ready_write = os.pipe()
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", transport, "--ready-fd", str(ready_write)],
+        env=dict(os.environ, MCP_SERVER_PORT=str(port)),
+        pass_fds=(ready_write,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(ready_write)
+    assert await wait_for_ready(ready_read), "MCP server failed to start within timeout"
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def test_streamable_http():
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    process = await start_server("streamable-http", port)
+    try:
+        async with ClientPool(size=2) as pool:
+            # 并发调用分摊在最多2个会话上
+            results = await asyncio.gather(*(pool.call_tool(url, "sum", {"a": i, "b": 1}) for i in range(50)))
+            assert [result.structuredContent["result"] for result in results] == [i + 1 for i in range(50)]
+            stats = pool.stats()[url]
+            assert 1 <= stats["sessions"] <= 2 and stats["in_flight"] == 0, stats
+            print(f"✓ 50 concurrent calls over {stats['sessions']} sessions")
+
+            # 工具列表被缓存
+            tools = await pool.list_tools(url)
+            assert {tool.name for tool in tools.tools} >= {"sum", "sum_batch"}
+            assert await pool.list_tools(url) is tools
+            # 强制刷新时服务器确认列表未变化，继续使用缓存的结果
+            assert await pool.list_tools(url, refresh=True) is tools
+            print("✓ list_tools cached")
+
+            # 工具错误原样返回，不重试
+            result = await pool.call_tool(url, "sum_batch", {"a": [1], "b": []})
+            assert result.isError
+
+            # 服务器重启后旧会话失效，调用在新会话上透明重试
+            stop_server(process)
+            process = await start_server("streamable-http", port)
+            result = await pool.call_tool(url, "sum", {"a": 20, "b": 22})
+            assert result.structuredContent["result"] == 42, result
+            print("✓ reconnected after server restart")
+
+            # 没有只读/幂等注解的工具在请求发出后断开时不重试 (可能已在服务器上执行)，除非调用方显式要求
+            tools = {tool.name: tool for tool in (await pool.list_tools(url)).tools}
+            assert tools["sum"].annotations.readOnlyHint and tools["sum_many"].annotations.idempotentHint
+            assert tools["sum_stream_open"].annotations is None
+            stop_server(process)
+            process = await start_server("streamable-http", port)
+            try:
+                await pool.call_tool(url, "sum_stream_open", {})
+                raise AssertionError("non-idempotent call should not be retried")
+            except (McpError, anyio.BrokenResourceError):
+                pass
+            result = await pool.call_tool(url, "sum_stream_open", {}, retry=True)
+            assert not result.isError, result
+            print("✓ only idempotent tools retried after the request was sent")
+
+            # 服务器不可用时调用失败而不是挂起
+            stop_server(process)
+            try:
+                await asyncio.wait_for(pool.call_tool(url, "sum", {"a": 1, "b": 1}), 10)
+            except asyncio.TimeoutError:
+                raise AssertionError("call hung while the server was down")
+            except Exception:
+                pass
+            else:
+                raise AssertionError("expected the call to fail while the server is down")
+            print("✓ calls fail fast while the server is down")
+    finally:
+        stop_server(process)
+
+
+async def test_sse():
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/sse"
+    process = await start_server("sse", port)
+    try:
+        async with ClientPool(size=2, transport="sse") as pool:
+            results = await asyncio.gather(*(pool.call_tool(url, "sum", {"a": i, "b": i}) for i in range(20)))
+            assert [result.structuredContent["result"] for result in results] == [2 * i for i in range(20)]
+        print("✓ sse")
+    finally:
+        stop_server(process)
+
+
+async def main():
+    await test_streamable_http()
+    await test_sse()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
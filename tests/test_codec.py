@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+测试JSON编解码器、stdio传输的消息编解码，以及 tools/call 快速处理路径与SDK默认处理的结果一致
+"""
+
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import mcp.types as types
+
+import sum_int
+from codec import CODECS, get_codec
+from tool_runner import ToolRunner
+from transport import decode_message, encode_message
+
+CASES = [
+    ("sum", {"a": 5, "b": 3}),
+    ("sum", {"a": 2**70, "b": 1}),
+    ("sum", {"a": "x", "b": 1}),
+    ("sum", {"a": 1}),
+    ("sum_batch", {"a": [1, 2, 3], "b": [10, 20, 30]}),
+    ("sum_batch", {"a": [1, 2], "b": [1]}),
+    ("sum_many", {"values": [1, 2, 3, 4]}),
+    ("sum_many", {"values": []}),
+    ("sum_big", {"a": "123456789012345678901234567890", "b": "-1"}),
+    ("sum_big", {"a": "AQ==", "b": "AQ==", "encoding": "base64"}),
+    ("sum_big", {"a": "1", "b": "1", "encoding": "hex"}),
+    ("missing_tool", {}),
+]
+
+
+def available_codecs():
+    for name in CODECS[1:]:
+        try:
+            yield get_codec(name)
+        except ImportError:
+            print(f"- {name} not installed, skipped")
+
+
+def sdk_default_handler():
+    """取得SDK底层Server默认注册的 tools/call 处理函数"""
+    server = sum_int.mcp._mcp_server
+    installed = server.request_handlers[types.CallToolRequest]
+    server.call_tool()(sum_int.mcp.call_tool)
+    default = server.request_handlers[types.CallToolRequest]
+    server.request_handlers[types.CallToolRequest] = installed
+    return default
+
+
+def normalize(result: types.ServerResult) -> dict:
+    """文本内容按JSON比较 (快速路径输出紧凑格式，SDK默认输出缩进格式)"""
+    root = result.root
+    texts = []
+    for block in root.content:
+        try:
+            texts.append(json.loads(block.text))
+        except ValueError:
+            texts.append(block.text)
+    return {"isError": root.isError, "texts": texts, "structured": root.structuredContent}
+
+
+def test_codecs():
+    """所有编解码器输出相同的紧凑JSON，超过64位的整数回退到标准库"""
+    payload = {"b": [1, 2**70, -3], "a": {"text": "中文", "ok": True, "none": None, "x": 1.5}}
+    expected = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    expected_sorted = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+    for codec in available_codecs():
+        assert codec.dumps(payload) == expected, codec.name
+        assert codec.dumps(payload, sort_keys=True) == expected_sorted, codec.name
+        assert codec.loads(expected) == payload, codec.name
+        assert codec.loads(expected.encode()) == payload, codec.name
+    try:
+        get_codec("yaml")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown codec should be rejected")
+
+
+def test_transport_messages():
+    """stdio传输的消息编解码与pydantic的 model_dump_json/model_validate_json 等价"""
+    messages = [
+        types.JSONRPCMessage(types.JSONRPCRequest(
+            jsonrpc="2.0", id=1, method="tools/call", params={"name": "sum", "arguments": {"a": 1, "b": 2}})),
+        types.JSONRPCMessage(types.JSONRPCResponse(
+            jsonrpc="2.0", id="x", result={"content": [{"type": "text", "text": "中文"}], "structuredContent": {"result": 2**70}})),
+        types.JSONRPCMessage(types.JSONRPCNotification(jsonrpc="2.0", method="notifications/initialized")),
+        types.JSONRPCMessage(types.JSONRPCError(jsonrpc="2.0", id=2, error=types.ErrorData(code=-32601, message="nope"))),
+    ]
+    for codec in available_codecs():
+        for message in messages:
+            line = encode_message(codec, message)
+            assert json.loads(line) == json.loads(message.model_dump_json(by_alias=True, exclude_none=True))
+            assert decode_message(codec, line) == message
+            assert decode_message(codec, line.encode()) == message
+        for invalid in ("{", '{"jsonrpc": "2.0"}'):
+            try:
+                decode_message(codec, invalid)
+            except Exception:
+                continue
+            raise AssertionError(f"{invalid!r} should be rejected")
+
+
+async def test_runner_matches_sdk():
+    """每个工具的结果、错误信息与SDK默认处理一致"""
+    default = sdk_default_handler()
+    for codec in available_codecs():
+        runner = ToolRunner(sum_int.mcp, codec)
+        for name, arguments in CASES:
+            request = types.CallToolRequest(
+                method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+            expected = normalize(await default(request))
+            actual = normalize(await runner(request))
+            assert actual == expected, f"{codec.name} {name} {arguments}: {actual} != {expected}"
+        print(f"- {codec.name}: {len(CASES)} cases match")
+
+    # 文本内容是紧凑格式，并且与结构化结果一致
+    request = types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name="sum_batch", arguments={"a": [1], "b": [2]}))
+    result = (await ToolRunner(sum_int.mcp, get_codec("json"))(request)).root
+    assert result.content[0].text == '{"sums":[3],"count":1}'
+    assert result.structuredContent == {"sums": [3], "count": 1}
+
+
+if __name__ == "__main__":
+    # SDK在找不到工具时会打印警告，这里不需要
+    logging.disable(logging.WARNING)
+    test_codecs()
+    test_transport_messages()
+    asyncio.run(test_runner_matches_sdk())
+    print("All tests passed!")
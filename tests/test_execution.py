@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+测试工具的执行策略：inline/thread/process 的执行位置、超时和排队过多时的繁忙错误
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+
+from execution import execution
+from tool_runner import install_tool_runner
+
+
+# 进程池的子进程按模块名导入工具函数，因此工具定义在模块顶层
+@execution("inline")
+def where_inline() -> list[int]:
+    return [os.getpid(), threading.get_ident()]
+
+
+def where_thread() -> list[int]:
+    return [os.getpid(), threading.get_ident()]
+
+
+@execution("process")
+def where_process() -> list[int]:
+    return [os.getpid(), threading.get_ident()]
+
+
+@execution("process")
+def fail_process(value: int) -> int:
+    raise ValueError(f"bad value {value}")
+
+
+@execution("process")
+def slow_process(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@execution("thread", timeout=0.2)
+def slow(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def build_server(**options) -> tuple[FastMCP, object]:
+    mcp = FastMCP("execution-test")
+    for fn in (where_inline, where_thread, where_process, fail_process, slow_process, slow):
+        mcp.tool()(fn)
+    return mcp, install_tool_runner(mcp, **options)
+
+
+def request(name: str, arguments: dict) -> types.CallToolRequest:
+    return types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+
+
+async def call(runner, name: str, arguments: dict | None = None) -> types.CallToolResult:
+    return (await runner(request(name, arguments or {}))).root
+
+
+async def test_placement():
+    """inline在事件循环线程上执行，thread在工作线程上执行，process在子进程中执行"""
+    _, runner = build_server()
+    loop_thread = threading.get_ident()
+
+    result = await call(runner, "where_inline")
+    assert result.structuredContent["result"] == [os.getpid(), loop_thread]
+
+    result = await call(runner, "where_thread")
+    pid, thread = result.structuredContent["result"]
+    assert pid == os.getpid() and thread != loop_thread
+
+    try:
+        result = await call(runner, "where_process")
+        assert not result.isError, result
+        assert result.structuredContent["result"][0] != os.getpid()
+
+        # 子进程中的异常与线程中一样转换为错误结果
+        result = await call(runner, "fail_process", {"value": 7})
+        assert result.isError
+        assert result.content[0].text == "Error executing tool fail_process: bad value 7"
+
+        # 参数在服务器进程中校验
+        result = await call(runner, "fail_process", {"value": "x"})
+        assert result.isError and "Input validation error" in result.content[0].text
+    finally:
+        runner.processes.shutdown()
+    print("✓ inline/thread/process placement")
+
+
+async def test_timeout():
+    """超过timeout的调用返回错误，不影响之后的调用"""
+    _, runner = build_server()
+    start = time.perf_counter()
+    result = await call(runner, "slow", {"seconds": 1.0})
+    elapsed = time.perf_counter() - start
+    assert result.isError
+    assert result.content[0].text == "Error executing tool slow: timed out after 0.2s"
+    assert elapsed < 0.5, elapsed
+
+    result = await call(runner, "slow", {"seconds": 0.01})
+    assert result.structuredContent == {"result": 0.01}
+    print("✓ timeout")
+
+
+async def test_backpressure():
+    """并发上限1、队列上限1时，第三个同时到达的调用立即得到繁忙错误"""
+    _, runner = build_server(max_concurrency=1, max_queue=1)
+    results = [None] * 3
+
+    async def run(index: int):
+        results[index] = await call(runner, "slow", {"seconds": 0.1})
+
+    async with asyncio.TaskGroup() as tg:
+        for index in range(3):
+            tg.create_task(run(index))
+            await asyncio.sleep(0.01)
+
+    assert [result.isError for result in results] == [False, False, True], results
+    assert results[2].content[0].text.startswith("Server busy: 1 tool calls are queued")
+    print("✓ backpressure")
+
+
+async def test_inline_not_blocked():
+    """线程池中的慢调用不阻塞inline工具"""
+    _, runner = build_server()
+    slow_call = asyncio.create_task(call(runner, "slow", {"seconds": 0.15}))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await call(runner, "where_inline")
+    assert time.perf_counter() - start < 0.05
+    assert not (await slow_call).isError
+    print("✓ inline calls are not blocked by thread calls")
+
+
+async def test_broken_pool_recovers():
+    """进程池的子进程被杀死后，之后的调用使用新的进程池"""
+    _, runner = build_server(process_workers=1)
+    try:
+        result = await call(runner, "where_process")
+        assert not result.isError, result
+        pid = result.structuredContent["result"][0]
+        os.kill(pid, signal.SIGKILL)
+        await asyncio.sleep(0.5)
+
+        result = await call(runner, "where_process")
+        assert not result.isError, result
+        assert result.structuredContent["result"][0] != pid
+        pid = result.structuredContent["result"][0]
+
+        # 执行中子进程退出 (进程池只有一个子进程)：这次调用返回错误，下一次调用正常
+        task = asyncio.create_task(call(runner, "slow_process", {"seconds": 5}))
+        await asyncio.sleep(0.5)
+        os.kill(pid, signal.SIGKILL)
+        result = await task
+        assert result.isError, result
+        result = await call(runner, "where_process")
+        assert not result.isError, result
+    finally:
+        runner.processes.shutdown()
+    print("✓ process pool recreated after a child dies")
+
+
+def test_invalid_policy():
+    """异步工具不能在进程池中执行，安装时立即报错"""
+    mcp = FastMCP("invalid")
+
+    @mcp.tool()
+    @execution("process")
+    async def remote() -> int:
+        return 1
+
+    try:
+        install_tool_runner(mcp)
+    except ValueError as exc:
+        assert "cannot run in a process" in str(exc)
+    else:
+        raise AssertionError("expected ValueError")
+
+    for options in ({"mode": "gpu"}, {"mode": "inline", "timeout": 1}, {"timeout": 0}):
+        try:
+            execution(**options)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"expected ValueError for {options}")
+    print("✓ invalid policies rejected")
+
+
+async def main():
+    await test_placement()
+    await test_timeout()
+    await test_backpressure()
+    await test_inline_not_blocked()
+    await test_broken_pool_recovers()
+    test_invalid_policy()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
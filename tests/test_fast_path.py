@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+测试简单类型工具的快速路径：各种输入下的结果和错误信息与通用路径完全一致，不支持的签名在安装时报错
+"""
+
+import asyncio
+import math
+import sys
+from pathlib import Path
+from types import FunctionType
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import mcp.types as types
+from mcp.server.fastmcp import Context, FastMCP
+
+from fast_path import fast_path
+from tool_runner import install_tool_runner
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def scale(value: float, factor: float = 2.0) -> float:
+    return value * factor
+
+
+def greet(name: str, excited: bool = False) -> str:
+    return f"Hello, {name}{'!' if excited else '.'}"
+
+
+def is_even(value: int) -> bool:
+    return value % 2 == 0
+
+
+def wrong_type(kind: str) -> int:
+    """声明返回int，实际返回其他类型，用于检查结果的回退"""
+    return {"bool": True, "float": 1.5, "str": "1", "none": None}.get(kind, 1)
+
+
+def not_finite(kind: str) -> float:
+    return {"nan": math.nan, "inf": math.inf}.get(kind, 0.5)
+
+
+def fail(value: int) -> int:
+    raise ValueError(f"cannot handle {value}")
+
+
+async def add_async(a: int, b: int) -> int:
+    return a + b
+
+
+TOOLS = (add, scale, greet, is_even, wrong_type, not_finite, fail, add_async)
+
+CASES = [
+    ("add", {"a": 1, "b": 2}),
+    ("add", {"a": 2**70, "b": -1}),
+    ("add", {"a": 1}),
+    ("add", {}),
+    ("add", {"a": "1", "b": 2}),
+    ("add", {"a": 1.0, "b": 2}),
+    ("add", {"a": 1.5, "b": 2}),
+    ("add", {"a": True, "b": 2}),
+    ("add", {"a": None, "b": 2}),
+    ("add", {"a": 1, "b": 2, "extra": "ignored"}),
+    ("scale", {"value": 1.5}),
+    ("scale", {"value": 3, "factor": 4}),
+    ("scale", {"value": 2**60}),
+    ("scale", {"value": "2.5"}),
+    ("scale", {"value": False}),
+    ("greet", {"name": "Ada"}),
+    ("greet", {"name": "Ada", "excited": True}),
+    ("greet", {"name": "Ada", "excited": 1}),
+    ("greet", {"name": "Ada", "excited": "true"}),
+    ("greet", {"name": 42}),
+    ("greet", {"name": "汉字"}),
+    ("is_even", {"value": 4}),
+    ("is_even", {"value": 7}),
+    ("wrong_type", {"kind": "bool"}),
+    ("wrong_type", {"kind": "float"}),
+    ("wrong_type", {"kind": "str"}),
+    ("wrong_type", {"kind": "none"}),
+    ("wrong_type", {"kind": "int"}),
+    ("not_finite", {"kind": "nan"}),
+    ("not_finite", {"kind": "inf"}),
+    ("not_finite", {"kind": "half"}),
+    ("fail", {"value": 3}),
+    ("add_async", {"a": 20, "b": 22}),
+    ("add_async", {"a": "x", "b": 22}),
+]
+
+
+def copy_function(fn):
+    """复制函数对象，使标记只作用于其中一个服务器"""
+    clone = FunctionType(fn.__code__, fn.__globals__, fn.__name__, fn.__defaults__, fn.__closure__)
+    clone.__annotations__ = dict(fn.__annotations__)
+    return clone
+
+
+def build(fast: bool):
+    mcp = FastMCP("fast-path-test")
+    for fn in TOOLS:
+        fn = copy_function(fn)
+        mcp.add_tool(fast_path(fn) if fast else fn)
+    return install_tool_runner(mcp)
+
+
+async def call(runner, name: str, arguments: dict) -> dict:
+    request = types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+    return (await runner(request)).model_dump(by_alias=True, mode="json", exclude_none=True)
+
+
+async def test_parity():
+    """快速路径与通用路径对所有输入给出完全相同的响应"""
+    generic = build(fast=False)
+    fast = build(fast=True)
+
+    for name, arguments in CASES:
+        expected = await call(generic, name, arguments)
+        actual = await call(fast, name, arguments)
+        assert actual == expected, f"{name} {arguments}:\n{actual}\n!= {expected}"
+    assert len(fast._prepared) == len(TOOLS)
+    assert all(entry.fast is not None for entry in fast._prepared.values())
+    assert all(entry.fast is None for entry in generic._prepared.values())
+    print(f"✓ {len(CASES)} cases match the generic path")
+
+
+def test_unsupported_signatures():
+    """参数或返回值不是简单类型、或需要Context的工具不能使用快速路径"""
+
+    def with_list(values: list[int]) -> int:
+        return 0
+
+    def with_optional(value: int | None = None) -> int:
+        return 0
+
+    def returns_list(value: int) -> list[int]:
+        return [value]
+
+    def with_context(value: int, ctx: Context) -> int:
+        return value
+
+    for fn in (with_list, with_optional, returns_list, with_context):
+        mcp = FastMCP("unsupported")
+        mcp.add_tool(fast_path(fn))
+        try:
+            install_tool_runner(mcp)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{fn.__name__} should not be allowed on the fast path")
+    print("✓ unsupported signatures rejected")
+
+
+async def main():
+    await test_parity()
+    test_unsupported_signatures()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
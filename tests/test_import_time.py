@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+测试冷启动导入耗时
+
+用 python -X importtime 统计 import sum_int 的总耗时和本项目模块自身的耗时，
+并检查只在特定运行模式下才需要的模块不会在导入时加载。
+预算可通过环境变量 PYMCP_IMPORT_BUDGET_MS 调整 (较慢的机器上)。
+"""
+
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).parent.parent / "src" / "mcp_server"
+sys.path.insert(0, str(SERVER_DIR))
+
+from registry import SERVERS, scan
+
+# 总耗时主要来自MCP SDK自身的依赖 (httpx、pydantic、jsonschema、uvicorn等)
+TOTAL_BUDGET_MS = float(os.environ.get("PYMCP_IMPORT_BUDGET_MS", "1500"))
+# 本项目模块自身 (不含依赖) 的耗时
+OWN_BUDGET_MS = 50.0
+OWN_MODULES = {path.stem for path in SERVER_DIR.glob("*.py")}
+# 只在 --workers、--stateless 或命令行解析时才加载的模块
+LAZY_MODULES = ("workers", "compat", "cli")
+
+
+def import_times() -> tuple[float, float]:
+    """返回 (总累计耗时, 本项目模块自身耗时)，单位毫秒"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sum_int"],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    total = own = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if name == "sum_int":
+            total = int(cumulative_us) / 1000
+        if name in OWN_MODULES:
+            own += int(self_us) / 1000
+    return total, own
+
+
+def test_import_budget():
+    """import sum_int 的耗时在预算内 (取三次中的最好结果)"""
+    total, own = min(import_times() for _ in range(3))
+    print(f"import sum_int: {total:.1f}ms total, {own:.1f}ms in project modules")
+    assert total < TOTAL_BUDGET_MS, f"import took {total:.1f}ms, budget {TOTAL_BUDGET_MS:.0f}ms"
+    assert own < OWN_BUDGET_MS, f"project modules took {own:.1f}ms, budget {OWN_BUDGET_MS:.0f}ms"
+
+
+def test_lazy_modules():
+    """导入服务器模块时不加载可选运行模式的模块"""
+    code = f"import sys, sum_int; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "", f"eagerly imported: {result.stdout.strip()}"
+
+
+def test_registry():
+    """静态注册表与包内实际定义的服务器一致，导入包本身不加载服务器模块"""
+    assert scan() == set(SERVERS), f"registry {set(SERVERS)} != scanned {scan()}"
+    # run_server 把全部命令行选项交给服务器模块的run入口
+    for name in SERVERS:
+        tree = ast.parse((SERVER_DIR / f"{name}.py").read_text(encoding="utf-8"))
+        assert any(isinstance(node, ast.FunctionDef) and node.name == "run" for node in tree.body), name
+    code = "import sys, mcp_server; print('mcp_server.sum_int' in sys.modules, 'mcp' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=SERVER_DIR.parent, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.split() == ["False", "False"], result.stdout
+
+
+if __name__ == "__main__":
+    test_import_budget()
+    test_lazy_modules()
+    test_registry()
+    print("All tests passed!")
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+测试JSON-RPC批量请求：stdio、shm、Streamable HTTP (有状态/无状态) 和 SSE 传输上的批量数组，
+包括通知、无效元素、批量中的initialize、重复ID、空数组，以及超过并发窗口的大批量
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import anyio
+import mcp.types as types
+from mcp.shared.message import SessionMessage
+
+import sum_int
+from jsonrpc_batch import JSONRPCBatch, _SessionBatches, install_batching
+from shm_transport import run_shm, shm_client
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": "init", "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"}},
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+
+def call(request_id, a: int, b: int) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": "sum", "arguments": {"a": a, "b": b}}}
+
+
+def result(response: dict) -> int:
+    return response["result"]["structuredContent"]["result"]
+
+
+# 混合批量：两个调用、一个通知、一个无效元素、批量中的initialize、与第一个调用重复的ID
+MIXED = [
+    call(1, 1, 2),
+    {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": "unknown"}},
+    call("two", 20, 22),
+    42,
+    dict(INITIALIZE, id=3),
+    call(1, 5, 5),
+]
+
+
+def check_mixed(responses: list) -> None:
+    assert isinstance(responses, list) and len(responses) == 5, responses
+    assert responses[0]["id"] == 1 and result(responses[0]) == 3
+    assert responses[1]["id"] == "two" and result(responses[1]) == 42
+    assert responses[2]["error"]["code"] == types.INVALID_REQUEST
+    assert responses[3]["id"] == 3 and responses[3]["error"]["code"] == types.INVALID_REQUEST
+    assert responses[4]["id"] == 1 and "duplicate" in responses[4]["error"]["message"]
+
+
+def check_large(responses: list, count: int) -> None:
+    # 超过每个会话的并发窗口 (64)，元素等待空位后分派
+    assert [r["id"] for r in responses] == list(range(count))
+    assert [result(r) for r in responses] == [i + 1000 for i in range(count)]
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: int = 30) -> bool:
+    """等待服务器启动"""
+    start_time = time.time()
+    async with httpx.AsyncClient() as client:
+        while time.time() - start_time < timeout:
+            try:
+                await client.get(url, timeout=0.5)
+                return True
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    return False
+
+
+def stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def test_stdio():
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "src/mcp_server/sum_int.py",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    async def send(message) -> None:
+        process.stdin.write(json.dumps(message).encode() + b"\n")
+        await process.stdin.drain()
+
+    async def receive():
+        return json.loads(await asyncio.wait_for(process.stdout.readline(), 10))
+
+    try:
+        await send(INITIALIZE)
+        assert (await receive())["id"] == "init"
+        await send(INITIALIZED)
+
+        await send(MIXED)
+        check_mixed(await receive())
+
+        await send([])
+        response = await receive()
+        assert isinstance(response, dict) and response["error"]["code"] == types.INVALID_REQUEST, response
+
+        # 只有通知的批量没有响应，下一行是ping的响应
+        await send([INITIALIZED])
+        await send({"jsonrpc": "2.0", "id": "ping", "method": "ping"})
+        assert (await receive()) == {"jsonrpc": "2.0", "id": "ping", "result": {}}
+
+        await send([call(i, i, 1000) for i in range(300)])
+        check_large(await receive(), 300)
+
+        # 批量之外的单条消息照常处理
+        await send(call(7, 3, 4))
+        assert result(await receive()) == 7
+    finally:
+        process.stdin.close()
+        await process.wait()
+    print("✓ stdio batches")
+
+
+async def test_shm():
+    install_batching(sum_int.mcp)
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "shm.sock")
+        ready = anyio.Event()
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(lambda: run_shm(sum_int.mcp, socket_path, ready.set))
+            await ready.wait()
+            async with shm_client(socket_path) as (read, write):
+                async def exchange(message):
+                    await write.send(SessionMessage(
+                        JSONRPCBatch(message) if isinstance(message, list) else types.JSONRPCMessage.model_validate(message)
+                    ))
+                    received = await read.receive()
+                    return received.message.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+                assert (await exchange(INITIALIZE))["id"] == "init"
+                await write.send(SessionMessage(types.JSONRPCMessage.model_validate(INITIALIZED)))
+                check_mixed(await exchange(MIXED))
+                check_large(await exchange([call(i, i, 1000) for i in range(300)]), 300)
+            tg.cancel_scope.cancel()
+    print("✓ shm batches")
+
+
+async def test_streamable_http():
+    port = free_port()
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", "streamable-http"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        assert await wait_for_server(url), "MCP server failed to start within timeout"
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(url, json=INITIALIZE, headers=HEADERS)
+            assert response.status_code == 200, response.text
+            headers = dict(HEADERS, **{"mcp-session-id": response.headers["mcp-session-id"]})
+            response = await client.post(url, json=INITIALIZED, headers=headers)
+            assert response.status_code == 202, response.text
+
+            response = await client.post(url, json=MIXED, headers=headers)
+            assert response.status_code == 200, response.text
+            assert response.headers["content-type"].startswith("application/json")
+            check_mixed(response.json())
+
+            response = await client.post(url, json=[call(i, i, 1000) for i in range(300)], headers=headers)
+            check_large(response.json(), 300)
+
+            response = await client.post(url, json=[INITIALIZED], headers=headers)
+            assert response.status_code == 202, response.text
+
+            response = await client.post(url, json=[], headers=headers)
+            assert response.status_code == 400 and response.json()["error"]["code"] == types.INVALID_REQUEST
+
+            # 会话不存在时与单个请求得到相同的响应
+            bad = dict(HEADERS, **{"mcp-session-id": "unknown"})
+            single = await client.post(url, json=call(1, 1, 2), headers=bad)
+            response = await client.post(url, json=[call(1, 1, 2), call(2, 3, 4)], headers=bad)
+            assert single.status_code >= 400, single.text
+            assert (response.status_code, response.text) == (single.status_code, single.text), response.text
+    finally:
+        stop(process)
+    print("✓ streamable-http batches")
+
+
+async def test_stateless_http():
+    port = free_port()
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", "streamable-http", "--stateless"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        assert await wait_for_server(url), "MCP server failed to start within timeout"
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(url, json=[call(i, i, 1000) for i in range(100)], headers=HEADERS)
+            assert response.status_code == 200, response.text
+            check_large(response.json(), 100)
+    finally:
+        stop(process)
+    print("✓ stateless streamable-http batches")
+
+
+async def test_sse():
+    port = free_port()
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", "sse"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        assert await wait_for_server(f"{base}/healthz"), "MCP server failed to start within timeout"
+        async with httpx.AsyncClient(timeout=30) as client, client.stream("GET", f"{base}/sse") as stream:
+            lines = stream.aiter_lines()
+
+            async def next_event() -> tuple[str, str]:
+                event = data = ""
+                async for line in lines:
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data = line[5:].strip()
+                    elif not line and data:
+                        return event, data
+                raise AssertionError("SSE stream closed")
+
+            event, endpoint = await next_event()
+            assert event == "endpoint", event
+            messages_url = base + endpoint
+
+            async def post(message):
+                response = await client.post(messages_url, json=message)
+                assert response.status_code == 202, response.text
+
+            async def receive():
+                event, data = await asyncio.wait_for(next_event(), 10)
+                assert event == "message", event
+                return json.loads(data)
+
+            await post(INITIALIZE)
+            assert (await receive())["id"] == "init"
+            await post(INITIALIZED)
+
+            # 批量响应作为一条事件发出
+            await post(MIXED)
+            check_mixed(await receive())
+            await post([call(i, i, 1000) for i in range(300)])
+            check_large(await receive(), 300)
+
+            response = await client.post(f"{base}{endpoint.split('?')[0]}?session_id={'0' * 32}", json=[call(1, 1, 2)])
+            assert response.status_code == 404, response.text
+    finally:
+        stop(process)
+    print("✓ sse batches")
+
+
+async def test_colliding_ids():
+    """单个请求与进行中的批量元素使用相同的ID (或者反过来) 时直接得到错误，不会拿走对方的响应"""
+    to_client, from_server = anyio.create_memory_object_stream(16)
+    to_session, from_client = anyio.create_memory_object_stream(16)
+    forward, forwarded = anyio.create_memory_object_stream(16)
+    batches = _SessionBatches(to_client, 4)
+
+    def request(message) -> SessionMessage:
+        if isinstance(message, list):
+            return SessionMessage(JSONRPCBatch(message))
+        return SessionMessage(types.JSONRPCMessage.model_validate(message))
+
+    async def respond(request_id, value: int) -> None:
+        response = types.JSONRPCResponse(jsonrpc="2.0", id=request_id, result={"value": value})
+        await batches.writer.send(SessionMessage(types.JSONRPCMessage(response)))
+
+    def dump(message: SessionMessage):
+        return message.message.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(batches.pump, from_client, forward)
+        # 批量元素1进行中，单个请求1被拒绝
+        await to_session.send(request([call(1, 1, 1)]))
+        assert dump(await forwarded.receive())["id"] == 1
+        await to_session.send(request(call(1, 2, 2)))
+        error = dump(await from_server.receive())
+        assert error["id"] == 1 and "duplicate" in error["error"]["message"], error
+        await respond(1, 2)
+        assert dump(await from_server.receive()) == [{"jsonrpc": "2.0", "id": 1, "result": {"value": 2}}]
+
+        # 单个请求5进行中，批量中的5被拒绝，单个请求的响应照常发给它
+        await to_session.send(request(call(5, 1, 1)))
+        assert dump(await forwarded.receive())["id"] == 5
+        await to_session.send(request([call(5, 2, 2), call(6, 3, 3)]))
+        assert dump(await forwarded.receive())["id"] == 6
+        await respond(5, 2)
+        assert dump(await from_server.receive()) == {"jsonrpc": "2.0", "id": 5, "result": {"value": 2}}
+        await respond(6, 6)
+        responses = dump(await from_server.receive())
+        assert "duplicate" in responses[0]["error"]["message"] and responses[1]["result"] == {"value": 6}, responses
+
+        # 响应之后ID可以再次使用
+        await to_session.send(request(call(5, 1, 1)))
+        assert dump(await forwarded.receive())["id"] == 5
+        to_session.close()
+    print("✓ colliding request ids")
+
+
+async def main():
+    await test_colliding_ids()
+    await test_stdio()
+    await test_shm()
+    await test_streamable_http()
+    await test_stateless_http()
+    await test_sse()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试 /metrics 指标端点
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: int = 30) -> bool:
+    """等待服务器启动"""
+    start_time = time.time()
+    async with httpx.AsyncClient() as client:
+        while time.time() - start_time < timeout:
+            try:
+                await client.get(url, timeout=0.5)
+                return True
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    return False
+
+
+def sample(text: str, prefix: str) -> float:
+    """读取以prefix开头的指标样本值"""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"Metric {prefix} not found")
+
+
+async def test_metrics_endpoint():
+    """工具调用、tools/list、会话和缓存都会反映在指标中"""
+    port = free_port()
+    env = dict(os.environ, MCP_SERVER_PORT=str(port), PYMCP_METRICS_REQUEST_SIZES="1")
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", "sse"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        assert await wait_for_server(f"{base_url}/metrics"), "MCP server failed to start within timeout"
+
+        async with sse_client(f"{base_url}/sse") as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.list_tools()
+                for _ in range(3):
+                    result = await session.call_tool("sum", {"a": 15, "b": 25})
+                    assert result.structuredContent["result"] == 40
+                result = await session.call_tool("sum", {"a": "x", "b": 1})
+                assert result.isError
+
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(f"{base_url}/metrics")
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/plain")
+                text = response.text
+
+        labels = '{tool="sum",transport="sse"}'
+        assert sample(text, f"pymcp_tool_calls_total{labels}") == 4, text
+        assert sample(text, f"pymcp_tool_errors_total{labels}") == 1, text
+        assert sample(text, f"pymcp_tool_calls_in_flight{labels}") == 0, text
+        assert sample(text, f"pymcp_tool_call_duration_seconds_count{labels}") == 4, text
+        assert sample(text, f"pymcp_tool_request_bytes_count{labels}") == 4, text
+        assert sample(text, 'pymcp_request_duration_seconds_count{method="tools/list",transport="sse"}') == 1, text
+        assert sample(text, 'pymcp_sessions_active{transport="sse"}') == 1, text
+        assert sample(text, 'pymcp_session_init_duration_seconds_count{transport="sse"}') == 1, text
+        # 四次调用中：首次未命中，随后两次命中，错误参数未命中
+        assert sample(text, 'pymcp_cache_hits_total{tool="sum"}') == 2, text
+        assert sample(text, 'pymcp_cache_misses_total{tool="sum"}') == 2, text
+        # 未命中的两次调用依次执行，没有可合并的调用
+        assert sample(text, 'pymcp_coalescing_executions_total{tool="sum"}') == 2, text
+        assert sample(text, 'pymcp_coalescing_coalesced_total{tool="sum"}') == 0, text
+
+        print("All tests passed!")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def test_request_sizes_opt_in():
+    """请求参数大小默认不统计，避免在调用路径上重新编码参数"""
+    from metrics import Metrics
+
+    metrics = Metrics()
+    assert "pymcp_tool_request_bytes" not in metrics.render()
+    assert "pymcp_tool_request_bytes" in Metrics(request_sizes=True).render()
+
+
+if __name__ == "__main__":
+    test_request_sizes_opt_in()
+    asyncio.run(test_metrics_endpoint())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试本地模拟LLM：OpenAI兼容的工具调用流程、流式响应、确定性输出，以及离线的agent端到端基准
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+# benchmarks/common.py 提供启动和等待服务的工具函数
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from common import free_port, stop_server, wait_for_server
+
+TOOLS = [{"type": "function", "function": {"name": "sum", "parameters": {"type": "object"}}}]
+
+
+async def start_mock(*args: str) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen([sys.executable, str(ROOT / "benchmarks" / "mock_llm.py"), "--port", str(port), *args])
+    base_url = f"http://127.0.0.1:{port}/v1"
+    await wait_for_server(f"{base_url}/models")
+    return process, base_url
+
+
+async def complete(client: httpx.AsyncClient, messages: list, **extra) -> dict:
+    response = await client.post("/chat/completions", json={"model": "mock", "messages": messages, **extra})
+    response.raise_for_status()
+    return response.json()["choices"][0]
+
+
+async def test_tool_call_flow():
+    """第一次返回sum调用，收到工具结果后给出包含结果的回答，同样的输入得到同样的输出"""
+    process, base_url = await start_mock("--calls-per-turn", "2")
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            messages = [{"role": "user", "content": "What is 15 plus 25?"}]
+            choice = await complete(client, messages, tools=TOOLS)
+            assert choice["finish_reason"] == "tool_calls"
+            calls = choice["message"]["tool_calls"]
+            assert [json.loads(call["function"]["arguments"]) for call in calls] == [{"a": 15, "b": 25}, {"a": 15, "b": 26}]
+            assert (await complete(client, messages, tools=TOOLS)) == choice
+
+            messages.append(choice["message"])
+            messages.extend({"role": "tool", "tool_call_id": call["id"], "content": str(40 + i)}
+                            for i, call in enumerate(calls))
+            final = await complete(client, messages, tools=TOOLS)
+            assert final["finish_reason"] == "stop"
+            assert final["message"]["content"] == "The sum of 15 and 25 is 40."
+
+            # 没有工具时直接回答
+            direct = await complete(client, [{"role": "user", "content": "Calculate the sum of 123 and 456"}])
+            assert direct["message"]["content"] == "The sum of 123 and 456 is 579."
+
+            stats = (await client.get(str(httpx.URL(base_url).join("/stats")))).json()
+            assert stats == {"requests": 4, "tool_calls": 4}, stats
+        print("✓ tool call flow")
+    finally:
+        stop_server(process)
+
+
+async def test_streaming_and_tool_rate():
+    """stream=true 返回SSE块；tool-rate为0时从不调用工具"""
+    process, base_url = await start_mock("--tool-rate", "0")
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            messages = [{"role": "user", "content": "What is 1 plus 2?"}]
+            assert "tool_calls" not in (await complete(client, messages, tools=TOOLS))["message"]
+
+            async with client.stream("POST", "/chat/completions",
+                                     json={"model": "mock", "messages": messages, "stream": True}) as response:
+                lines = [line async for line in response.aiter_lines() if line.startswith("data: ")]
+            assert lines[-1] == "data: [DONE]"
+            chunks = [json.loads(line[len("data: "):]) for line in lines[:-1]]
+            assert chunks[0]["choices"][0]["delta"]["content"] == "The sum of 1 and 2 is 3."
+            assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+        print("✓ streaming and tool rate")
+    finally:
+        stop_server(process)
+
+
+def test_bench_agent():
+    """离线运行agent端到端基准，所有回答正确"""
+    result = subprocess.run(
+        [sys.executable, str(ROOT / "benchmarks" / "bench_agent.py"), "--agent", "minimal", "--questions", "10",
+         "--turns", "2"],
+        capture_output=True, text=True, timeout=120, check=True,
+    )
+    report = json.loads(result.stdout)
+    for backend in ("mcp", "local"):
+        assert report["backends"][backend]["correct"] == 10, report["backends"][backend]
+        assert report["backends"][backend]["tool_calls"] == 20
+    assert report["mcp_overhead"]["per_tool_call_ms"] > 0
+    print(f"✓ bench_agent: MCP adds {report['mcp_overhead']['per_tool_call_ms']}ms per tool call")
+
+
+async def main():
+    await test_tool_call_flow()
+    await test_streaming_and_tool_rate()
+    test_bench_agent()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试stdio传输的请求流水线和并发执行
+
+在sum_int服务器上额外注册一个耗时的同步工具，通过原始JSON-RPC一次性写入多个请求：
+- 耗时工具在线程池中执行，不阻塞后面的 sum 请求，响应按完成顺序写出
+- 同时执行的调用数受 --max-concurrency 限制
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src" / "mcp_server"
+
+SERVER_SCRIPT = f"""
+import sys
+import time
+sys.path.insert(0, {str(SRC_DIR)!r})
+import sum_int
+
+@sum_int.mcp.tool()
+def slow(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+sum_int.run("stdio", max_concurrency=int(sys.argv[1]))
+"""
+
+
+class RawClient:
+    """直接读写JSON-RPC行的stdio客户端"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    async def send(self, *messages: dict) -> None:
+        data = b"".join(json.dumps(message).encode() + b"\n" for message in messages)
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+
+    async def receive(self) -> dict:
+        line = await asyncio.wait_for(self.process.stdout.readline(), 30)
+        assert line, "server closed stdout"
+        return json.loads(line)
+
+    async def initialize(self) -> None:
+        await self.send({
+            "jsonrpc": "2.0", "id": 0, "method": "initialize",
+            "params": {"protocolVersion": "2025-06-18", "capabilities": {},
+                       "clientInfo": {"name": "test", "version": "0"}},
+        })
+        assert (await self.receive())["id"] == 0
+        await self.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+
+def call(request_id: int, name: str, arguments: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}}
+
+
+async def start(script: str, max_concurrency: int) -> RawClient:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, script, str(max_concurrency),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+    client = RawClient(process)
+    await client.initialize()
+    return client
+
+
+async def stop(client: RawClient) -> None:
+    client.process.stdin.close()
+    try:
+        await asyncio.wait_for(client.process.wait(), 10)
+    except asyncio.TimeoutError:
+        client.process.kill()
+
+
+async def timed_wave(client: RawClient, count: int, seconds: float) -> float:
+    """同时发出count个耗时调用，返回全部完成的时间"""
+    start_time = time.perf_counter()
+    await client.send(*(call(100 + i, "slow", {"seconds": seconds}) for i in range(count)))
+    ids = {(await client.receive())["id"] for _ in range(count)}
+    assert ids == set(range(100, 100 + count)), ids
+    return time.perf_counter() - start_time
+
+
+async def test_pipelining():
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(SERVER_SCRIPT)
+        script = f.name
+
+    client = await start(script, max_concurrency=8)
+    try:
+        # 耗时调用先发出，sum 的响应先返回
+        await client.send(call(1, "slow", {"seconds": 1.0}), call(2, "sum", {"a": 2, "b": 3}))
+        first, second = await client.receive(), await client.receive()
+        assert [first["id"], second["id"]] == [2, 1], (first, second)
+        assert first["result"]["structuredContent"] == {"result": 5}
+        assert second["result"]["structuredContent"] == {"result": 1.0}
+
+        # 一次写入的大量请求全部得到响应
+        await client.send(*(call(1000 + i, "sum", {"a": i, "b": 1}) for i in range(200)))
+        results = {}
+        for _ in range(200):
+            response = await client.receive()
+            results[response["id"]] = response["result"]["structuredContent"]["result"]
+        assert results == {1000 + i: i + 1 for i in range(200)}
+
+        # 8个0.5秒的调用在并发上限8下并行完成
+        elapsed = await timed_wave(client, 8, 0.5)
+        print(f"8 calls, max concurrency 8: {elapsed:.2f}s")
+        assert elapsed < 1.5, elapsed
+    finally:
+        await stop(client)
+
+    client = await start(script, max_concurrency=2)
+    try:
+        # 并发上限2时需要分4批执行
+        elapsed = await timed_wave(client, 8, 0.5)
+        print(f"8 calls, max concurrency 2: {elapsed:.2f}s")
+        assert elapsed >= 1.9, elapsed
+    finally:
+        await stop(client)
+        Path(script).unlink()
+
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_pipelining())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+测试预热的stdio服务器进程池
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from pool import pool_client
+
+
+def child_pids(pid: int) -> set[int]:
+    """读取进程的直接子进程 (Linux)"""
+    children = set()
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        children.update(int(child) for child in (task / "children").read_text().split())
+    return children
+
+
+async def wait_until(predicate, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+
+async def call_sums(session: ClientSession, count: int) -> None:
+    for i in range(count):
+        result = await session.call_tool("sum", {"a": i, "b": 100})
+        assert not result.isError, result
+        assert result.structuredContent["result"] == i + 100
+
+
+async def test_pool():
+    """进程在连接之间复用，达到调用次数上限或调用过非只读工具后被回收替换"""
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="pymcp-pool-test-"), "pool.sock")
+    supervisor = subprocess.Popen(
+        [sys.executable, "src/mcp_server/pool.py", "--socket", socket_path, "serve", "--size", "1", "--max-calls", "3"],
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        # socket在池预热完成后才创建
+        assert await wait_until(lambda: os.path.exists(socket_path)), "Server pool failed to start within timeout"
+        warm = child_pids(supervisor.pid)
+        assert len(warm) == 1, warm
+
+        start = time.perf_counter()
+        async with pool_client(socket_path) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                print(f"initialize via pool: {(time.perf_counter() - start) * 1000:.1f}ms")
+                tools = await session.list_tools()
+                assert "sum" in {tool.name for tool in tools.tools}
+                await call_sums(session, 2)
+
+        # 未达到上限，进程归还到池中
+        assert await wait_until(lambda: child_pids(supervisor.pid) == warm), child_pids(supervisor.pid)
+
+        # stdio桥接方式，可直接用作MCP客户端的服务器命令
+        server_params = StdioServerParameters(
+            command=sys.executable, args=["src/mcp_server/pool.py", "--socket", socket_path, "connect"],
+        )
+        async with stdio_client(server_params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                assert child_pids(supervisor.pid) == warm, "the warm server should be reused"
+                await call_sums(session, 1)
+
+        # 第3次调用达到上限，进程被回收并补充新进程
+        assert await wait_until(
+            lambda: len(pids := child_pids(supervisor.pid)) == 1 and not pids & warm
+        ), child_pids(supervisor.pid)
+
+        # 并发连接超过池大小时额外启动进程，归还后只保留池大小的进程
+        async def client_session():
+            async with pool_client(socket_path) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    await call_sums(session, 1)
+
+        await asyncio.gather(client_session(), client_session())
+        assert await wait_until(lambda: len(child_pids(supervisor.pid)) == 1), child_pids(supervisor.pid)
+
+        # 打开过流式求和的进程带有上一个客户端的状态，不再复用
+        warm = child_pids(supervisor.pid)
+        async with pool_client(socket_path) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool("sum_stream_open", {})
+                assert not result.isError, result
+        assert await wait_until(
+            lambda: len(pids := child_pids(supervisor.pid)) == 1 and not pids & warm
+        ), child_pids(supervisor.pid)
+
+        print("All tests passed!")
+    finally:
+        supervisor.terminate()
+        try:
+            supervisor.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            supervisor.kill()
+    assert not os.path.exists(socket_path), "socket should be removed on shutdown"
+
+
+if __name__ == "__main__":
+    asyncio.run(test_pool())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+测试工具调用剖析：阶段耗时、抽样比例、调用栈采样，以及stdio服务器 --profile 输出的文件
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import mcp.types as types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.server.fastmcp import FastMCP
+
+from execution import execution
+from profiling import Profiler, install_profiler
+from tool_runner import install_tool_runner
+
+
+def busy_wait(seconds: float) -> None:
+    """占用CPU一段时间，使采样线程能够采到工具函数的调用栈"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build(rate: float, output: str) -> tuple[FastMCP, Profiler]:
+    mcp = FastMCP("profiling-test")
+
+    @mcp.tool()
+    @execution("inline")
+    def spin(ms: int) -> int:
+        busy_wait(ms / 1000)
+        return ms
+
+    install_tool_runner(mcp)
+    return mcp, install_profiler(mcp, rate, output, interval=0.0005)
+
+
+async def call(mcp: FastMCP, name: str, arguments: dict) -> types.CallToolResult:
+    handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
+    request = types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+    return (await handler(request)).root
+
+
+async def test_phases_and_stacks():
+    """每次调用记录四个阶段，阶段之和等于总耗时，调用栈中出现工具函数"""
+    with tempfile.TemporaryDirectory() as output:
+        mcp, profiler = build(1.0, output)
+        for _ in range(5):
+            result = await call(mcp, "spin", {"ms": 20})
+            assert result.structuredContent == {"result": 20}
+        result = await call(mcp, "spin", {"ms": "x"})
+        assert result.isError
+
+        report = profiler.report()
+        assert report["sampled_calls"] == 6
+        phases = report["tools"]["spin"]
+        assert set(phases) == {"dispatch", "validate", "execute", "encode", "total"}, phases
+        assert phases["total"]["count"] == 6
+        parts = sum(phases[phase]["total_ms"] for phase in ("dispatch", "validate", "execute", "encode"))
+        assert abs(parts - phases["total"]["total_ms"]) < 0.01, (parts, phases["total"])
+        # 工具执行占了绝大部分时间
+        assert phases["execute"]["total_ms"] > 0.9 * 100, phases["execute"]
+        means = ", ".join(f"{phase}={summary['mean_us']}us" for phase, summary in phases.items())
+        print(f"✓ phases: {means}")
+
+        assert report["stack_samples"] > 0
+        stacks_path, phases_path = profiler.dump()
+        collapsed = stacks_path.read_text().splitlines()
+        spinning = [line for line in collapsed if "busy_wait (tests/test_profiling.py)" in line]
+        assert spinning, collapsed[:5]
+        stack, count = spinning[0].rsplit(" ", 1)
+        assert stack.startswith("MainThread;") and int(count) > 0
+        assert json.loads(phases_path.read_text())["tools"]["spin"]["total"]["count"] == 6
+        print(f"✓ {len(collapsed)} collapsed stacks written to {stacks_path.name}")
+
+
+async def test_sampling_rate():
+    """按比例抽取调用，未抽中的调用不记录"""
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as output:
+        mcp, profiler = build(0.25, output)
+        for _ in range(400):
+            await call(mcp, "spin", {"ms": 0})
+        assert 60 <= profiler.sampled_calls <= 140, profiler.sampled_calls
+    print(f"✓ sampled {profiler.sampled_calls} of 400 calls at rate 0.25")
+
+
+def test_disabled():
+    """rate为0时不安装，超出范围的rate报错"""
+    mcp = FastMCP("profiling-disabled")
+    assert install_profiler(mcp, 0) is None
+    try:
+        Profiler(1.5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for rate 1.5")
+    print("✓ disabled and invalid rates")
+
+
+async def test_stdio_server():
+    """--profile 启动的stdio服务器退出时写入阶段耗时和传输耗时"""
+    with tempfile.TemporaryDirectory() as output:
+        server_params = StdioServerParameters(
+            command=sys.executable,
+            args=["src/mcp_server/sum_int.py", "--profile", "1", "--profile-dir", output],
+        )
+        async with stdio_client(server_params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                for i in range(20):
+                    result = await session.call_tool("sum", {"a": i, "b": 1})
+                    assert result.structuredContent == {"result": i + 1}
+
+        reports = list(Path(output).glob("pymcp-*.phases.json"))
+        assert len(reports) == 1, list(Path(output).iterdir())
+        report = json.loads(reports[0].read_text())
+        assert report["tools"]["sum"]["total"]["count"] == 20
+        assert report["transport"]["transport_decode"]["count"] >= 21
+        assert report["transport"]["transport_encode"]["count"] >= 21
+        assert reports[0].with_name(reports[0].name.replace(".phases.json", ".collapsed")).exists()
+    print("✓ stdio server writes profiles on exit")
+
+
+async def test_worker_processes():
+    """多进程worker退出时各自写入剖析结果，不依赖atexit"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with tempfile.TemporaryDirectory() as output:
+        process = subprocess.Popen(
+            [sys.executable, "src/mcp_server/sum_int.py", "streamable-http", "--workers", "2",
+             "--profile", "1", "--profile-dir", output],
+            env=dict(os.environ, MCP_SERVER_PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}/mcp"
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    async with streamablehttp_client(url) as (read, write, _):
+                        async with ClientSession(read, write) as session:
+                            await session.initialize()
+                            for i in range(10):
+                                result = await session.call_tool("sum", {"a": i, "b": 1})
+                                assert result.structuredContent == {"result": i + 1}
+                    break
+                except Exception:
+                    if time.monotonic() > deadline:
+                        raise
+                    await asyncio.sleep(0.2)
+        finally:
+            process.terminate()
+            process.wait(timeout=15)
+
+        # 周期写入的间隔是10秒，这里的结果来自worker退出时的写入 (父进程也会写入一份空的结果)
+        reports = [json.loads(path.read_text()) for path in Path(output).glob("pymcp-*.phases.json")]
+        assert len(reports) == 3, list(Path(output).iterdir())
+        assert sum(report["tools"].get("sum", {}).get("total", {}).get("count", 0) for report in reports) == 10
+    print("✓ worker processes write profiles on exit")
+
+
+async def main():
+    await test_phases_and_stacks()
+    await test_sampling_rate()
+    test_disabled()
+    await test_stdio_server()
+    await test_worker_processes()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+测试 /healthz 健康检查和就绪通知 (--ready-fd、NOTIFY_SOCKET)
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_ready(ready_fd: int, timeout: float = 30) -> bool:
+    """等待服务器向就绪管道写入 READY=1，服务器退出时管道关闭并立即返回False"""
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(ready_fd, readable.set)
+    try:
+        await asyncio.wait_for(readable.wait(), timeout)
+        return os.read(ready_fd, 64).startswith(b"READY=1")
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(ready_fd)
+
+
+def start_server(*args: str, port: int, env: dict | None = None) -> tuple[subprocess.Popen, int]:
+    """启动服务器并传入就绪管道的写端，返回 (进程, 管道读端)"""
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", *args, "--ready-fd", str(write_fd)],
+        env=dict(env or os.environ, MCP_SERVER_PORT=str(port)),
+        pass_fds=(write_fd,), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    return process, read_fd
+
+
+def stop_server(process: subprocess.Popen, read_fd: int) -> None:
+    os.close(read_fd)
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def test_ready_fd():
+    """就绪通知到达后无需重试即可访问 /healthz 并调用工具"""
+    port = free_port()
+    start = time.perf_counter()
+    process, read_fd = start_server("streamable-http", port=port)
+    try:
+        assert await wait_for_ready(read_fd), "MCP server did not signal readiness"
+        print(f"streamable-http ready after {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{port}/healthz")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+        async with streamablehttp_client(f"http://127.0.0.1:{port}/mcp") as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool("sum", {"a": 2, "b": 3})
+                assert result.structuredContent["result"] == 5
+    finally:
+        stop_server(process, read_fd)
+
+
+async def test_notify_socket():
+    """设置 NOTIFY_SOCKET 时按systemd协议发送 READY=1"""
+    port = free_port()
+    notify_path = os.path.join(tempfile.mkdtemp(prefix="pymcp-notify-"), "notify.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as notify:
+        notify.bind(notify_path)
+        notify.settimeout(30)
+        process, read_fd = start_server("sse", port=port, env=dict(os.environ, NOTIFY_SOCKET=notify_path))
+        try:
+            assert notify.recv(64) == b"READY=1"
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"http://127.0.0.1:{port}/healthz")
+            assert response.status_code == 200
+        finally:
+            stop_server(process, read_fd)
+    os.unlink(notify_path)
+
+
+async def test_workers_ready():
+    """多进程模式下所有worker启动完成后才发出就绪通知"""
+    port = free_port()
+    process, read_fd = start_server("streamable-http", "--workers", "2", port=port)
+    try:
+        assert await wait_for_ready(read_fd), "MCP server did not signal readiness"
+        async with httpx.AsyncClient() as client:
+            for _ in range(4):
+                response = await client.get(f"http://127.0.0.1:{port}/healthz")
+                assert response.status_code == 200
+    finally:
+        stop_server(process, read_fd)
+
+
+async def test_stdio_ready():
+    """stdio方式进入消息循环前发出就绪通知"""
+    process, read_fd = start_server("stdio", port=free_port())
+    try:
+        assert await wait_for_ready(read_fd), "MCP server did not signal readiness"
+    finally:
+        stop_server(process, read_fd)
+
+
+async def main():
+    await test_ready_fd()
+    await test_notify_socket()
+    await test_workers_ready()
+    await test_stdio_ready()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+测试共享内存传输：环形缓冲区的回绕与空间回收、大消息回退到socket、并发调用、共享内存清理，
+以及通过命令行以 shm 方式启动的服务器
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import anyio
+from mcp import ClientSession
+
+import sum_int
+from shm_transport import _HEADER, _Ring, run_shm, shm_client
+
+SHM_DIR = Path("/dev/shm")
+
+
+def shm_entries() -> set[str]:
+    return set(os.listdir(SHM_DIR)) if SHM_DIR.exists() else set()
+
+
+def test_ring():
+    """消息连续存放，环尾放不下时从头开始，读方释放后空间可以复用"""
+    shm = SharedMemory(create=True, size=_HEADER + 100)
+    try:
+        ring = _Ring(shm, 100)
+        first = ring.write(b"a" * 40)
+        second = ring.write(b"b" * 40)
+        assert (first, second) == (0, 40)
+        # 剩余20字节放不下，且读方尚未释放任何空间
+        assert ring.write(b"c" * 30) is None
+        ring.release(first, 40)
+        # 环尾只剩20字节，跳到下一圈的开头
+        third = ring.write(b"c" * 30)
+        assert third == 100, third
+        assert bytes(ring.read(third, 30)) == b"c" * 30
+        assert bytes(ring.read(second, 40)) == b"b" * 40
+        assert ring.write(b"d" * 101) is None
+        ring.close()
+    finally:
+        shm.close()
+        shm.unlink()
+    print("✓ ring buffer wraps and reuses released space")
+
+
+async def test_in_process():
+    before = shm_entries()
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "shm.sock")
+        ready = anyio.Event()
+        async with anyio.create_task_group() as tg:
+            # 很小的缓冲区，使消息频繁回绕并触发回退
+            tg.start_soon(lambda: run_shm(sum_int.mcp, socket_path, ready.set, ring_size=4096))
+            await ready.wait()
+
+            async with shm_client(socket_path) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    tools = await session.list_tools()
+                    assert {tool.name for tool in tools.tools} >= {"sum", "sum_batch"}
+
+                    result = await session.call_tool("sum", {"a": 20, "b": 22})
+                    assert result.structuredContent == {"result": 42}
+
+                    results = await asyncio.gather(*(session.call_tool("sum", {"a": i, "b": 1000}) for i in range(300)))
+                    assert [r.structuredContent["result"] for r in results] == [i + 1000 for i in range(300)]
+                    print("✓ 300 concurrent calls")
+
+                    # 超过缓冲区容量的消息通过socket直接发送
+                    a = list(range(2000))
+                    result = await session.call_tool("sum_batch", {"a": a, "b": a})
+                    assert result.structuredContent["sums"] == [2 * x for x in a]
+                    print("✓ messages larger than the ring fall back to the socket")
+
+                    # 握手完成后共享内存的名称已经被删除
+                    assert shm_entries() <= before, shm_entries() - before
+            tg.cancel_scope.cancel()
+    assert shm_entries() <= before
+    print("✓ shared memory is unlinked")
+
+
+async def test_cli():
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "shm.sock")
+        ready_read, ready_write = os.pipe()
+        process = subprocess.Popen(
+            [sys.executable, "src/mcp_server/sum_int.py", "shm", "--socket", socket_path, "--ready-fd", str(ready_write)],
+            pass_fds=(ready_write,), stderr=subprocess.DEVNULL,
+        )
+        os.close(ready_write)
+        try:
+            with os.fdopen(ready_read, "rb") as ready:
+                assert (await asyncio.to_thread(ready.read)).startswith(b"READY=1")
+            for _ in range(2):
+                # 每个连接是独立的会话
+                async with shm_client(socket_path) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        result = await session.call_tool("sum", {"a": 1, "b": 2})
+                        assert result.structuredContent == {"result": 3}
+        finally:
+            process.terminate()
+            process.wait(timeout=5)
+    print("✓ sum_int.py shm")
+
+
+async def main():
+    test_ring()
+    await test_in_process()
+    await test_cli()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+测试SSE会话管理：心跳、空闲会话回收、出站消息上限、/sessions 报告，
+以及会话结束后SDK中会话映射的清理
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": "init", "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"}},
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: int = 30) -> bool:
+    """等待服务器启动"""
+    start_time = time.time()
+    async with httpx.AsyncClient() as client:
+        while time.time() - start_time < timeout:
+            try:
+                await client.get(url, timeout=0.5)
+                return True
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    return False
+
+
+class SseClient:
+    """读取一个SSE事件流，记录收到的心跳"""
+
+    def __init__(self, client: httpx.AsyncClient, base: str, stream: httpx.Response):
+        self.client = client
+        self.base = base
+        self.lines = stream.aiter_lines()
+        self.heartbeats = 0
+        self.endpoint = ""
+
+    async def next_event(self) -> tuple[str, str] | None:
+        """返回下一个事件，事件流结束时返回None"""
+        event = data = ""
+        async for line in self.lines:
+            if line.startswith(": ping"):
+                self.heartbeats += 1
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = line[5:].strip()
+            elif not line and data:
+                return event, data
+        return None
+
+    async def connect(self) -> None:
+        event, self.endpoint = await self.next_event()
+        assert event == "endpoint", event
+        await self.post(INITIALIZE)
+        event, data = await asyncio.wait_for(self.next_event(), 10)
+        assert json.loads(data)["id"] == "init"
+        await self.post(INITIALIZED)
+
+    async def post(self, message) -> httpx.Response:
+        return await self.client.post(self.base + self.endpoint, json=message)
+
+    @property
+    def session_id(self) -> str:
+        return self.endpoint.split("session_id=")[1]
+
+
+async def sessions_report(client: httpx.AsyncClient, base: str) -> dict:
+    response = await client.get(f"{base}/sessions")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_sse_sessions():
+    port = free_port()
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", "sse",
+         "--sse-idle-timeout", "1.5", "--sse-heartbeat", "0.2", "--sse-max-queued", "4"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        assert await wait_for_server(f"{base}/healthz"), "MCP server failed to start within timeout"
+        async with httpx.AsyncClient(timeout=30) as client:
+            # 心跳和报告
+            async with client.stream("GET", f"{base}/sse") as stream:
+                sse = SseClient(client, base, stream)
+                await sse.connect()
+                response = await sse.post({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                           "params": {"name": "sum", "arguments": {"a": 1, "b": 2}}})
+                assert response.status_code == 202, response.text
+                event, data = await asyncio.wait_for(sse.next_event(), 10)
+                assert json.loads(data)["result"]["structuredContent"]["result"] == 3
+
+                report = await sessions_report(client, base)
+                assert report["count"] == 1 and report["limits"]["max_queued"] == 4, report
+                session = report["sessions"][0]
+                assert session["session"] == sse.session_id[:8], session
+                assert sse.session_id not in json.dumps(report), report
+                assert session["inflight"] == 0 and session["queued"] == 0, session
+                assert session["sent_messages"] >= 3 and session["sent_bytes"] > 0, session
+
+                # 只有心跳、没有消息：心跳不算活动，会话在空闲超时后被断开
+                started = time.monotonic()
+                assert await asyncio.wait_for(sse.next_event(), 10) is None
+                assert time.monotonic() - started >= 1, "session evicted before idle timeout"
+                assert sse.heartbeats >= 3, sse.heartbeats
+            print("✓ heartbeats and idle eviction")
+
+            # 被断开的会话不再接受消息，客户端据此重新连接
+            response = await sse.post(INITIALIZED)
+            assert response.status_code == 404, response.text
+            report = await sessions_report(client, base)
+            assert report["count"] == 0 and report["evicted"]["idle"] == 1, report
+
+            # 客户端主动断开后，SDK中的会话映射同样被清理
+            async with client.stream("GET", f"{base}/sse") as stream:
+                closed = SseClient(client, base, stream)
+                await closed.connect()
+            await asyncio.sleep(0.2)
+            response = await closed.post(INITIALIZED)
+            assert response.status_code == 404, response.text
+            print("✓ session mapping removed when the stream ends")
+
+            # 客户端不再读取事件流：响应在发送上排队，超过上限后会话被断开
+            async with client.stream("GET", f"{base}/sse") as stream:
+                stalled = SseClient(client, base, stream)
+                await stalled.connect()
+                values = list(range(20000))
+                for request_id in range(40):
+                    response = await stalled.post({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                                                   "params": {"name": "sum_batch", "arguments": {"a": values, "b": values}}})
+                    if response.status_code == 404:
+                        break
+                    assert response.status_code == 202, response.text
+                    await asyncio.sleep(0.02)
+                for _ in range(100):
+                    report = await sessions_report(client, base)
+                    if report["evicted"]["queue"]:
+                        break
+                    await asyncio.sleep(0.05)
+                assert report["evicted"]["queue"] == 1, report
+            print("✓ outbound queue limit")
+
+            response = await client.get(f"{base}/metrics")
+            assert 'pymcp_sse_evicted_total{reason="idle",transport="sse"} 1' in response.text, response.text
+            assert 'pymcp_sse_evicted_total{reason="queue",transport="sse"} 1' in response.text, response.text
+            assert 'pymcp_sse_sessions{transport="sse"} 0' in response.text, response.text
+            print("✓ metrics")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def main():
+    await test_sse_sessions()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
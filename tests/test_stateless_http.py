@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试Streamable HTTP无状态模式
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: int = 30) -> bool:
+    """等待服务器启动"""
+    start_time = time.time()
+    async with httpx.AsyncClient() as client:
+        while time.time() - start_time < timeout:
+            try:
+                await client.get(url, timeout=0.5)
+                return True
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    return False
+
+
+async def test_stateless_http():
+    """无状态模式下无需会话即可调用工具，结果以JSON返回"""
+    port = free_port()
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", "streamable-http", "--stateless"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        assert await wait_for_server(url), "MCP server failed to start within timeout"
+
+        # 不经过initialize直接调用，模拟负载均衡把请求分到一个新实例上
+        async with httpx.AsyncClient() as client:
+            request = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                       "params": {"name": "sum", "arguments": {"a": 15, "b": 25}}}
+            response = await client.post(url, json=request, headers=HEADERS)
+            assert response.status_code == 200, response.text
+            assert response.headers["content-type"].startswith("application/json"), response.headers
+            assert "mcp-session-id" not in response.headers, "Stateless mode should not issue sessions"
+            assert response.json()["result"]["structuredContent"]["result"] == 40, response.text
+
+        # 标准客户端照常可用
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool("sum", {"a": 123, "b": 456})
+                assert result.structuredContent["result"] == 579, result
+
+        print("All tests passed!")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_stateless_http())
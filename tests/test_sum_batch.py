@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+测试批量加法工具 sum_batch 和 sum_many
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+
+async def test_batch_tools():
+    """测试sum_batch和sum_many工具函数"""
+    server_params = StdioServerParameters(
+        command=sys.executable,
+        args=["src/mcp_server/sum_int.py"]
+    )
+
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            tools = await session.list_tools()
+            names = {tool.name for tool in tools.tools}
+            assert {"sum", "sum_batch", "sum_many"} <= names, f"Missing batch tools in {names}"
+
+            # 多组相加，结果按输入顺序返回
+            result = await session.call_tool("sum_batch", {"a": [1, -2, 0, 15], "b": [2, 7, 0, 25]})
+            assert not result.isError, f"Result should not be an error: {result}"
+            assert result.structuredContent == {"sums": [3, 5, 0, 40], "count": 4}, result.structuredContent
+            # 列式结果只占一个文本块，而不是每个元素一个
+            assert len(result.content) == 1, f"Expected a single content block, got {len(result.content)}"
+
+            # 超出64位的整数按任意精度计算
+            big = 2**63 - 1
+            result = await session.call_tool("sum_batch", {"a": [big, -big], "b": [big, -big]})
+            assert result.structuredContent["sums"] == [2 * big, -2 * big], result.structuredContent
+
+            # 长度不一致时报错
+            result = await session.call_tool("sum_batch", {"a": [1, 2], "b": [1]})
+            assert result.isError, "Mismatched lengths should be an error"
+
+            result = await session.call_tool("sum_batch", {"a": [], "b": []})
+            assert result.structuredContent == {"sums": [], "count": 0}, result.structuredContent
+
+            # 归约求和
+            values = list(range(1, 1001))
+            result = await session.call_tool("sum_many", {"values": values})
+            assert result.structuredContent["result"] == 500500, result.structuredContent
+
+            result = await session.call_tool("sum_many", {"values": []})
+            assert result.structuredContent["result"] == 0, result.structuredContent
+
+            print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_batch_tools())
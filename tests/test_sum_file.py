@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+测试本地文件归约：二进制 int64/int32 数组和CSV列的切块归约 (numpy和标准库两种实现)、
+块边界落在行中间的CSV、路径检查，以及通过stdio调用 sum_file 工具 (进程池并行和进度通知)
+"""
+
+import array
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+import reduction
+from reduction import reduce_chunk, reduce_file, resolve_path
+
+
+def expected(values: list[int]) -> tuple:
+    return sum(values), len(values), min(values, default=None), max(values, default=None)
+
+
+def write_binary(path: str, code: str, values: list[int], byteorder: str = "little") -> None:
+    data = array.array(code, values)
+    if byteorder != sys.byteorder:
+        data.byteswap()
+    with open(path, "wb") as f:
+        f.write(data.tobytes())
+
+
+def stats_tuple(stats) -> tuple:
+    return stats.sum, stats.count, stats.min, stats.max
+
+
+async def check_files(directory: str) -> None:
+    rng = random.Random(7)
+    int64 = [rng.randrange(-2**63, 2**63) for _ in range(50_000)] + [2**63 - 1] * 10
+    int32 = [rng.randrange(-2**31, 2**31) for _ in range(50_000)]
+    path64 = os.path.join(directory, "values.i64")
+    path32 = os.path.join(directory, "values.i32be")
+    write_binary(path64, "q", int64)
+    write_binary(path32, "i", int32, "big")
+
+    rows = [(i, rng.randrange(-10**12, 10**12), rng.randrange(10)) for i in range(30_000)]
+    csv_path = os.path.join(directory, "table.csv")
+    with open(csv_path, "w", newline="") as f:
+        f.write("id,amount,\"bucket\"\r\n")
+        f.writelines(f"{i},{amount},\"{bucket}\"\r\n" for i, amount, bucket in rows)
+    column_path = os.path.join(directory, "column.txt")
+    with open(column_path, "w") as f:
+        f.writelines(f"{amount}\n" for _, amount, _ in rows)
+        f.write("\n")
+    quoted_path = os.path.join(directory, "quoted.txt")
+    with open(quoted_path, "w") as f:
+        f.writelines(f"\"{amount}\"\r\n" for _, amount, _ in rows)
+
+    # 块大小远小于文件，验证切块和合并 (包括CSV的块边界落在行中间)
+    reduction.MIN_CHUNK = 4096
+    try:
+        for label in ("numpy", "stdlib") if reduction._get_numpy() is not None else ("stdlib",):
+            saved = reduction._numpy
+            if label == "stdlib":
+                reduction._numpy = None
+            try:
+                stats = await reduce_file(path64, "int64", workers=4)
+                assert stats_tuple(stats) == expected(int64), label
+                stats = await reduce_file(path32, "int32", byteorder="big", workers=4)
+                assert stats_tuple(stats) == expected(int32), label
+            finally:
+                reduction._numpy = saved
+            print(f"✓ binary arrays ({label})")
+
+        amounts = [amount for _, amount, _ in rows]
+        stats = await reduce_file(csv_path, "csv", column="amount", workers=8)
+        assert stats_tuple(stats) == expected(amounts)
+        stats = await reduce_file(csv_path, "csv", column=2, header=True, workers=8)
+        assert stats_tuple(stats) == expected([bucket for _, _, bucket in rows])
+        stats = await reduce_file(column_path, "csv", workers=8)
+        assert stats_tuple(stats) == expected(amounts)
+        stats = await reduce_file(quoted_path, "csv", workers=8)
+        assert stats_tuple(stats) == expected(amounts)
+    finally:
+        reduction.MIN_CHUNK = 8 * 1024 * 1024
+
+    # 任意位置切分，各块结果合并后与整个文件相同
+    size = os.path.getsize(csv_path)
+    cuts = sorted({0, size, *(rng.randrange(size) for _ in range(20))})
+    partials = [reduce_chunk(csv_path, "csv", a, b, column=1, skip_header=True) for a, b in zip(cuts, cuts[1:])]
+    merged = reduction.FileStats()
+    for partial in partials:
+        merged.add(*partial)
+    assert stats_tuple(merged) == expected(amounts)
+    print("✓ csv columns")
+
+    empty = os.path.join(directory, "empty.i64")
+    open(empty, "wb").close()
+    assert stats_tuple(await reduce_file(empty)) == (0, 0, None, None)
+    odd = os.path.join(directory, "odd.i64")
+    with open(odd, "wb") as f:
+        f.write(b"\0" * 12)
+    spaced = os.path.join(directory, "spaced.txt")
+    with open(spaced, "w") as f:
+        f.write("1\n 2 \n\n3 4\n")
+    invalid = (
+        lambda: reduce_file(odd),
+        lambda: reduce_file(csv_path, "csv", column=1),
+        # 行内的空白不能把一行拆成多个值
+        lambda: reduce_file(spaced, "csv"),
+    )
+    for call in invalid:
+        try:
+            await call()
+            raise AssertionError("invalid input should fail")
+        except ValueError:
+            pass
+    print("✓ empty and invalid files")
+
+
+def check_paths(directory: str) -> None:
+    path = os.path.join(directory, "values.i64")
+    assert resolve_path(path, [directory]) == os.path.realpath(path)
+    assert resolve_path(Path(path).as_uri(), [directory]) == os.path.realpath(path)
+    for bad in (path, "http://example.com/values.i64", os.path.join(directory, "missing")):
+        try:
+            resolve_path(bad, [directory] if bad != path else [os.path.join(directory, "sub")])
+            raise AssertionError(f"{bad} should be rejected")
+        except ValueError:
+            pass
+    print("✓ path checks")
+
+
+async def check_tool(directory: str) -> None:
+    # 16MB的文件切成两块，在进程池中归约
+    values = list(range(-1_000_000, 1_000_000))
+    path = os.path.join(directory, "big.i64")
+    write_binary(path, "q", values)
+    outside = tempfile.NamedTemporaryFile(suffix=".i64")
+
+    server_params = StdioServerParameters(
+        command=sys.executable, args=["src/mcp_server/sum_int.py"],
+        env=dict(os.environ, PYMCP_DATA_DIRS=directory),
+    )
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            progress = []
+
+            async def on_progress(value: float, total: float | None, message: str | None) -> None:
+                progress.append((value, total, message))
+
+            result = await session.call_tool("sum_file", {"path": path}, progress_callback=on_progress)
+            assert not result.isError, result
+            assert result.structuredContent == dict(zip(("sum", "count", "min", "max"), expected(values)))
+            assert len(progress) == 2 and progress[-1][:2] == (16_000_000, 16_000_000), progress
+
+            result = await session.call_tool(
+                "sum_file", {"path": Path(directory, "table.csv").as_uri(), "format": "csv", "column": "bucket"}
+            )
+            assert not result.isError and result.structuredContent["count"] == 30_000, result
+
+            result = await session.call_tool("sum_file", {"path": outside.name})
+            assert result.isError and "outside the allowed" in result.content[0].text, result
+    outside.close()
+    print("✓ sum_file tool")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        await check_files(directory)
+        check_paths(directory)
+        await check_tool(directory)
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,6 +4,7 @@
 """
 
 import asyncio
+import os
 import sys
 from pathlib import Path
 
@@ -17,9 +18,12 @@ from mcp.client.stdio import stdio_client
 async def test_add_tool():
     """测试add工具函数"""
     # 配置服务器参数
+    # 设置了 PYMCP_POOL_SOCKET 时从预热进程池获取服务器 (python src/mcp_server/pool.py serve)
+    pool_socket = os.environ.get("PYMCP_POOL_SOCKET")
+    server_args = ["src/mcp_server/pool.py", "--socket", pool_socket, "connect"] if pool_socket else ["src/mcp_server/sum_int.py"]
     server_params = StdioServerParameters(
         command=sys.executable,
-        args=["src/mcp_server/sum_int.py"]
+        args=server_args
     )
     
     # 创建stdio客户端连接
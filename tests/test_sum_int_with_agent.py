@@ -53,9 +53,12 @@ if LANGCHAIN_AVAILABLE:
             raise ValueError("LLM_MODEL environment variable is not set")
         
         # 配置服务器参数
+        # 设置了 PYMCP_POOL_SOCKET 时从预热进程池获取服务器 (python src/mcp_server/pool.py serve)
+        pool_socket = os.environ.get("PYMCP_POOL_SOCKET")
+        server_args = ["src/mcp_server/pool.py", "--socket", pool_socket, "connect"] if pool_socket else ["src/mcp_server/sum_int.py"]
         server_params = StdioServerParameters(
             command=sys.executable,
-            args=["src/mcp_server/sum_int.py"],
+            args=server_args,
         )
         
         # 使用指定的LLM配置
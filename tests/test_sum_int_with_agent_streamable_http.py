@@ -10,8 +10,6 @@ import os
 from dotenv import load_dotenv
 import logging
 import subprocess
-import time
-import httpx
 
 # 添加src目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
@@ -39,21 +37,19 @@ except ImportError as e:
     print(f"Import error: {e}")
 
 
-async def wait_for_server(url: str, timeout: int = 30) -> bool:
-    """等待服务器启动"""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                # Streamable HTTP服务器会返回405 (Method Not Allowed)而不是200
-                # 因为它只接受POST请求，所以检查状态码是否不是502
-                if response.status_code != 502:
-                    return True
-        except Exception:
-            pass
-        await asyncio.sleep(1)
-    return False
+async def wait_for_ready(ready_fd: int, timeout: float = 30) -> bool:
+    """等待服务器通过 --ready-fd 管道发出就绪通知，服务器退出时管道关闭并立即返回False"""
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(ready_fd, readable.set)
+    try:
+        await asyncio.wait_for(readable.wait(), timeout)
+        return os.read(ready_fd, 64).startswith(b"READY=1")
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(ready_fd)
+        os.close(ready_fd)
 
 
 if LANGCHAIN_AVAILABLE:
@@ -75,13 +71,16 @@ if LANGCHAIN_AVAILABLE:
         
         # 启动MCP服务器 (Streamable HTTP方式)
         print("Starting MCP server with Streamable HTTP transport...")
+        # 服务器绑定端口后向管道写入 READY=1，无需轮询端口
+        ready_fd, server_ready_fd = os.pipe()
         server_process = subprocess.Popen([
-            sys.executable, "src/mcp_server/sum_int.py", "streamable-http"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            sys.executable, "src/mcp_server/sum_int.py", "streamable-http", "--ready-fd", str(server_ready_fd)
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=(server_ready_fd,))
+        os.close(server_ready_fd)
         
         # 等待服务器启动
         server_url = f"http://127.0.0.1:{mcp_port}/mcp"
-        if not await wait_for_server(server_url):
+        if not await wait_for_ready(ready_fd):
             server_process.terminate()
             raise RuntimeError("MCP server failed to start within timeout")
         
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试流式求和：sum_stream_open/push/close 工具、进度通知，以及流的过期和数量上限
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from reduction import RunningSums
+
+
+def test_running_sums():
+    now = [0.0]
+    sums = RunningSums(ttl=10, max_open=2, clock=lambda: now[0])
+    first = sums.open(expected=5)
+    sums.push(first, [1, 2])
+    state = sums.push(first, [3, 4, 2**80])
+    assert (state.total, state.count, state.expected) == (10 + 2**80, 5, 5), state
+
+    # 达到数量上限后不能再打开新的流
+    second = sums.open()
+    try:
+        sums.open()
+        raise AssertionError("max_open not enforced")
+    except ValueError:
+        pass
+
+    # 长时间没有新分块的流过期，释放的位置可以打开新的流
+    now[0] = 8
+    sums.push(first, [])
+    now[0] = 15
+    assert sums.close(first).total == 10 + 2**80
+    sums.open()
+    assert sums.expired == 1 and len(sums) == 1
+    for handle in (first, second):
+        try:
+            sums.push(handle, [1])
+            raise AssertionError(f"{handle} should be gone")
+        except ValueError:
+            pass
+
+    # 不可用时所有操作都返回原因，而不是"未知句柄"
+    handle = sums.open()
+    sums.unavailable = "Streaming sums are unavailable"
+    for call in (sums.open, lambda: sums.push(handle, [1]), lambda: sums.close(handle)):
+        try:
+            call()
+            raise AssertionError("unavailable not enforced")
+        except ValueError as exc:
+            assert str(exc) == "Streaming sums are unavailable", exc
+    print("✓ running sums")
+
+
+async def test_stream_tools():
+    server_params = StdioServerParameters(command=sys.executable, args=["src/mcp_server/sum_int.py"])
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            chunk_size, chunks = 50_000, 20
+            result = await session.call_tool("sum_stream_open", {"expected": chunk_size * chunks})
+            assert not result.isError, result
+            handle = result.structuredContent["result"]
+
+            progress = []
+
+            async def on_progress(value: float, total: float | None, message: str | None) -> None:
+                progress.append((value, total, message))
+
+            for i in range(chunks):
+                values = list(range(i * chunk_size, (i + 1) * chunk_size))
+                result = await session.call_tool(
+                    "sum_stream_push", {"handle": handle, "values": values}, progress_callback=on_progress
+                )
+                assert not result.isError, result
+                assert result.structuredContent["count"] == (i + 1) * chunk_size, result.structuredContent
+
+            n = chunk_size * chunks
+            expected_total = n * (n - 1) // 2
+            # 每个分块一条进度通知，带已接收的个数和累计值
+            assert len(progress) == chunks, progress
+            assert progress[-1] == (n, n, f"running total: {expected_total}"), progress[-1]
+            assert [p[0] for p in progress] == [(i + 1) * chunk_size for i in range(chunks)]
+
+            result = await session.call_tool("sum_stream_close", {"handle": handle})
+            assert result.structuredContent == {"total": expected_total, "count": n}, result.structuredContent
+
+            # 关闭后的句柄和未知句柄都是错误
+            result = await session.call_tool("sum_stream_push", {"handle": handle, "values": [1]})
+            assert result.isError and "Unknown or expired" in result.content[0].text, result
+            result = await session.call_tool("sum_stream_close", {"handle": "nope"})
+            assert result.isError, result
+
+            # 没有进度令牌时不发送通知，空流的总和为0
+            handle = (await session.call_tool("sum_stream_open", {})).structuredContent["result"]
+            await session.call_tool("sum_stream_push", {"handle": handle, "values": []})
+            result = await session.call_tool("sum_stream_close", {"handle": handle})
+            assert result.structuredContent == {"total": 0, "count": 0}, result.structuredContent
+    print("✓ sum_stream tools")
+
+
+async def main():
+    test_running_sums()
+    await test_stream_tools()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+测试纯函数工具的结果缓存，以及进行中的相同调用的合并
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import mcp.types as types
+from mcp.server.fastmcp import FastMCP
+
+from metrics import coalescing_collector
+from tool_cache import ResultCache, canonical_arguments, install_coalescing, install_result_cache, pure
+
+
+def test_lru_eviction():
+    """超出容量时淘汰最久未使用的条目"""
+    cache = ResultCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None, "b should have been evicted"
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1, "expirations": 0}
+
+
+def test_ttl_expiration():
+    """过期的条目视为未命中"""
+    now = [0.0]
+    cache = ResultCache(maxsize=10, ttl=5, clock=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 4.9
+    assert cache.get("a") == 1
+    now[0] = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_canonical_arguments():
+    """参数顺序不影响缓存键"""
+    assert canonical_arguments({"a": 1, "b": 2}) == canonical_arguments({"b": 2, "a": 1})
+    assert canonical_arguments({"a": 1}) != canonical_arguments({"a": "1"})
+
+
+async def test_pure_tool_is_cached():
+    """纯函数工具的重复调用命中缓存，工具函数只执行一次"""
+    mcp = FastMCP("cache-test")
+    calls = []
+
+    @mcp.tool()
+    @pure(maxsize=8)
+    def add(a: int, b: int) -> int:
+        calls.append((a, b))
+        return a + b
+
+    @mcp.tool()
+    def impure(a: int) -> int:
+        calls.append((a,))
+        return a
+
+    result_cache = install_result_cache(mcp)
+    handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
+
+    def request(name, arguments):
+        return types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+
+    first = await handler(request("add", {"a": 15, "b": 25}))
+    second = await handler(request("add", {"b": 25, "a": 15}))
+    assert first.root.structuredContent == {"result": 40}
+    assert second is first, "Identical call should return the cached result"
+    assert calls == [(15, 25)], calls
+
+    # 错误结果不缓存
+    error = await handler(request("add", {"a": "x", "b": 1}))
+    assert error.root.isError
+    await handler(request("add", {"a": "x", "b": 1}))
+    assert result_cache.stats()["add"]["size"] == 1
+
+    # 未标记为纯函数的工具每次都执行
+    await handler(request("impure", {"a": 1}))
+    await handler(request("impure", {"a": 1}))
+    assert calls.count((1,)) == 2
+    assert "impure" not in result_cache.stats()
+
+    stats = result_cache.stats()["add"]
+    assert stats["hits"] == 1 and stats["misses"] == 3, stats
+
+
+def call_request(name, arguments):
+    return types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+
+
+async def test_concurrent_calls_are_coalesced():
+    """同时到达的相同调用只执行一次，所有调用得到同一个结果对象；错误同样共享"""
+    mcp = FastMCP("coalescing-test")
+    calls = []
+    release = asyncio.Event()
+
+    @mcp.tool()
+    @pure()
+    async def slow_add(a: int, b: int) -> int:
+        calls.append((a, b))
+        await release.wait()
+        if a < 0:
+            raise ValueError("negative")
+        return a + b
+
+    @mcp.tool()
+    async def impure(a: int) -> int:
+        calls.append((a,))
+        await release.wait()
+        return a
+
+    result_cache = install_result_cache(mcp)
+    coalescer = install_coalescing(mcp)
+    handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
+
+    tasks = [asyncio.create_task(handler(call_request("slow_add", {"a": 1, "b": 2} if i % 2 else {"b": 2, "a": 1})))
+             for i in range(50)]
+    tasks += [asyncio.create_task(handler(call_request("slow_add", {"a": 5, "b": 5}))) for _ in range(10)]
+    tasks += [asyncio.create_task(handler(call_request("slow_add", {"a": -1, "b": 0}))) for _ in range(10)]
+    tasks += [asyncio.create_task(handler(call_request("impure", {"a": 7}))) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    assert coalescer.stats()["slow_add"]["inflight"] == 3
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert all(result is results[0] for result in results[:50]), "Coalesced calls should share one result object"
+    assert results[0].root.structuredContent == {"result": 3}
+    assert results[50].root.structuredContent == {"result": 10}
+    assert all(result.root.isError for result in results[60:70])
+    assert sorted(calls) == sorted([(1, 2), (5, 5), (-1, 0), (7,), (7,), (7,)]), calls
+    assert coalescer.stats() == {"slow_add": {"executions": 3, "coalesced": 67, "inflight": 0}}
+    assert "impure" not in coalescer.stats()
+
+    # 完成后的调用由结果缓存处理，不再经过合并层
+    await handler(call_request("slow_add", {"a": 1, "b": 2}))
+    assert coalescer.stats()["slow_add"]["executions"] == 3
+    assert result_cache.stats()["slow_add"]["hits"] == 1
+
+    lines = list(coalescing_collector(coalescer)())
+    assert 'pymcp_coalescing_coalesced_total{tool="slow_add"} 67' in lines, lines
+    assert 'pymcp_coalescing_executions_total{tool="slow_add"} 3' in lines, lines
+    print("✓ concurrent identical calls are coalesced")
+
+
+async def test_cancelled_leader():
+    """执行的调用被取消时，等待者重新执行而不是得到取消错误"""
+    mcp = FastMCP("coalescing-cancel-test")
+    calls = []
+
+    @mcp.tool()
+    @pure()
+    async def slow_add(a: int, b: int) -> int:
+        calls.append((a, b))
+        await asyncio.sleep(0.05)
+        return a + b
+
+    coalescer = install_coalescing(mcp)
+    handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
+
+    leader = asyncio.create_task(handler(call_request("slow_add", {"a": 1, "b": 1})))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(handler(call_request("slow_add", {"a": 1, "b": 1}))) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    results = await asyncio.gather(*waiters)
+    assert leader.cancelled()
+    assert all(result.root.structuredContent == {"result": 2} for result in results)
+    assert len(calls) == 2, calls
+    assert coalescer.stats()["slow_add"] == {"executions": 2, "coalesced": 4, "inflight": 0}
+    print("✓ waiters re-execute when the leading call is cancelled")
+
+
+async def main():
+    test_lru_eviction()
+    test_ttl_expiration()
+    test_canonical_arguments()
+    await test_pure_tool_is_cached()
+    await test_concurrent_calls_are_coalesced()
+    await test_cancelled_leader()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
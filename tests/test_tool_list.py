@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+测试预先生成的 tools/list 响应：与SDK默认处理结果一致、etag条件请求、注册新工具后失效
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+import mcp.types as types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.server.fastmcp import FastMCP
+
+from tool_list import install_tool_list_cache
+
+DUMP = {"by_alias": True, "mode": "json", "exclude_none": True}
+
+
+def list_request(etag: str | None = None) -> types.ListToolsRequest:
+    params = types.PaginatedRequestParams(_meta={"ifNoneMatch": etag}) if etag else None
+    return types.ListToolsRequest(method="tools/list", params=params)
+
+
+async def test_cache():
+    """缓存的响应与SDK默认处理一致，注册工具后重新生成"""
+    mcp = FastMCP("tool-list-test")
+
+    @mcp.tool()
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    default = mcp._mcp_server.request_handlers[types.ListToolsRequest]
+    expected = (await default(list_request())).model_dump(**DUMP)
+
+    cache = install_tool_list_cache(mcp)
+    handler = mcp._mcp_server.request_handlers[types.ListToolsRequest]
+    first = await handler(list_request())
+    dumped = first.model_dump(**DUMP)
+    etag = dumped.pop("_meta")["etag"]
+    assert dumped == expected, (dumped, expected)
+    assert await handler(list_request()) is first
+    assert cache.builds == 1
+
+    # 条件请求：etag一致时不返回列表，不一致时返回完整列表
+    not_modified = (await handler(list_request(etag))).root
+    assert not_modified.tools == [] and not_modified.meta == {"etag": etag, "notModified": True}
+    assert (await handler(list_request("stale"))).root.tools == first.root.tools
+
+    # 注册新工具后缓存失效，etag随之变化
+    @mcp.tool()
+    def negate(value: int) -> int:
+        return -value
+
+    second = (await handler(list_request())).root
+    assert [tool.name for tool in second.tools] == ["add", "negate"]
+    assert second.meta["etag"] != etag and cache.builds == 2
+    assert (await handler(list_request(etag))).root.tools == second.tools
+    print("✓ cached tools/list matches the SDK and is invalidated on registration")
+
+
+async def test_stdio():
+    """通过stdio客户端发送条件请求"""
+    server_params = StdioServerParameters(command=sys.executable, args=["src/mcp_server/sum_int.py"])
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            tools = await session.list_tools()
+            etag = tools.meta["etag"]
+            assert {tool.name for tool in tools.tools} >= {"sum", "sum_batch", "sum_many", "sum_big"}
+
+            request = types.ClientRequest(list_request(etag))
+            result = await session.send_request(request, types.ListToolsResult)
+            assert result.tools == [] and result.meta["notModified"] is True
+    print("✓ conditional tools/list over stdio")
+
+
+async def main():
+    await test_cache()
+    await test_stdio()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
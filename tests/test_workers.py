@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试多进程worker模式 (SSE 和 Streamable HTTP方式)
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "mcp_server"))
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: int = 30) -> bool:
+    """等待服务器启动"""
+    start_time = time.time()
+    async with httpx.AsyncClient() as client:
+        while time.time() - start_time < timeout:
+            try:
+                await client.get(url, timeout=0.5)
+                return True
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    return False
+
+
+def start_server(transport: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    return subprocess.Popen(
+        [sys.executable, "src/mcp_server/sum_int.py", transport, "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def call_sum_over_sse(url: str, a: int, b: int) -> int:
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.call_tool("sum", {"a": a, "b": b})
+            assert not result.isError, f"Result should not be an error: {result}"
+            return result.structuredContent["result"]
+
+
+async def call_sum_over_http(url: str, a: int, b: int) -> int:
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.call_tool("sum", {"a": a, "b": b})
+            assert not result.isError, f"Result should not be an error: {result}"
+            return result.structuredContent["result"]
+
+
+async def test_sse_workers():
+    """SSE会话的消息即使落到其他worker上也能回到所属worker"""
+    port = free_port()
+    process = start_server("sse", port, 2)
+    try:
+        url = f"http://127.0.0.1:{port}/sse"
+        assert await wait_for_server(f"http://127.0.0.1:{port}/messages/"), "Server failed to start"
+        # 多个并发会话，足以让POST消息分散到不同的worker
+        results = await asyncio.gather(*(call_sum_over_sse(url, i, i) for i in range(8)))
+        assert results == [2 * i for i in range(8)], results
+    finally:
+        stop_server(process)
+
+
+async def test_streamable_http_workers():
+    """无状态streamable-http请求可以由任意worker处理"""
+    port = free_port()
+    process = start_server("streamable-http", port, 2)
+    try:
+        url = f"http://127.0.0.1:{port}/mcp"
+        assert await wait_for_server(url), "Server failed to start"
+        results = await asyncio.gather(*(call_sum_over_http(url, i, 1) for i in range(8)))
+        assert results == [i + 1 for i in range(8)], results
+
+        # 流式求和依赖进程内的状态，无状态worker下明确拒绝
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool("sum_stream_open", {})
+                assert result.isError and "stateless streamable-http workers" in result.content[0].text, result
+    finally:
+        stop_server(process)
+
+
+def test_forwardable_headers():
+    """转发时去掉逐跳头和按转发内容重新生成的编码/长度头"""
+    from workers import _BODY_HEADERS, _forwardable
+
+    headers = httpx.Headers([
+        ("content-type", "application/json"), ("connection", "keep-alive, x-trace"),
+        ("x-trace", "1"), ("transfer-encoding", "chunked"), ("content-encoding", "gzip"),
+        ("content-length", "10"), ("set-cookie", "a=1"), ("set-cookie", "b=2"),
+    ])
+    assert _forwardable(headers, _BODY_HEADERS) == [
+        ("content-type", "application/json"), ("set-cookie", "a=1"), ("set-cookie", "b=2"),
+    ]
+    print("✓ Relayed headers drop hop-by-hop and encoding headers")
+
+
+async def main():
+    test_forwardable_headers()
+    await test_sse_workers()
+    await test_streamable_http_workers()
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())